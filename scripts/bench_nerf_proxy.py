@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Benchmark and load-test the NeRF proxy.
+
+  micro    time render_dummy, render_nearest_view and dataset startup in-process
+  load     replay orbiting camera clients against /render and /inputs/image/{idx},
+           on a running server (--url) or a local uvicorn started for the run
+  compare  diff two result files; exits 1 when a metric regressed past --threshold
+
+Every command writes JSON (`--out`) with p50/p95/p99 latencies (and frames/s
+for load runs) plus the commit and machine it ran on, so runs can be kept
+and compared.
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+SERVER_DIR = Path(__file__).resolve().parents[1] / "server" / "nerf-proxy"
+sys.path.insert(0, str(SERVER_DIR))
+
+
+def summarize(ms: list[float]) -> dict:
+    """Latency summary of a list of millisecond timings."""
+    if not ms:
+        return {"n": 0}
+    a = np.asarray(ms, dtype=np.float64)
+    p50, p95, p99 = np.percentile(a, [50, 95, 99])
+    return {
+        "n": int(a.size),
+        "mean_ms": round(float(a.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "min_ms": round(float(a.min()), 3),
+        "max_ms": round(float(a.max()), 3),
+    }
+
+
+def run_metadata() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SERVER_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "env": {k: v for k, v in os.environ.items() if k.startswith("NERF_")},
+    }
+
+
+def orbit_pose(angle: float, radius: float = 3.0, elevation: float = 0.35, fov: float = 60.0) -> dict:
+    """Camera on a circle around the origin, looking at it (the demo dataset's layout)."""
+    return {
+        "px": radius * math.cos(angle) * math.cos(elevation),
+        "py": radius * math.sin(elevation),
+        "pz": radius * math.sin(angle) * math.cos(elevation),
+        "tx": 0.0, "ty": 0.0, "tz": 0.0,
+        "ux": 0.0, "uy": 1.0, "uz": 0.0,
+        "fov": fov,
+    }
+
+
+def _config(args) -> dict:
+    return {k: v for k, v in vars(args).items() if k != "func"}
+
+
+def _sizes(text: str) -> list[tuple[int, int]]:
+    return [tuple(int(v) for v in item.split("x")) for item in text.split(",")]
+
+
+# ---------------------------------------------------------------- micro
+
+def _timeit(fn, repeat: int, warmup: int = 1, setup=None) -> dict:
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return summarize(times)
+
+
+def _reference_composite(sx, sy, size, depth, colors, width: int, height: int, background: float):
+    """The frame-wide compositor that TileCompositor replaced: all fragments of the frame in one pass.
+
+    Kept as the reference the tiled output must match exactly. Returns (uint8 RGB, depth, alpha).
+    """
+    from tile_compositor import splat_fragments
+
+    img = np.full((height, width, 3), background, dtype=np.float32)
+    n_pix = width * height
+    frag_sample, frag_pix, frag_alpha = [], [], []
+    for s in np.unique(size):
+        idx = np.flatnonzero(size == s)
+        f, pix, a = splat_fragments(sx[idx], sy[idx], int(s), width, height)
+        frag_sample.append(idx[f])
+        frag_pix.append(pix)
+        frag_alpha.append(a)
+    out_depth = np.zeros((height, width), np.float32)
+    out_alpha = np.zeros((height, width), np.float32)
+    if frag_pix:
+        sample, pix, alpha = np.concatenate(frag_sample), np.concatenate(frag_pix), np.concatenate(frag_alpha)
+        order = np.lexsort((depth[sample], pix))
+        sample, pix, alpha = sample[order], pix[order], alpha[order]
+        log_t = np.log1p(-alpha)
+        cum = np.cumsum(log_t)
+        new_pixel = np.r_[True, pix[1:] != pix[:-1]]
+        starts = np.flatnonzero(new_pixel)
+        group = np.cumsum(new_pixel) - 1
+        before = (cum[starts] - log_t[starts])[group]
+        weight = alpha * np.exp(cum - log_t - before)
+        transmittance = np.exp(np.bincount(pix, weights=log_t, minlength=n_pix))
+        flat = img.reshape(n_pix, 3)
+        flat *= transmittance[:, None].astype(np.float32)
+        for c in range(3):
+            flat[:, c] += np.bincount(pix, weights=weight * colors[sample, c], minlength=n_pix).astype(np.float32)
+        wsum = np.bincount(pix, weights=weight, minlength=n_pix)
+        dsum = np.bincount(pix, weights=weight * depth[sample], minlength=n_pix)
+        hit = wsum > 0
+        out_depth = np.where(hit, dsum / np.where(hit, wsum, 1.0), 0.0).reshape(height, width).astype(np.float32)
+        out_alpha = (1.0 - transmittance).reshape(height, width).astype(np.float32)
+    return np.clip(img * 255, 0, 255).astype(np.uint8), out_depth, out_alpha
+
+
+def _composite_scaling(main, case, pose, w: int, h: int, samples: int, args) -> None:
+    """Time cold tiled composites per tile worker count; fail if any differs from the frame-wide reference."""
+    from tile_compositor import TileCompositor
+
+    splats = main._project_dummy(w, h, pose, samples)
+    reference = _reference_composite(*splats, w, h, main.DUMMY_BACKGROUND)
+    case(f"composite/{w}x{h}/s{samples}/reference",
+         _timeit(lambda: _reference_composite(*splats, w, h, main.DUMMY_BACKGROUND), args.repeat))
+    base = None
+    for workers in (int(n) for n in args.tile_workers.split(",")):
+        tiles = TileCompositor(tile_size=main.TILES.tile_size, workers=workers)
+        tiled = tiles.composite(*splats, w, h, main.DUMMY_BACKGROUND, with_aux=True)
+        for name, ref, out in zip(("rgb", "depth", "alpha"), reference, tiled):
+            if not np.array_equal(ref, out):
+                raise SystemExit(f"composite/{w}x{h}/s{samples}: tiled {name} with {workers} workers differs from the reference")
+        result = _timeit(lambda: tiles.composite(*splats, w, h, main.DUMMY_BACKGROUND, with_aux=True), args.repeat,
+                         setup=tiles.cache.clear)
+        base = base or result["p50_ms"]
+        result["speedup"] = round(base / result["p50_ms"], 2)
+        case(f"composite/{w}x{h}/s{samples}/workers{workers}", result)
+
+
+def micro(args) -> dict:
+    import main
+
+    cases = {}
+
+    def case(name: str, result: dict) -> None:
+        cases[name] = result
+        speedup = f"  x{result['speedup']:.2f} vs 1 worker" if "speedup" in result else ""
+        print(f"{name:<44} p50 {result['p50_ms']:9.2f} ms  p95 {result['p95_ms']:9.2f} ms{speedup}")
+
+    # Warm start: the dataset on disk is current, so this reads cameras.json and builds the index
+    case("ensure_demo_dataset", _timeit(main.ensure_demo_dataset, args.repeat))
+    if args.generate:
+        with tempfile.TemporaryDirectory() as tmp:
+            case("generate_demo_dataset", _timeit(lambda: main.generate_demo_dataset(Path(tmp), Path(tmp)), 1, warmup=0))
+
+    pose = main.Pose(**orbit_pose(0.3))
+    nudged = main.Pose(**orbit_pose(0.3 + 1e-5))
+    scene = main.SCENES.get(main.DEFAULT_SCENE)
+    for w, h in _sizes(args.sizes):
+        for samples in (int(s) for s in args.samples.split(",")):
+            # Cold: every tile composited. Nudged: the previous frame's tiles are cached and the camera moved slightly.
+            case(f"render_dummy/{w}x{h}/s{samples}",
+                 _timeit(lambda: main.render_dummy(w, h, pose, samples), args.repeat, setup=main.TILES.cache.clear))
+            prime = lambda: (main.TILES.cache.clear(), main.render_dummy(w, h, pose, samples))  # noqa: E731
+            case(f"render_dummy/{w}x{h}/s{samples}/nudged",
+                 _timeit(lambda: main.render_dummy(w, h, nudged, samples), args.repeat, setup=prime))
+            _composite_scaling(main, case, pose, w, h, samples, args)
+        # cold rebuilds the view's mip pyramid (the packed images stay mapped); warm hits its resize memo
+        case(f"render_nearest_view/{w}x{h}/cold", _timeit(lambda: main.render_nearest_view(w, h, pose, 0.0, scene), args.repeat, setup=scene.pyramids.clear))
+        case(f"render_nearest_view/{w}x{h}/warm", _timeit(lambda: main.render_nearest_view(w, h, pose, 0.0, scene), args.repeat))
+    return {"kind": "micro", "meta": run_metadata(), "config": _config(args), "cases": cases}
+
+
+# ---------------------------------------------------------------- load
+
+class _Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows: list[tuple[str, int, float, str, int, float]] = []  # endpoint, status, ms, cache, bytes, end time
+
+    def add(self, *row) -> None:
+        with self.lock:
+            self.rows.append(row)
+
+
+def _client_loop(base: str, client: int, args, inputs: int, deadline: float, recorder: _Recorder) -> None:
+    """One virtual viewer: orbits at its own speed and phase, one request at a time."""
+    rng = random.Random(args.seed + client)
+    url = urlsplit(base)
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+    angle = rng.uniform(0, 2 * math.pi)
+    speed = math.radians(rng.uniform(0.5, 1.5) * args.degrees_per_frame) * rng.choice((-1, 1))
+    sizes = _sizes(args.sizes)
+    frame = 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        if inputs and rng.random() < args.inputs_ratio:
+            w, h = rng.choice(sizes)
+            endpoint = "/inputs/image"
+            path = f"/inputs/image/{rng.randrange(inputs)}?" + urlencode({"w": w, "h": h, "format": args.format})
+        else:
+            endpoint = "/render"
+            # Drag-like motion: steady orbit with a slow elevation and dolly wobble
+            pose = orbit_pose(angle, 3.0 + 0.2 * math.sin(frame / 40), 0.35 + 0.1 * math.sin(frame / 25))
+            angle += speed
+            frame += 1
+            w, h = sizes[client % len(sizes)]
+            params = pose | {"w": w, "h": h, "mode": args.mode, "format": args.format}
+            if args.prefetch:
+                params["client"] = f"bench{client}"
+            path = "/render?" + urlencode(params)
+        try:
+            conn.request("GET", path)
+            resp = conn.getresponse()
+            body = resp.read()
+            status, cache = resp.status, resp.getheader("X-Cache", "")
+            if resp.getheader("X-Prefetch"):
+                cache += "/prefetch-" + resp.getheader("X-Prefetch")
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            status, cache, body = 0, "", b""
+        end = time.perf_counter()
+        recorder.add(endpoint, status, (end - started) * 1000, cache, len(body), end)
+        if status == 429:
+            # Server is saturated; back off like a real client instead of spinning
+            time.sleep(args.backoff)
+        elif args.fps > 0:
+            time.sleep(max(0.0, started + 1 / args.fps - time.perf_counter()))
+    conn.close()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get_json(base: str, path: str) -> dict:
+    url = urlsplit(base)
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=10)
+    try:
+        conn.request("GET", path)
+        return json.loads(conn.getresponse().read())
+    finally:
+        conn.close()
+
+
+def _spawn_server(args) -> tuple[subprocess.Popen, str]:
+    port = _free_port()
+    cmd = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, cwd=SERVER_DIR)
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + args.startup_timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"uvicorn exited with code {proc.returncode}")
+        try:
+            _get_json(base, "/health")
+            return proc, base
+        except (OSError, ValueError):
+            time.sleep(0.2)
+    proc.terminate()
+    raise SystemExit(f"server did not answer /health within {args.startup_timeout}s")
+
+
+def load(args) -> dict:
+    proc = None
+    base = args.url
+    if base is None:
+        proc, base = _spawn_server(args)
+        print(f"started uvicorn at {base}")
+    try:
+        inputs = _get_json(base, "/inputs").get("count", 0)
+        recorder = _Recorder()
+        start = time.perf_counter()
+        measure_from = start + args.warmup
+        deadline = measure_from + args.duration
+        threads = [
+            threading.Thread(target=_client_loop, args=(base, i, args, inputs, deadline, recorder), daemon=True)
+            for i in range(args.concurrency)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        server = _get_json(base, "/health")
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    rows = [r for r in recorder.rows if r[5] >= measure_from]
+    endpoints = {}
+    for endpoint in sorted({r[0] for r in rows}):
+        mine = [r for r in rows if r[0] == endpoint]
+        ok = [r for r in mine if r[1] == 200]
+        stats = summarize([r[2] for r in ok])
+        stats["requests"] = len(mine)
+        stats["errors"] = sum(1 for r in mine if r[1] not in (200, 429))
+        stats["rejected"] = sum(1 for r in mine if r[1] == 429)
+        stats["status"] = {str(s): sum(1 for r in mine if r[1] == s) for s in sorted({r[1] for r in mine})}
+        stats["cache"] = {c: sum(1 for r in ok if r[3] == c) for c in sorted({r[3] for r in ok if r[3]})}
+        stats["frames_per_s"] = round(len(ok) / args.duration, 2)
+        stats["mean_bytes"] = round(sum(r[4] for r in ok) / len(ok)) if ok else 0
+        endpoints[endpoint] = stats
+        print(f"{endpoint:<14} {stats['frames_per_s']:8.1f}/s  p50 {stats.get('p50_ms', 0):8.2f}  "
+              f"p95 {stats.get('p95_ms', 0):8.2f}  p99 {stats.get('p99_ms', 0):8.2f} ms  "
+              f"429s {stats['rejected']}  errors {stats['errors']}  cache {stats['cache']}")
+    return {"kind": "load", "meta": run_metadata(), "config": _config(args), "endpoints": endpoints, "server": server}
+
+
+# ---------------------------------------------------------------- compare
+
+def _metrics(result: dict) -> dict[str, tuple[float, bool]]:
+    """name -> (value, higher_is_better)"""
+    out = {}
+    for name, case in result.get("cases", {}).items():
+        for key in ("p50_ms", "p95_ms"):
+            if key in case:
+                out[f"{name} {key}"] = (case[key], False)
+    for name, ep in result.get("endpoints", {}).items():
+        # p99 of a short run is too noisy to gate on
+        for key in ("p50_ms", "p95_ms"):
+            if key in ep:
+                out[f"{name} {key}"] = (ep[key], False)
+        out[f"{name} frames_per_s"] = (ep["frames_per_s"], True)
+    return out
+
+
+def compare(args) -> int:
+    base = _metrics(json.loads(Path(args.baseline).read_text()))
+    new = _metrics(json.loads(Path(args.result).read_text()))
+    regressions = 0
+    for name in sorted(base.keys() & new.keys()):
+        (old, higher_better), (value, _) = base[name], new[name]
+        change = (value - old) / old if old else 0.0
+        worse = -change if higher_better else change
+        flag = "REGRESSION" if worse > args.threshold else ""
+        regressions += bool(flag)
+        print(f"{name:<52} {old:10.2f} -> {value:10.2f}  {change:+7.1%}  {flag}")
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("micro", help="in-process render and dataset benchmarks")
+    p.add_argument("--sizes", default="320x180,960x540,1920x1080,3840x2160")
+    p.add_argument("--samples", default="500,5000,50000", help="render_dummy sample counts")
+    p.add_argument("--tile-workers", default=",".join(str(n) for n in sorted({1, 2, 4, os.cpu_count() or 1})),
+                   help="tile worker counts compared against the frame-wide reference compositor")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--generate", action="store_true", help="also time a full dataset generation into a temp dir")
+    p.add_argument("--out", help="write results JSON here")
+    p.set_defaults(func=micro)
+
+    p = sub.add_parser("load", help="orbit load generator over HTTP")
+    p.add_argument("--url", help="running server, e.g. http://localhost:7007 (default: start uvicorn locally)")
+    p.add_argument("--concurrency", type=int, default=4, help="simultaneous viewers")
+    p.add_argument("--duration", type=float, default=20.0, help="measured seconds")
+    p.add_argument("--warmup", type=float, default=2.0, help="seconds excluded from the statistics")
+    p.add_argument("--fps", type=float, default=0.0, help="per-viewer request rate (0: back to back)")
+    p.add_argument("--degrees-per-frame", type=float, default=2.0, help="mean orbit speed")
+    p.add_argument("--inputs-ratio", type=float, default=0.1, help="share of /inputs/image requests")
+    p.add_argument("--sizes", default="960x540", help="frame sizes, assigned to viewers round robin")
+    p.add_argument("--mode", default="nearest", choices=("nearest", "blend"))
+    p.add_argument("--format", default="png", choices=("png", "jpeg", "webp", "raw"))
+    p.add_argument("--prefetch", action="store_true", help="send client ids so trajectory prefetching applies")
+    p.add_argument("--backoff", type=float, default=0.05, help="seconds to wait after a 429")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--startup-timeout", type=float, default=180.0)
+    p.add_argument("--out", help="write results JSON here")
+    p.set_defaults(func=load)
+
+    p = sub.add_parser("compare", help="compare two result files")
+    p.add_argument("baseline")
+    p.add_argument("result")
+    p.add_argument("--threshold", type=float, default=0.15, help="allowed relative slowdown")
+    p.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        return compare(args)
+    result = args.func(args)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps(result, indent=2))
+        print(f"wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Tile a point cloud or Gaussian splat PLY into an octree of LOD nodes.
+
+Every node stores a subsample of the points in its cube: one point per cell of
+a `grid`^3 lattice over the node, so a node's spacing halves at each level.
+Refinement is additive (as in Potree): a point lives in exactly one node, and
+a viewer draws a node together with all its loaded ancestors. Tiles are
+written as binary PLYs with the input's vertex layout under `nodes/`, next to
+an `index.json` that scene.json references.
+
+The input is processed out of core: a counting pass splits the cloud into
+partitions of at most `--partition-points` points (spilled to temporary files),
+each partition's subtree is built in memory, and the few levels above the
+partitions are sampled from the partition roots last.
+"""
+import argparse
+import json
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "server" / "nerf-proxy"))
+from ply_io import DEFAULT_CHUNK, read_ply, write_ply  # noqa: E402
+
+# Depth of the grid (2^5 cells per axis) that counts points to form partitions
+COUNT_DEPTH = 5
+SPLAT_FIELDS = ("f_dc_0", "opacity", "scale_0", "rot_0")
+
+
+def _xyz(points: np.ndarray) -> np.ndarray:
+    return np.stack([points["x"], points["y"], points["z"]], axis=1).astype(np.float64)
+
+
+def _cells(xyz: np.ndarray, lo: np.ndarray, size: float, n: int) -> np.ndarray:
+    """Integer (N, 3) cell coordinates of points in an n^3 grid over a cube."""
+    return np.clip(np.floor((xyz - lo) / size * n), 0, n - 1).astype(np.int64)
+
+
+def _octant(cells: np.ndarray) -> np.ndarray:
+    """Child index of each cell of a 2^3 grid: x bit 4, y bit 2, z bit 1 (Potree order)."""
+    return cells[:, 0] * 4 + cells[:, 1] * 2 + cells[:, 2]
+
+
+def _child_bounds(lo: np.ndarray, size: float, child: int) -> np.ndarray:
+    return lo + np.array([(child >> 2) & 1, (child >> 1) & 1, child & 1]) * (size / 2)
+
+
+def sample_grid(points: np.ndarray, lo: np.ndarray, size: float, grid: int) -> np.ndarray:
+    """Boolean mask keeping the point nearest each occupied cell center of a grid^3 lattice."""
+    if not len(points):
+        return np.zeros(0, dtype=bool)
+    xyz = _xyz(points)
+    cells = _cells(xyz, lo, size, grid)
+    key = (cells[:, 0] * grid + cells[:, 1]) * grid + cells[:, 2]
+    dist = (((xyz - lo) / size * grid - (cells + 0.5)) ** 2).sum(axis=1)
+    order = np.lexsort((dist, key))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = key[order][1:] != key[order][:-1]
+    keep = np.zeros(len(points), dtype=bool)
+    keep[order[first]] = True
+    return keep
+
+
+class OctreeBuilder:
+    """Builds and writes octree nodes; `nodes` collects their index entries."""
+
+    def __init__(self, out: Path, lo: np.ndarray, size: float, grid: int, max_points: int, max_depth: int):
+        self.out = out
+        self.lo = lo
+        self.size = size
+        self.grid = grid
+        self.max_points = max_points
+        self.max_depth = max_depth
+        self.nodes: dict[str, dict] = {}
+
+    def bounds(self, name: str) -> tuple[np.ndarray, float]:
+        lo, size = self.lo, self.size
+        for digit in name[1:]:
+            lo = _child_bounds(lo, size, int(digit))
+            size /= 2
+        return lo, size
+
+    def emit(self, name: str, points: np.ndarray) -> None:
+        lo, size = self.bounds(name)
+        path = Path("nodes") / f"{name}.ply"
+        write_ply(self.out / path, points)
+        self.nodes[name] = {
+            "name": name,
+            "level": len(name) - 1,
+            "points": int(len(points)),
+            "min": lo.tolist(),
+            "max": (lo + size).tolist(),
+            "spacing": size / self.grid,
+            "file": path.as_posix(),
+        }
+
+    def merge(self, name: str, children: dict[str, np.ndarray]) -> np.ndarray:
+        """Move a grid sample of the children's points up into node `name`; emits the children."""
+        lo, size = self.bounds(name)
+        names = list(children)
+        pool = np.concatenate([children[c] for c in names])
+        keep = sample_grid(pool, lo, size, self.grid)
+        start = 0
+        for child in names:
+            n = len(children[child])
+            self.emit(child, children[child][~keep[start:start + n]])
+            start += n
+        return pool[keep]
+
+    def build(self, name: str, points: np.ndarray) -> np.ndarray:
+        """Build the subtree under `name`; emits every descendant and returns the node's own points."""
+        if len(points) <= self.max_points or len(name) - 1 >= self.max_depth:
+            return points
+        lo, size = self.bounds(name)
+        child = _octant(_cells(_xyz(points), lo, size, 2))
+        order = np.argsort(child, kind="stable")
+        counts = np.bincount(child, minlength=8)
+        children = {}
+        start = 0
+        for c in range(8):
+            if counts[c]:
+                children[f"{name}{c}"] = self.build(f"{name}{c}", points[order[start:start + counts[c]]])
+            start += counts[c]
+        return self.merge(name, children)
+
+
+def _partitions(counts: np.ndarray, max_points: int) -> list[tuple[str, int, int, int, int]]:
+    """Split the counting grid into octree nodes of at most `max_points` (or one counting cell).
+
+    Returns (name, depth, x, y, z) per partition, in cell units of that depth.
+    """
+    pyramid = [counts]
+    while pyramid[-1].shape[0] > 1:
+        c = pyramid[-1]
+        n = c.shape[0] // 2
+        pyramid.append(c.reshape(n, 2, n, 2, n, 2).sum(axis=(1, 3, 5)))
+    pyramid.reverse()  # pyramid[d] has 2^d cells per axis
+
+    parts = []
+    stack = [("r", 0, 0, 0, 0)]
+    while stack:
+        name, d, x, y, z = stack.pop()
+        total = pyramid[d][x, y, z]
+        if not total:
+            continue
+        if total <= max_points or d == len(pyramid) - 1:
+            parts.append((name, d, x, y, z))
+            continue
+        for c in range(8):
+            stack.append((f"{name}{c}", d + 1, 2 * x + (c >> 2 & 1), 2 * y + (c >> 1 & 1), 2 * z + (c & 1)))
+    return parts
+
+
+def build_octree(
+    input_path: str,
+    output_dir: str,
+    grid: int = 64,
+    max_points: int = 20_000,
+    max_depth: int = 16,
+    partition_points: int = 2_000_000,
+    chunk_size: int = DEFAULT_CHUNK,
+) -> dict:
+    """Tile `input_path` into `output_dir`/nodes/*.ply and write `output_dir`/index.json."""
+    start_time = time.perf_counter()
+    vertex = read_ply(input_path)["vertex"]
+    out = Path(output_dir)
+    if (out / "nodes").exists():
+        shutil.rmtree(out / "nodes")
+    (out / "nodes").mkdir(parents=True)
+    tmp = out / ".partitions"
+    tmp.mkdir(exist_ok=True)
+
+    chunks = [(s, min(s + chunk_size, len(vertex))) for s in range(0, len(vertex), chunk_size)]
+    lo = np.full(3, np.inf)
+    hi = np.full(3, -np.inf)
+    for s, e in chunks:
+        xyz = _xyz(vertex[s:e])
+        lo = np.minimum(lo, xyz.min(axis=0))
+        hi = np.maximum(hi, xyz.max(axis=0))
+    if not chunks:
+        lo = hi = np.zeros(3)
+    # Cubic root node, padded so points on the max faces stay inside
+    size = float((hi - lo).max()) * (1 + 1e-6) or 1.0
+
+    # Pass 1: count points per counting cell and group cells into partitions
+    n = 1 << COUNT_DEPTH
+    counts = np.zeros(n ** 3, dtype=np.int64)
+    for s, e in chunks:
+        c = _cells(_xyz(vertex[s:e]), lo, size, n)
+        counts += np.bincount((c[:, 0] * n + c[:, 1]) * n + c[:, 2], minlength=n ** 3)
+    parts = _partitions(counts.reshape(n, n, n), partition_points)
+    lookup = np.zeros((n, n, n), dtype=np.int64)
+    for i, (_, d, x, y, z) in enumerate(parts):
+        span = 1 << (COUNT_DEPTH - d)
+        lookup[x * span:(x + 1) * span, y * span:(y + 1) * span, z * span:(z + 1) * span] = i
+
+    # Pass 2: spill each chunk's points into their partition files
+    for s, e in chunks:
+        rows = np.asarray(vertex[s:e])
+        c = _cells(_xyz(rows), lo, size, n)
+        pid = lookup[c[:, 0], c[:, 1], c[:, 2]]
+        order = np.argsort(pid, kind="stable")
+        bounds = np.searchsorted(pid[order], np.arange(len(parts) + 1))
+        for i in np.flatnonzero(np.diff(bounds)):
+            with open(tmp / f"{i}.bin", "ab") as f:
+                f.write(np.ascontiguousarray(rows[order[bounds[i]:bounds[i + 1]]]).data)
+
+    # Pass 3: build each partition's subtree, keeping only the partition roots in memory
+    builder = OctreeBuilder(out, lo, size, grid, max_points, max_depth)
+    pending: dict[str, np.ndarray] = {}
+    for i, (name, *_) in enumerate(parts):
+        path = tmp / f"{i}.bin"
+        pending[name] = builder.build(name, np.fromfile(path, dtype=vertex.dtype))
+        path.unlink()
+    shutil.rmtree(tmp)
+
+    # Pass 4: sample the levels above the partitions bottom-up from their children
+    for name in sorted({p[:k] for p in pending for k in range(1, len(p))}, key=len, reverse=True):
+        children = {c: pending.pop(c) for c in [f"{name}{i}" for i in range(8)] if c in pending}
+        pending[name] = builder.merge(name, children)
+    builder.emit("r", pending.pop("r", np.empty(0, dtype=vertex.dtype)))
+
+    nodes = sorted(builder.nodes.values(), key=lambda node: (node["level"], node["name"]))
+    names = {node["name"] for node in nodes}
+    for node in nodes:
+        node["children"] = [f"{node['name']}{c}" for c in range(8) if f"{node['name']}{c}" in names]
+    fields = vertex.dtype.names
+    index = {
+        "version": 1,
+        "kind": "splats" if all(f in fields for f in SPLAT_FIELDS) else "pointcloud",
+        "source": Path(input_path).name,
+        "points": int(len(vertex)),
+        "properties": list(fields),
+        "min": lo.tolist(),
+        "max": (lo + size).tolist(),
+        "tightMax": hi.tolist(),
+        "grid": grid,
+        "depth": max(node["level"] for node in nodes),
+        "nodes": nodes,
+    }
+    (out / "index.json").write_text(json.dumps(index, indent=1))
+    elapsed = time.perf_counter() - start_time
+    print(f"✓ Tiled {len(vertex)} points into {len(nodes)} nodes (depth {index['depth']}) in {elapsed:.1f}s: {out}")
+    return index
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="point cloud or 3DGS PLY")
+    parser.add_argument("output", help="directory for index.json and nodes/")
+    parser.add_argument("--grid", type=int, default=64, help="sampling cells per axis per node")
+    parser.add_argument("--max-points", type=int, default=20_000, help="split nodes holding more points")
+    parser.add_argument("--max-depth", type=int, default=16)
+    parser.add_argument("--partition-points", type=int, default=2_000_000, help="points per in-memory partition")
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help="rows read per pass step")
+    args = parser.parse_args()
+    build_octree(args.input, args.output, args.grid, args.max_points, args.max_depth, args.partition_points, args.chunk)
@@ -2,152 +2,191 @@
 """
 Generate a demo mesh GLTF file.
 Creates the same torus knot shape for comparison.
+All attributes are built from meshgrids, so multi-million-triangle stress
+meshes (e.g. `--u-res 4000 --v-res 500`) take seconds. A `.glb` output path
+writes a single binary file; `--quantize` stores attributes with
+KHR_mesh_quantization (int16 positions, int8 normals, uint8 colors).
 """
+import argparse
 import json
 import struct
-import numpy as np
 from pathlib import Path
 
-def generate_demo_mesh_gltf(output_path: str):
-    """Generate a demo mesh GLTF file with torus knot shape."""
-    
-    np.random.seed(42)
-    
-    # Generate torus knot
-    u_res = 100
-    v_res = 20
+import numpy as np
+
+# glTF componentType / bufferView target constants
+BYTE, UNSIGNED_BYTE, SHORT, UNSIGNED_SHORT, UNSIGNED_INT, FLOAT = 5120, 5121, 5122, 5123, 5125, 5126
+ARRAY_BUFFER, ELEMENT_ARRAY_BUFFER = 34962, 34963
+
+
+def index_dtype(vertex_count: int) -> np.dtype:
+    """Smallest glTF index type for a vertex count.
+
+    The maximum value of each type is reserved for primitive restart, so uint16
+    covers at most 65535 vertices.
+    """
+    return np.dtype(np.uint16) if vertex_count <= 0xFFFF else np.dtype(np.uint32)
+
+
+def torus_knot_mesh(u_res: int = 100, v_res: int = 20):
+    """Build the demo torus knot surface.
+
+    Returns (vertices, normals, colors, indices) as flat float32 arrays
+    (xyz, xyz, rgba) and a triangle index list typed by `index_dtype`.
+    """
     p = 2
     q = 3
     r = 0.3
     R = 1.0
-    
-    vertices = []
-    normals = []
-    colors = []
-    indices = []
-    
-    for i in range(u_res):
-        u = 2 * np.pi * i / u_res
-        for j in range(v_res):
-            v = 2 * np.pi * j / v_res
-            
-            # Torus knot surface
-            x = (R + r * np.cos(v)) * np.cos(u * p) * np.cos(v)
-            y = (R + r * np.cos(v)) * np.sin(u * p) * np.cos(v)
-            z = r * np.sin(v) + r * np.sin(u * q)
-            
-            vertices.extend([x, y, z])
-            
-            # Simple normal (pointing outward)
-            nx, ny, nz = np.cos(v) * np.cos(u * p), np.cos(v) * np.sin(u * p), np.sin(v)
-            norm = np.sqrt(nx*nx + ny*ny + nz*nz) + 1e-8
-            normals.extend([nx/norm, ny/norm, nz/norm])
-            
-            # Color gradient
-            cr = (x + 1.5) / 3.0
-            cg = (y + 1.5) / 3.0
-            cb = (z + 1) / 2.0
-            colors.extend([cr, cg, cb, 1.0])
-    
-    # Generate indices for triangle mesh
-    for i in range(u_res - 1):
-        for j in range(v_res - 1):
-            v0 = i * v_res + j
-            v1 = i * v_res + (j + 1)
-            v2 = (i + 1) * v_res + j
-            v3 = (i + 1) * v_res + (j + 1)
-            
-            indices.extend([v0, v2, v1, v1, v2, v3])
-    
-    # Convert to numpy arrays
-    vertices = np.array(vertices, dtype=np.float32)
-    normals = np.array(normals, dtype=np.float32)
-    colors = np.array(colors, dtype=np.float32)
-    indices = np.array(indices, dtype=np.uint16)
-    
-    # Create binary buffer
-    buffer_data = bytearray()
-    buffer_data.extend(vertices.tobytes())
-    buffer_data.extend(normals.tobytes())
-    buffer_data.extend(colors.tobytes())
-    buffer_data.extend(indices.tobytes())
-    
-    # Calculate offsets
-    vertex_offset = 0
-    normal_offset = len(vertices.tobytes())
-    color_offset = normal_offset + len(normals.tobytes())
-    index_offset = color_offset + len(colors.tobytes())
-    
-    # Create GLTF JSON
+
+    # (u_res, v_res) grids; vertex i * v_res + j sits at (u_i, v_j)
+    u, v = np.meshgrid(2 * np.pi * np.arange(u_res) / u_res, 2 * np.pi * np.arange(v_res) / v_res, indexing="ij")
+
+    # Torus knot surface
+    x = (R + r * np.cos(v)) * np.cos(u * p) * np.cos(v)
+    y = (R + r * np.cos(v)) * np.sin(u * p) * np.cos(v)
+    z = r * np.sin(v) + r * np.sin(u * q)
+    vertices = np.stack([x, y, z], axis=-1)
+
+    # Simple normal (pointing outward)
+    n = np.stack([np.cos(v) * np.cos(u * p), np.cos(v) * np.sin(u * p), np.sin(v)], axis=-1)
+    normals = n / (np.sqrt((n * n).sum(axis=-1, keepdims=True)) + 1e-8)
+
+    # Color gradient
+    colors = np.stack([(x + 1.5) / 3.0, (y + 1.5) / 3.0, (z + 1) / 2.0, np.ones_like(x)], axis=-1)
+
+    # Two triangles per grid quad: (v0, v2, v1) and (v1, v2, v3)
+    i, j = np.meshgrid(np.arange(u_res - 1), np.arange(v_res - 1), indexing="ij")
+    v0 = i * v_res + j
+    v1 = v0 + 1
+    v2 = v0 + v_res
+    v3 = v2 + 1
+    indices = np.stack([v0, v2, v1, v1, v2, v3], axis=-1)
+
+    return (
+        vertices.astype(np.float32).ravel(),
+        normals.astype(np.float32).ravel(),
+        colors.astype(np.float32).ravel(),
+        indices.astype(index_dtype(u_res * v_res)).ravel(),
+    )
+
+
+def _quantize_positions(vertices: np.ndarray) -> tuple[np.ndarray, list[float], list[float]]:
+    """Normalized int16 positions padded to a 4-byte stride, plus the node (translation, scale) that undoes them."""
+    xyz = vertices.reshape(-1, 3).astype(np.float64)
+    lo, hi = xyz.min(axis=0), xyz.max(axis=0)
+    center = (lo + hi) / 2
+    half = np.maximum((hi - lo) / 2, 1e-12)
+    packed = np.zeros((len(xyz), 4), dtype=np.int16)
+    packed[:, :3] = np.rint((xyz - center) / half * 32767)
+    return packed, center.tolist(), half.tolist()
+
+
+def build_gltf(vertices, normals, colors, indices, quantize: bool = False) -> tuple[dict, bytes]:
+    """Pack mesh arrays into a glTF document and its single binary buffer."""
+    count = len(vertices) // 3
+    node: dict = {"mesh": 0}
+    views = []  # (payload, byteStride or None, target)
+    accessors = []
+
+    def add(data: np.ndarray, component: int, kind: str, target: int, count: int, stride: int | None = None, **extra):
+        views.append((np.ascontiguousarray(data).tobytes(), stride, target))
+        accessors.append({"bufferView": len(views) - 1, "componentType": component, "count": count, "type": kind, **extra})
+        return len(accessors) - 1
+
+    if quantize:
+        packed, translation, scale = _quantize_positions(vertices)
+        node.update(translation=translation, scale=scale)
+        position = add(packed, SHORT, "VEC3", ARRAY_BUFFER, stride=8, count=count, normalized=True,
+                       min=packed[:, :3].min(axis=0).tolist(), max=packed[:, :3].max(axis=0).tolist())
+        n8 = np.zeros((count, 4), dtype=np.int8)
+        n8[:, :3] = np.rint(np.clip(normals.reshape(-1, 3), -1, 1) * 127)
+        normal = add(n8, BYTE, "VEC3", ARRAY_BUFFER, stride=4, count=count, normalized=True)
+        c8 = np.rint(np.clip(colors.reshape(-1, 4), 0, 1) * 255).astype(np.uint8)
+        color = add(c8, UNSIGNED_BYTE, "VEC4", ARRAY_BUFFER, count=count, normalized=True)
+    else:
+        xyz = vertices.reshape(-1, 3)
+        position = add(vertices, FLOAT, "VEC3", ARRAY_BUFFER, count=count,
+                       max=xyz.max(axis=0).astype(float).tolist(), min=xyz.min(axis=0).astype(float).tolist())
+        normal = add(normals, FLOAT, "VEC3", ARRAY_BUFFER, count=count)
+        color = add(colors, FLOAT, "VEC4", ARRAY_BUFFER, count=count)
+    component = UNSIGNED_INT if indices.dtype == np.uint32 else UNSIGNED_SHORT
+    index = add(indices, component, "SCALAR", ELEMENT_ARRAY_BUFFER, count=len(indices))
+
+    buffer = bytearray()
+    buffer_views = []
+    for data, stride, target in views:
+        buffer.extend(b"\0" * (-len(buffer) % 4))  # keep every view 4-byte aligned
+        view = {"buffer": 0, "byteOffset": len(buffer), "byteLength": len(data), "target": target}
+        if stride:
+            view["byteStride"] = stride
+        buffer_views.append(view)
+        buffer.extend(data)
+
     gltf = {
         "asset": {"version": "2.0"},
         "scene": 0,
         "scenes": [{"nodes": [0]}],
-        "nodes": [{"mesh": 0}],
+        "nodes": [node],
         "meshes": [{
             "primitives": [{
                 "attributes": {
-                    "POSITION": 0,
-                    "NORMAL": 1,
-                    "COLOR_0": 2
+                    "POSITION": position,
+                    "NORMAL": normal,
+                    "COLOR_0": color
                 },
-                "indices": 3,
+                "indices": index,
                 "mode": 4
             }]
         }],
-        "accessors": [
-            {
-                "bufferView": 0,
-                "componentType": 5126,
-                "count": len(vertices) // 3,
-                "type": "VEC3",
-                "max": [float(vertices[0::3].max()), float(vertices[1::3].max()), float(vertices[2::3].max())],
-                "min": [float(vertices[0::3].min()), float(vertices[1::3].min()), float(vertices[2::3].min())]
-            },
-            {
-                "bufferView": 1,
-                "componentType": 5126,
-                "count": len(normals) // 3,
-                "type": "VEC3"
-            },
-            {
-                "bufferView": 2,
-                "componentType": 5126,
-                "count": len(colors) // 4,
-                "type": "VEC4"
-            },
-            {
-                "bufferView": 3,
-                "componentType": 5123,
-                "count": len(indices),
-                "type": "SCALAR"
-            }
-        ],
-        "bufferViews": [
-            {"buffer": 0, "byteOffset": vertex_offset, "byteLength": len(vertices.tobytes()), "target": 34962},
-            {"buffer": 0, "byteOffset": normal_offset, "byteLength": len(normals.tobytes()), "target": 34962},
-            {"buffer": 0, "byteOffset": color_offset, "byteLength": len(colors.tobytes()), "target": 34962},
-            {"buffer": 0, "byteOffset": index_offset, "byteLength": len(indices.tobytes()), "target": 34963}
-        ],
-        "buffers": [{
-            "uri": "demo-mesh.bin",
-            "byteLength": len(buffer_data)
-        }]
+        "accessors": accessors,
+        "bufferViews": buffer_views,
+        "buffers": [{"byteLength": len(buffer)}],
     }
-    
-    # Write files
+    if quantize:
+        gltf["extensionsUsed"] = gltf["extensionsRequired"] = ["KHR_mesh_quantization"]
+    return gltf, bytes(buffer)
+
+
+def write_glb(path: Path, gltf: dict, buffer: bytes) -> None:
+    """Write a single-file binary glTF: header, JSON chunk, BIN chunk (each 4-byte padded)."""
+    text = json.dumps(gltf, separators=(",", ":")).encode("utf-8")
+    text += b" " * (-len(text) % 4)
+    buffer += b"\0" * (-len(buffer) % 4)
+    total = 12 + 8 + len(text) + 8 + len(buffer)
+    with open(path, "wb") as f:
+        f.write(struct.pack("<4sII", b"glTF", 2, total))
+        f.write(struct.pack("<I4s", len(text), b"JSON"))
+        f.write(text)
+        f.write(struct.pack("<I4s", len(buffer), b"BIN\0"))
+        f.write(buffer)
+
+
+def generate_demo_mesh_gltf(output_path: str, u_res: int = 100, v_res: int = 20, quantize: bool = False):
+    """Generate a demo mesh GLTF (or GLB, by suffix) file with torus knot shape."""
+    vertices, normals, colors, indices = torus_knot_mesh(u_res, v_res)
+    gltf, buffer = build_gltf(vertices, normals, colors, indices, quantize)
+
     output_path = Path(output_path)
-    bin_path = output_path.with_suffix('.bin')
-    
-    with open(output_path, 'w') as f:
-        json.dump(gltf, f, indent=2)
-    
-    with open(bin_path, 'wb') as f:
-        f.write(buffer_data)
-    
-    print(f"✓ Generated mesh: {output_path} and {bin_path}")
+    if output_path.suffix.lower() == ".glb":
+        write_glb(output_path, gltf, buffer)
+        print(f"✓ Generated mesh: {output_path}")
+    else:
+        bin_path = output_path.with_suffix('.bin')
+        gltf["buffers"][0]["uri"] = bin_path.name
+        with open(output_path, 'w') as f:
+            json.dump(gltf, f, indent=2)
+        with open(bin_path, 'wb') as f:
+            f.write(buffer)
+        print(f"✓ Generated mesh: {output_path} and {bin_path}")
+    print(f"  {len(vertices) // 3} vertices, {len(indices) // 3} triangles, {indices.dtype} indices")
+
 
 if __name__ == '__main__':
-    import sys
-    output = sys.argv[1] if len(sys.argv) > 1 else 'public/assets/demo-mesh.gltf'
-    generate_demo_mesh_gltf(output)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("output", nargs="?", default="public/assets/demo-mesh.gltf")
+    parser.add_argument("--u-res", type=int, default=100, help="segments along the knot")
+    parser.add_argument("--v-res", type=int, default=20, help="segments around the tube")
+    parser.add_argument("--quantize", action="store_true", help="KHR_mesh_quantization attributes")
+    args = parser.parse_args()
+    generate_demo_mesh_gltf(args.output, args.u_res, args.v_res, args.quantize)
@@ -2,58 +2,72 @@
 """
 Generate a demo point cloud .ply file.
 Creates the same shape as the Gaussian splats for comparison.
+Points are generated and written in chunks, so tens of millions of points
+fit in bounded memory.
 """
-import struct
+import argparse
+import sys
+from pathlib import Path
+
 import numpy as np
 
-def generate_demo_pointcloud_ply(output_path: str, num_points: int = 10000):
-    """Generate a demo point cloud PLY file with the same torus knot shape."""
-    
-    np.random.seed(42)
-    
-    # Positions - create a torus knot shape (same as splats)
-    t = np.linspace(0, 2 * np.pi, num_points)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "server" / "nerf-proxy"))
+from ply_io import DEFAULT_CHUNK, FORMATS, PlyWriter  # noqa: E402
+
+POINT_DTYPE = np.dtype([
+    ("x", "<f4"), ("y", "<f4"), ("z", "<f4"),
+    ("red", "u1"), ("green", "u1"), ("blue", "u1"),
+])
+
+
+def torus_knot_points(start: int, stop: int, num_points: int, rng: np.random.RandomState) -> np.ndarray:
+    """Rows [start, stop) of a `num_points` torus knot; `rng` must be consumed in order."""
     p = 2
     q = 3
     r = 0.5
     R = 1.0
-    
+
+    # Same samples as np.linspace(0, 2 * pi, num_points)[start:stop]
+    t = np.arange(start, stop) * (2 * np.pi / max(num_points - 1, 1))
+    if stop == num_points and num_points > 1:
+        t[-1] = 2 * np.pi
+
     x = (R + r * np.cos(q * t)) * np.cos(p * t)
     y = (R + r * np.cos(q * t)) * np.sin(p * t)
     z = r * np.sin(q * t)
-    
+
+    rows = np.empty(stop - start, dtype=POINT_DTYPE)
     positions = np.stack([x, y, z], axis=1).astype(np.float32)
-    positions += np.random.randn(*positions.shape).astype(np.float32) * 0.05
-    
+    positions += rng.randn(*positions.shape).astype(np.float32) * 0.05
+    rows["x"], rows["y"], rows["z"] = positions.T
+
     # Colors (RGB) - same gradient as splats
-    colors = np.zeros((num_points, 3), dtype=np.uint8)
-    colors[:, 0] = np.clip((x + 1.5) / 3.0 * 255, 0, 255).astype(np.uint8)
-    colors[:, 1] = np.clip((y + 1.5) / 3.0 * 255, 0, 255).astype(np.uint8)
-    colors[:, 2] = np.clip((z + 1) / 2.0 * 255, 0, 255).astype(np.uint8)
-    
-    # Write PLY file
-    with open(output_path, 'wb') as f:
-        header = f"""ply
-format binary_little_endian 1.0
-element vertex {num_points}
-property float x
-property float y
-property float z
-property uchar red
-property uchar green
-property uchar blue
-end_header
-"""
-        f.write(header.encode('ascii'))
-        
-        # Write binary data
-        for i in range(num_points):
-            f.write(struct.pack('fff', positions[i, 0], positions[i, 1], positions[i, 2]))
-            f.write(struct.pack('BBB', colors[i, 0], colors[i, 1], colors[i, 2]))
-    
+    rows["red"] = np.clip((x + 1.5) / 3.0 * 255, 0, 255).astype(np.uint8)
+    rows["green"] = np.clip((y + 1.5) / 3.0 * 255, 0, 255).astype(np.uint8)
+    rows["blue"] = np.clip((z + 1) / 2.0 * 255, 0, 255).astype(np.uint8)
+    return rows
+
+
+def generate_demo_pointcloud_ply(
+    output_path: str,
+    num_points: int = 10000,
+    fmt: str = "binary_little_endian",
+    chunk_size: int = DEFAULT_CHUNK,
+):
+    """Generate a demo point cloud PLY file with the same torus knot shape."""
+    rng = np.random.RandomState(42)
+    with PlyWriter(output_path, POINT_DTYPE, num_points, fmt) as ply:
+        for start in range(0, num_points, chunk_size):
+            ply.write(torus_knot_points(start, min(start + chunk_size, num_points), num_points, rng))
+
     print(f"✓ Generated point cloud with {num_points} points: {output_path}")
 
+
 if __name__ == '__main__':
-    import sys
-    output = sys.argv[1] if len(sys.argv) > 1 else 'public/assets/demo-pointcloud.ply'
-    generate_demo_pointcloud_ply(output, num_points=10000)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("output", nargs="?", default="public/assets/demo-pointcloud.ply")
+    parser.add_argument("--points", type=int, default=10000)
+    parser.add_argument("--format", choices=FORMATS, default="binary_little_endian")
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help="points generated per write")
+    args = parser.parse_args()
+    generate_demo_pointcloud_ply(args.output, args.points, args.format, args.chunk)
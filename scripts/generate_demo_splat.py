@@ -2,108 +2,116 @@
 """
 Generate a simple demo Gaussian Splat .ply file.
 This creates a simple 3D scene (like a cube or sphere) using Gaussian splats.
+Splats are generated and written in chunks, so tens of millions of splats
+fit in bounded memory. `--compressed` writes the quantized layout from
+splat_compression.py instead and prints its error report.
 """
-import struct
+import argparse
+import sys
+from pathlib import Path
+
 import numpy as np
 
-def generate_demo_splat_ply(output_path: str, num_splats: int = 5000):
-    """Generate a demo Gaussian splat PLY file with a simple 3D shape."""
-    
-    # Create splats in a cube/sphere arrangement
-    np.random.seed(42)
-    
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "server" / "nerf-proxy"))
+from ply_io import DEFAULT_CHUNK, FORMATS, PlyWriter  # noqa: E402
+
+from splat_compression import (  # noqa: E402
+    CHUNK_SIZE, SH_C0, CompressedSplatWriter, SplatErrorReport, print_size_report, sh_rest_count, splat_dtype,
+)
+
+# 3DGS vertex layout (SH degree 0)
+SPLAT_DTYPE = splat_dtype(0)
+
+
+def torus_knot_splats(start: int, stop: int, num_splats: int, rng: np.random.RandomState, sh_degree: int = 0) -> np.ndarray:
+    """Rows [start, stop) of a `num_splats` torus knot; `rng` must be consumed in order.
+
+    With `sh_degree > 0` the higher-order SH coefficients get a smooth,
+    deterministic view-dependent tint so compressed output has real data to encode.
+    """
     # Positions - create a torus knot shape
-    t = np.linspace(0, 2 * np.pi, num_splats)
     p = 2
     q = 3
     r = 0.5
     R = 1.0
-    
+
+    # Same samples as np.linspace(0, 2 * pi, num_splats)[start:stop]
+    t = np.arange(start, stop) * (2 * np.pi / max(num_splats - 1, 1))
+    if stop == num_splats and num_splats > 1:
+        t[-1] = 2 * np.pi
+
     x = (R + r * np.cos(q * t)) * np.cos(p * t)
     y = (R + r * np.cos(q * t)) * np.sin(p * t)
     z = r * np.sin(q * t)
-    
+
     positions = np.stack([x, y, z], axis=1).astype(np.float32)
-    
     # Add some noise to make it look more organic
-    positions += np.random.randn(*positions.shape).astype(np.float32) * 0.05
-    
+    positions += rng.randn(*positions.shape).astype(np.float32) * 0.05
+
     # Normals (pointing outward)
     normals = positions / (np.linalg.norm(positions, axis=1, keepdims=True) + 1e-8)
-    normals = normals.astype(np.float32)
-    
+
     # Colors (RGB) - gradient based on position
-    colors = np.zeros((num_splats, 3), dtype=np.uint8)
-    colors[:, 0] = np.clip((x + 1.5) / 3.0 * 255, 0, 255).astype(np.uint8)  # R
-    colors[:, 1] = np.clip((y + 1.5) / 3.0 * 255, 0, 255).astype(np.uint8)  # G
-    colors[:, 2] = np.clip((z + 1) / 2.0 * 255, 0, 255).astype(np.uint8)    # B
-    
+    colors = np.stack([
+        np.clip((x + 1.5) / 3.0 * 255, 0, 255).astype(np.uint8),  # R
+        np.clip((y + 1.5) / 3.0 * 255, 0, 255).astype(np.uint8),  # G
+        np.clip((z + 1) / 2.0 * 255, 0, 255).astype(np.uint8),    # B
+    ], axis=1)
+
+    rows = np.zeros(stop - start, dtype=splat_dtype(sh_degree))
+    rows["x"], rows["y"], rows["z"] = positions.T
+    rows["nx"], rows["ny"], rows["nz"] = normals.T
+    # Spherical harmonics, degree 0 only: SH_DC = (color / 255 - 0.5) / C0
+    sh_dc = (colors / 255.0 - 0.5) / SH_C0
+    rows["f_dc_0"], rows["f_dc_1"], rows["f_dc_2"] = sh_dc.T
+    # f_rest_* are channel-major: all R coefficients, then G, then B
+    per_channel = sh_rest_count(sh_degree) // 3
+    for channel in range(3):
+        for k in range(per_channel):
+            rows[f"f_rest_{channel * per_channel + k}"] = 0.3 / (k + 1) * np.sin((k + 1) * t + channel)
     # Opacity (alpha) - all opaque
-    opacity = np.ones((num_splats, 1), dtype=np.float32)
-    
-    # Scale (log scale for Gaussians) - small uniform splats
-    scale = np.ones((num_splats, 3), dtype=np.float32) * -3.0  # exp(-3) ≈ 0.05
-    
-    # Rotation (as quaternion) - no rotation, all identity quaternions
-    rotation = np.zeros((num_splats, 4), dtype=np.float32)
-    rotation[:, 0] = 1.0  # w component
-    
-    # Spherical harmonics (for view-dependent appearance) - all zeros for simple lambertian
-    # SH degree 0: DC component (1 coefficient per channel = 3 total)
-    # For simplicity, we'll use degree 0 only
-    sh_dc = np.zeros((num_splats, 3), dtype=np.float32)
-    # Convert RGB colors to SH DC component
-    # SH_DC = (color / 255 - 0.5) / 0.28209479177387814
-    C0 = 0.28209479177387814
-    sh_dc[:, 0] = (colors[:, 0] / 255.0 - 0.5) / C0
-    sh_dc[:, 1] = (colors[:, 1] / 255.0 - 0.5) / C0
-    sh_dc[:, 2] = (colors[:, 2] / 255.0 - 0.5) / C0
-    
-    # Write PLY file
-    with open(output_path, 'wb') as f:
-        # PLY Header
-        header = f"""ply
-format binary_little_endian 1.0
-element vertex {num_splats}
-property float x
-property float y
-property float z
-property float nx
-property float ny
-property float nz
-property float f_dc_0
-property float f_dc_1
-property float f_dc_2
-property float opacity
-property float scale_0
-property float scale_1
-property float scale_2
-property float rot_0
-property float rot_1
-property float rot_2
-property float rot_3
-end_header
-"""
-        f.write(header.encode('ascii'))
-        
-        # Write binary data
-        for i in range(num_splats):
-            # Position
-            f.write(struct.pack('fff', positions[i, 0], positions[i, 1], positions[i, 2]))
-            # Normal
-            f.write(struct.pack('fff', normals[i, 0], normals[i, 1], normals[i, 2]))
-            # SH DC (color)
-            f.write(struct.pack('fff', sh_dc[i, 0], sh_dc[i, 1], sh_dc[i, 2]))
-            # Opacity
-            f.write(struct.pack('f', opacity[i, 0]))
-            # Scale
-            f.write(struct.pack('fff', scale[i, 0], scale[i, 1], scale[i, 2]))
-            # Rotation (quaternion)
-            f.write(struct.pack('ffff', rotation[i, 0], rotation[i, 1], rotation[i, 2], rotation[i, 3]))
-    
+    rows["opacity"] = 1.0
+    # Scale (log scale for Gaussians) - small uniform splats, exp(-3) ≈ 0.05
+    rows["scale_0"] = rows["scale_1"] = rows["scale_2"] = -3.0
+    # Rotation (as quaternion, w first) - identity
+    rows["rot_0"] = 1.0
+    return rows
+
+
+def generate_demo_splat_ply(
+    output_path: str,
+    num_splats: int = 5000,
+    fmt: str = "binary_little_endian",
+    chunk_size: int = DEFAULT_CHUNK,
+    sh_degree: int = 0,
+    compressed: bool = False,
+):
+    """Generate a demo Gaussian splat PLY file with a simple 3D shape."""
+    rng = np.random.RandomState(42)
+    if compressed:
+        # Every write but the last must be whole compression chunks
+        chunk_size = max(CHUNK_SIZE, chunk_size // CHUNK_SIZE * CHUNK_SIZE)
+        report = SplatErrorReport()
+        writer = CompressedSplatWriter(output_path, num_splats, sh_degree, report)
+    else:
+        writer = PlyWriter(output_path, splat_dtype(sh_degree), num_splats, fmt)
+    with writer:
+        for start in range(0, num_splats, chunk_size):
+            writer.write(torus_knot_splats(start, min(start + chunk_size, num_splats), num_splats, rng, sh_degree))
+
     print(f"✓ Generated Gaussian splat with {num_splats} splats: {output_path}")
+    if compressed:
+        print_size_report(num_splats * splat_dtype(sh_degree).itemsize, output_path, num_splats)
+        print(report.format())
+
 
 if __name__ == '__main__':
-    import sys
-    output = sys.argv[1] if len(sys.argv) > 1 else 'public/assets/demo-splat.ply'
-    generate_demo_splat_ply(output, num_splats=5000)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("output", nargs="?", default="public/assets/demo-splat.ply")
+    parser.add_argument("--splats", type=int, default=5000)
+    parser.add_argument("--format", choices=FORMATS, default="binary_little_endian")
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help="splats generated per write")
+    parser.add_argument("--sh-degree", type=int, choices=range(4), default=0, help="spherical harmonics degree")
+    parser.add_argument("--compressed", action="store_true", help="write the quantized .compressed.ply layout")
+    args = parser.parse_args()
+    generate_demo_splat_ply(args.output, args.splats, args.format, args.chunk, args.sh_degree, args.compressed)
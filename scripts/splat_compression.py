@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Compressed Gaussian splat PLYs (the PlayCanvas / SuperSplat `.compressed.ply` layout).
+
+Splats are grouped in chunks of 256. Each chunk stores float bounds for
+position, log-scale and base color; each splat stores four uint32 words:
+
+- packed_position: x/y/z normalized to the chunk bounds, 11/10/11 bits
+- packed_rotation: smallest-three quaternion, 2-bit index of the dropped
+  (largest) component + three 10-bit components
+- packed_scale: log-space scale normalized to the chunk bounds, 11/10/11 bits
+- packed_color: base color (SH DC) normalized to the chunk bounds + opacity
+  (sigmoid), 8 bits each
+
+Higher-order SH coefficients, if any, go in an `sh` element as one uchar per
+coefficient over [-4, 4). That is 16 bytes per splat for degree 0 versus 68
+for the float 3DGS layout written by generate_demo_splat.py.
+
+    python scripts/splat_compression.py compress in.ply out.compressed.ply
+    python scripts/splat_compression.py decompress in.compressed.ply out.ply
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "server" / "nerf-proxy"))
+from ply_io import DEFAULT_CHUNK, PlyWriter, format_header, read_ply  # noqa: E402
+
+CHUNK_SIZE = 256
+SH_C0 = 0.28209479177387814
+# Log-scales are clamped to this range before quantization
+SCALE_RANGE = (-20.0, 20.0)
+CHUNK_DTYPE = np.dtype([(f"{m}_{a}", "<f4") for m in ("min", "max") for a in "xyz"]
+                       + [(f"{m}_scale_{a}", "<f4") for m in ("min", "max") for a in "xyz"]
+                       + [(f"{m}_{c}", "<f4") for m in ("min", "max") for c in "rgb"])
+PACKED_DTYPE = np.dtype([(name, "<u4") for name in ("packed_position", "packed_rotation", "packed_scale", "packed_color")])
+
+
+def sh_rest_count(degree: int) -> int:
+    """Number of f_rest_* properties for an SH degree (3 channels, no DC)."""
+    return 3 * ((degree + 1) ** 2 - 1)
+
+
+def sh_degree_of(dtype: np.dtype) -> int:
+    """Infer the SH degree from the f_rest_* fields of a splat dtype."""
+    rest = sum(1 for name in dtype.names if name.startswith("f_rest_"))
+    for degree in range(4):
+        if sh_rest_count(degree) == rest:
+            return degree
+    raise ValueError(f"{rest} f_rest_* properties do not match an SH degree")
+
+
+def splat_dtype(sh_degree: int = 0) -> np.dtype:
+    """Float 3DGS vertex layout for an SH degree, in the order 3DGS tools write it."""
+    return np.dtype(
+        [(name, "<f4") for name in ("x", "y", "z", "nx", "ny", "nz")]
+        + [(f"f_dc_{i}", "<f4") for i in range(3)]
+        + [(f"f_rest_{i}", "<f4") for i in range(sh_rest_count(sh_degree))]
+        + [("opacity", "<f4")]
+        + [(f"scale_{i}", "<f4") for i in range(3)]
+        + [(f"rot_{i}", "<f4") for i in range(4)]
+    )
+
+
+def _columns(rows: np.ndarray, names) -> np.ndarray:
+    return np.stack([rows[n] for n in names], axis=1).astype(np.float64)
+
+
+def _unorm(values: np.ndarray, bits: int) -> np.ndarray:
+    scale = (1 << bits) - 1
+    return np.clip(np.rint(values * scale), 0, scale).astype(np.uint32)
+
+
+def _chunk_bounds(values: np.ndarray, starts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    return np.minimum.reduceat(values, starts, axis=0), np.maximum.reduceat(values, starts, axis=0)
+
+
+def _normalize(values: np.ndarray, lo: np.ndarray, hi: np.ndarray, chunk: np.ndarray) -> np.ndarray:
+    """Map values into [0, 1] against their chunk's bounds; degenerate ranges map to 0."""
+    span = (hi - lo)[chunk]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(span > 0, (values - lo[chunk]) / span, 0.0)
+
+
+def _pack_111011(unit: np.ndarray) -> np.ndarray:
+    return (_unorm(unit[:, 0], 11) << 21) | (_unorm(unit[:, 1], 10) << 11) | _unorm(unit[:, 2], 11)
+
+
+def _unpack_111011(packed: np.ndarray) -> np.ndarray:
+    return np.stack([
+        (packed >> 21 & 2047) / 2047.0,
+        (packed >> 11 & 1023) / 1023.0,
+        (packed & 2047) / 2047.0,
+    ], axis=1)
+
+
+def pack_rotation(q: np.ndarray) -> np.ndarray:
+    """Smallest-three encoding of (N, 4) quaternions (rot_0..rot_3), normalized first."""
+    q = q / np.linalg.norm(q, axis=1, keepdims=True)
+    largest = np.abs(q).argmax(axis=1)
+    n = np.arange(len(q))
+    q = q * np.where(q[n, largest] < 0, -1.0, 1.0)[:, None]
+    # The three remaining components, in order, lie in [-1/sqrt(2), 1/sqrt(2)]
+    keep = np.array([[1, 2, 3], [0, 2, 3], [0, 1, 3], [0, 1, 2]])[largest]
+    rest = q[n[:, None], keep] / np.sqrt(2) + 0.5
+    return (largest.astype(np.uint32) << 30) | (_unorm(rest[:, 0], 10) << 20) | (_unorm(rest[:, 1], 10) << 10) | _unorm(rest[:, 2], 10)
+
+
+def unpack_rotation(packed: np.ndarray) -> np.ndarray:
+    rest = np.stack([packed >> 20 & 1023, packed >> 10 & 1023, packed & 1023], axis=1) / 1023.0
+    rest = (rest - 0.5) * np.sqrt(2)
+    largest = np.sqrt(np.maximum(0.0, 1.0 - (rest ** 2).sum(axis=1)))
+    which = (packed >> 30).astype(np.int64)
+    q = np.empty((len(packed), 4))
+    n = np.arange(len(packed))
+    keep = np.array([[1, 2, 3], [0, 2, 3], [0, 1, 3], [0, 1, 2]])[which]
+    q[n, which] = largest
+    q[n[:, None], keep] = rest
+    return q
+
+
+def compress_splats(rows: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray | None]:
+    """Encode float 3DGS rows into (chunk, vertex, sh) element arrays.
+
+    Chunks are consecutive runs of CHUNK_SIZE rows, so spatially coherent input
+    order (e.g. `morton_order`) gives tighter bounds and smaller errors.
+    """
+    n = len(rows)
+    starts = np.arange(0, n, CHUNK_SIZE)
+    chunk = np.arange(n) // CHUNK_SIZE
+    chunks = np.zeros(len(starts), dtype=CHUNK_DTYPE)
+    packed = np.zeros(n, dtype=PACKED_DTYPE)
+
+    xyz = _columns(rows, "xyz")
+    scale = np.clip(_columns(rows, ("scale_0", "scale_1", "scale_2")), *SCALE_RANGE)
+    color = _columns(rows, ("f_dc_0", "f_dc_1", "f_dc_2")) * SH_C0 + 0.5
+    for values, (lo_names, hi_names), field in (
+        (xyz, (("min_x", "min_y", "min_z"), ("max_x", "max_y", "max_z")), "packed_position"),
+        (scale, (("min_scale_x", "min_scale_y", "min_scale_z"), ("max_scale_x", "max_scale_y", "max_scale_z")), "packed_scale"),
+        (color, (("min_r", "min_g", "min_b"), ("max_r", "max_g", "max_b")), None),
+    ):
+        lo, hi = _chunk_bounds(values, starts)
+        # Round-trip the bounds through float32 so encoder and decoder agree exactly
+        for i in range(3):
+            chunks[lo_names[i]], chunks[hi_names[i]] = lo[:, i], hi[:, i]
+        lo = _columns(chunks, lo_names)
+        hi = _columns(chunks, hi_names)
+        unit = _normalize(values, lo, hi, chunk)
+        if field:
+            packed[field] = _pack_111011(unit)
+        else:
+            alpha = 1.0 / (1.0 + np.exp(-rows["opacity"].astype(np.float64)))
+            packed["packed_color"] = (_unorm(unit[:, 0], 8) << 24) | (_unorm(unit[:, 1], 8) << 16) | (_unorm(unit[:, 2], 8) << 8) | _unorm(alpha, 8)
+    packed["packed_rotation"] = pack_rotation(_columns(rows, ("rot_0", "rot_1", "rot_2", "rot_3")))
+
+    rest = [name for name in rows.dtype.names if name.startswith("f_rest_")]
+    sh = None
+    if rest:
+        sh = np.zeros(n, dtype=[(name, "u1") for name in rest])
+        for name in rest:
+            sh[name] = np.clip(np.floor((rows[name].astype(np.float64) / 8 + 0.5) * 256), 0, 255)
+    return chunks, packed, sh
+
+
+def decompress_splats(chunks: np.ndarray, packed: np.ndarray, sh: np.ndarray | None = None, first: int = 0) -> np.ndarray:
+    """Decode compressed elements back to float 3DGS rows (normals are zero).
+
+    `packed` (and `sh`) may be a slice of the vertex element starting at row
+    `first`, which must be a multiple of CHUNK_SIZE; `chunks` is always the whole
+    chunk element.
+    """
+    degree = sh_degree_of(sh.dtype) if sh is not None else 0
+    rows = np.zeros(len(packed), dtype=splat_dtype(degree))
+    chunk = (first + np.arange(len(packed))) // CHUNK_SIZE
+    c = np.asarray(chunks[chunk[0]:chunk[-1] + 1]) if len(packed) else chunks[:0]
+    local = chunk - (chunk[0] if len(packed) else 0)
+
+    def lerp(unit, lo_names, hi_names):
+        lo = _columns(c, lo_names)[local]
+        hi = _columns(c, hi_names)[local]
+        return lo + unit * (hi - lo)
+
+    xyz = lerp(_unpack_111011(packed["packed_position"]), ("min_x", "min_y", "min_z"), ("max_x", "max_y", "max_z"))
+    rows["x"], rows["y"], rows["z"] = xyz.T
+    scale = lerp(_unpack_111011(packed["packed_scale"]), ("min_scale_x", "min_scale_y", "min_scale_z"), ("max_scale_x", "max_scale_y", "max_scale_z"))
+    rows["scale_0"], rows["scale_1"], rows["scale_2"] = scale.T
+    q = unpack_rotation(packed["packed_rotation"])
+    rows["rot_0"], rows["rot_1"], rows["rot_2"], rows["rot_3"] = q.T
+
+    word = packed["packed_color"]
+    unit = np.stack([word >> 24 & 255, word >> 16 & 255, word >> 8 & 255], axis=1) / 255.0
+    color = lerp(unit, ("min_r", "min_g", "min_b"), ("max_r", "max_g", "max_b"))
+    rows["f_dc_0"], rows["f_dc_1"], rows["f_dc_2"] = ((color - 0.5) / SH_C0).T
+    alpha = np.clip((word & 255) / 255.0, 1e-6, 1 - 1e-6)
+    rows["opacity"] = -np.log(1.0 / alpha - 1.0)
+
+    if sh is not None:
+        for name in sh.dtype.names:
+            v = sh[name].astype(np.float64)
+            rows[name] = np.where(v == 0, -4.0, ((v + 0.5) / 256 - 0.5) * 8)
+    return rows
+
+
+def morton_order(rows: np.ndarray, bits: int = 10) -> np.ndarray:
+    """Indices sorting rows along a Z-order curve over their bounding box."""
+    xyz = _columns(rows, "xyz")
+    lo, hi = xyz.min(axis=0), xyz.max(axis=0)
+    cells = np.clip(((xyz - lo) / np.maximum(hi - lo, 1e-12) * (1 << bits)).astype(np.uint64), 0, (1 << bits) - 1)
+    code = np.zeros(len(rows), dtype=np.uint64)
+    for b in range(bits):
+        for axis in range(3):
+            code |= ((cells[:, axis] >> np.uint64(b)) & np.uint64(1)) << np.uint64(3 * b + 2 - axis)
+    return np.argsort(code, kind="stable")
+
+
+class SplatErrorReport:
+    """Accumulates reconstruction error between original and decoded rows."""
+
+    METRICS = ("position", "rotation_deg", "log_scale", "color", "opacity", "sh_rest")
+
+    def __init__(self):
+        self.count = 0
+        self.max = dict.fromkeys(self.METRICS, 0.0)
+        self.sq = dict.fromkeys(self.METRICS, 0.0)
+        self.extent_lo = np.full(3, np.inf)
+        self.extent_hi = np.full(3, -np.inf)
+
+    def _add(self, metric: str, err: np.ndarray) -> None:
+        if err.size:
+            self.max[metric] = max(self.max[metric], float(err.max()))
+            self.sq[metric] += float((err ** 2).sum() / (err.size / len(err)))
+
+    def add(self, original: np.ndarray, decoded: np.ndarray) -> None:
+        xyz = _columns(original, "xyz")
+        self.extent_lo = np.minimum(self.extent_lo, xyz.min(axis=0))
+        self.extent_hi = np.maximum(self.extent_hi, xyz.max(axis=0))
+        self._add("position", np.linalg.norm(xyz - _columns(decoded, "xyz"), axis=1))
+        q0 = _columns(original, ("rot_0", "rot_1", "rot_2", "rot_3"))
+        q0 /= np.linalg.norm(q0, axis=1, keepdims=True)
+        dot = np.abs((q0 * _columns(decoded, ("rot_0", "rot_1", "rot_2", "rot_3"))).sum(axis=1))
+        self._add("rotation_deg", np.degrees(2 * np.arccos(np.clip(dot, 0, 1))))
+        scale_names = ("scale_0", "scale_1", "scale_2")
+        self._add("log_scale", np.abs(np.clip(_columns(original, scale_names), *SCALE_RANGE) - _columns(decoded, scale_names)))
+        dc = ("f_dc_0", "f_dc_1", "f_dc_2")
+        # Base color error in 8-bit display units
+        self._add("color", np.abs(_columns(original, dc) - _columns(decoded, dc)) * SH_C0 * 255)
+        sigmoid = lambda v: 1.0 / (1.0 + np.exp(-v.astype(np.float64)))  # noqa: E731
+        self._add("opacity", np.abs(sigmoid(original["opacity"]) - sigmoid(decoded["opacity"])))
+        rest = [name for name in original.dtype.names if name.startswith("f_rest_")]
+        if rest:
+            self._add("sh_rest", np.abs(_columns(original, rest) - _columns(decoded, rest)))
+        self.count += len(original)
+
+    def summary(self) -> dict:
+        extent = float(np.max(self.extent_hi - self.extent_lo)) if self.count else 0.0
+        out = {"splats": self.count, "extent": extent}
+        for metric in self.METRICS:
+            rms = np.sqrt(self.sq[metric] / self.count) if self.count else 0.0
+            out[metric] = {"max": self.max[metric], "rms": float(rms)}
+        return out
+
+    def format(self) -> str:
+        s = self.summary()
+        lines = [f"{'metric':<14}{'max':>12}{'rms':>12}"]
+        for metric in self.METRICS:
+            lines.append(f"{metric:<14}{s[metric]['max']:>12.5g}{s[metric]['rms']:>12.5g}")
+        if s["extent"]:
+            lines.append(f"position max error = {s['position']['max'] / s['extent']:.2e} x scene extent")
+        return "\n".join(lines)
+
+
+class CompressedSplatWriter:
+    """Stream float 3DGS rows into a compressed PLY.
+
+    Rows are encoded as they arrive; every `write` but the last must hold a
+    multiple of CHUNK_SIZE rows. Chunk bounds are kept in memory (72 bytes per
+    256 splats) and the per-splat data is spooled to temporary files, because
+    the PLY stores the chunk element first.
+    """
+
+    def __init__(self, path: str | Path, count: int, sh_degree: int = 0, report: SplatErrorReport | None = None):
+        self.path = Path(path)
+        self.count = int(count)
+        self.sh_degree = sh_degree
+        self.report = report
+        self.written = 0
+        self._chunks: list[np.ndarray] = []
+        self._dir = tempfile.mkdtemp(prefix=".splat-", dir=self.path.parent)
+        self._vertex = open(os.path.join(self._dir, "vertex.bin"), "wb")
+        self._sh = open(os.path.join(self._dir, "sh.bin"), "wb") if sh_degree else None
+
+    def write(self, rows: np.ndarray) -> None:
+        if self.written % CHUNK_SIZE:
+            raise ValueError(f"Only the last write may hold a partial chunk of {CHUNK_SIZE} rows")
+        if self.written + len(rows) > self.count:
+            raise ValueError(f"Compressed splat overflow: {self.written + len(rows)} > {self.count} rows")
+        if sh_degree_of(rows.dtype) != self.sh_degree:
+            raise ValueError(f"Rows have SH degree {sh_degree_of(rows.dtype)}, writer expects {self.sh_degree}")
+        chunks, packed, sh = compress_splats(rows)
+        self._chunks.append(chunks)
+        self._vertex.write(packed.data)
+        if self._sh is not None:
+            self._sh.write(sh.data)
+        if self.report is not None:
+            self.report.add(rows, decompress_splats(chunks, packed, sh))
+        self.written += len(rows)
+
+    def close(self) -> None:
+        if self._vertex.closed:
+            return
+        self._vertex.close()
+        if self._sh is not None:
+            self._sh.close()
+        try:
+            if self.written != self.count:
+                raise ValueError(f"Declared {self.count} splats but {self.written} were written")
+            chunks = np.concatenate(self._chunks) if self._chunks else np.zeros(0, dtype=CHUNK_DTYPE)
+            elements = [("chunk", len(chunks), CHUNK_DTYPE), ("vertex", self.count, PACKED_DTYPE)]
+            if self.sh_degree:
+                elements.append(("sh", self.count, np.dtype([(f"f_rest_{i}", "u1") for i in range(sh_rest_count(self.sh_degree))])))
+            with open(self.path, "wb") as f:
+                f.write(format_header(elements))
+                f.write(chunks.data)
+                for name in ("vertex.bin", "sh.bin") if self.sh_degree else ("vertex.bin",):
+                    with open(os.path.join(self._dir, name), "rb") as part:
+                        shutil.copyfileobj(part, f, 1 << 22)
+        finally:
+            shutil.rmtree(self._dir, ignore_errors=True)
+
+    def __enter__(self) -> "CompressedSplatWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._vertex.close()
+            if self._sh is not None:
+                self._sh.close()
+            shutil.rmtree(self._dir, ignore_errors=True)
+
+
+def compress_file(input_path: str, output_path: str, chunk_size: int = DEFAULT_CHUNK) -> SplatErrorReport:
+    """Compress a float 3DGS PLY, Morton-sorting each read chunk; returns the error report."""
+    vertex = read_ply(input_path)["vertex"]
+    degree = sh_degree_of(vertex.dtype)
+    names = splat_dtype(degree).names
+    report = SplatErrorReport()
+    chunk_size = max(CHUNK_SIZE, chunk_size // CHUNK_SIZE * CHUNK_SIZE)
+    with CompressedSplatWriter(output_path, len(vertex), degree, report) as writer:
+        for start in range(0, len(vertex), chunk_size):
+            rows = np.zeros(min(chunk_size, len(vertex) - start), dtype=splat_dtype(degree))
+            block = vertex[start:start + len(rows)]
+            for name in names:
+                if name in block.dtype.names:
+                    rows[name] = block[name]
+            writer.write(rows[morton_order(rows)])
+    return report
+
+
+def decompress_file(input_path: str, output_path: str, chunk_size: int = DEFAULT_CHUNK) -> None:
+    """Expand a compressed PLY back to the float 3DGS layout."""
+    elements = read_ply(input_path)
+    chunks, packed, sh = elements["chunk"], elements["vertex"], elements.get("sh")
+    chunk_size = max(CHUNK_SIZE, chunk_size // CHUNK_SIZE * CHUNK_SIZE)
+    degree = sh_degree_of(sh.dtype) if sh is not None else 0
+    with PlyWriter(output_path, splat_dtype(degree), len(packed)) as ply:
+        for start in range(0, len(packed), chunk_size):
+            stop = start + chunk_size
+            ply.write(decompress_splats(chunks, packed[start:stop], sh[start:stop] if sh is not None else None, first=start))
+
+
+def print_size_report(original_bytes: int, compressed_path: str, splats: int) -> None:
+    size = os.path.getsize(compressed_path)
+    ratio = original_bytes / size if size else 0.0
+    print(f"  {original_bytes / 1e6:.2f} MB -> {size / 1e6:.2f} MB ({ratio:.1f}x, {size / max(splats, 1):.1f} bytes/splat)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("compress", "decompress"))
+    parser.add_argument("input")
+    parser.add_argument("output")
+    args = parser.parse_args()
+    if args.command == "compress":
+        report = compress_file(args.input, args.output)
+        print(f"✓ Compressed {report.count} splats: {args.output}")
+        print_size_report(os.path.getsize(args.input), args.output, report.count)
+        print(report.format())
+    else:
+        decompress_file(args.input, args.output)
+        print(f"✓ Decompressed: {args.output}")
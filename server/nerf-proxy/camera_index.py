@@ -0,0 +1,118 @@
+"""Spatial index over input camera poses for nearest-view selection."""
+import heapq
+
+import numpy as np
+
+
+class CameraIndex:
+    """KD-tree over camera centers, with optional view-direction re-ranking.
+
+    Positions and unit forward vectors are packed into contiguous (N, 3) arrays
+    once; queries descend the tree and only touch the leaves that can still hold
+    a closer camera, so lookups stay sub-linear for captures with thousands of views.
+    """
+
+    def __init__(self, positions: np.ndarray, forwards: np.ndarray, leaf_size: int = 16):
+        self.positions = np.ascontiguousarray(positions, dtype=np.float64).reshape(-1, 3)
+        fwd = np.asarray(forwards, dtype=np.float64).reshape(-1, 3)
+        self.forwards = np.ascontiguousarray(fwd / (np.linalg.norm(fwd, axis=1, keepdims=True) + 1e-8))
+        self.leaf_size = max(1, leaf_size)
+        self._perm = np.arange(len(self.positions))
+        # Flat node arrays: leaves have dim == -1 and own perm[lo:hi]
+        self._lo: list[int] = []
+        self._hi: list[int] = []
+        self._dim: list[int] = []
+        self._split: list[float] = []
+        self._left: list[int] = []
+        self._right: list[int] = []
+        if len(self.positions):
+            self._build(0, len(self.positions))
+
+    @classmethod
+    def from_cameras(cls, cameras: list[dict], leaf_size: int = 16) -> "CameraIndex":
+        """Build from `cameras.json`-style dicts with `position` and `target`."""
+        if not cameras:
+            return cls(np.zeros((0, 3)), np.zeros((0, 3)), leaf_size)
+        positions = np.array([c["position"] for c in cameras], dtype=np.float64)
+        targets = np.array([c["target"] for c in cameras], dtype=np.float64)
+        return cls(positions, targets - positions, leaf_size)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def _build(self, lo: int, hi: int) -> int:
+        node = len(self._lo)
+        self._lo.append(lo)
+        self._hi.append(hi)
+        self._dim.append(-1)
+        self._split.append(0.0)
+        self._left.append(-1)
+        self._right.append(-1)
+        if hi - lo <= self.leaf_size:
+            return node
+        idx = self._perm[lo:hi]
+        pts = self.positions[idx]
+        dim = int(np.argmax(pts.max(axis=0) - pts.min(axis=0)))
+        mid = (hi - lo) // 2
+        order = np.argpartition(pts[:, dim], mid)
+        self._perm[lo:hi] = idx[order]
+        self._dim[node] = dim
+        self._split[node] = float(self.positions[self._perm[lo + mid], dim])
+        self._left[node] = self._build(lo, lo + mid)
+        self._right[node] = self._build(lo + mid, hi)
+        return node
+
+    def _knn(self, query: np.ndarray, k: int) -> list[tuple[float, int]]:
+        """Return up to k (squared distance, camera index) pairs, nearest first."""
+        heap: list[tuple[float, int]] = []  # max-heap via negated distances
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            dim = self._dim[node]
+            if dim < 0:
+                idx = self._perm[self._lo[node]:self._hi[node]]
+                d2 = ((self.positions[idx] - query) ** 2).sum(axis=1)
+                for d, i in zip(d2.tolist(), idx.tolist()):
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-d, i))
+                    elif d < -heap[0][0]:
+                        heapq.heapreplace(heap, (-d, i))
+                continue
+            diff = float(query[dim]) - self._split[node]
+            near, far = (self._left[node], self._right[node]) if diff < 0 else (self._right[node], self._left[node])
+            if len(heap) < k or diff * diff < -heap[0][0]:
+                stack.append(far)
+            stack.append(near)  # popped first
+        return sorted((-d, i) for d, i in heap)
+
+    def nearest(
+        self,
+        position,
+        forward=None,
+        k: int = 1,
+        angle_weight: float = 0.0,
+        candidates: int = 8,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Return (indices, costs) of the k best cameras for a query pose.
+
+        With `angle_weight == 0` the cost is Euclidean distance between camera
+        centers. Otherwise the cost is `distance + angle_weight * angle`, where
+        angle is the radian angle between forward vectors; the `candidates * k`
+        positionally nearest cameras are re-ranked by that combined cost.
+        """
+        if not len(self.positions):
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        q = np.asarray(position, dtype=np.float64).reshape(3)
+        k = min(k, len(self.positions))
+        use_angle = forward is not None and angle_weight > 0
+        pool = self._knn(q, min(len(self.positions), k * candidates) if use_angle else k)
+        idx = np.array([i for _, i in pool], dtype=np.int64)
+        cost = np.sqrt(np.array([d for d, _ in pool]))
+        if use_angle:
+            f = np.asarray(forward, dtype=np.float64).reshape(3)
+            f = f / (np.linalg.norm(f) + 1e-8)
+            angle = np.arccos(np.clip(self.forwards[idx] @ f, -1.0, 1.0))
+            cost = cost + angle_weight * angle
+            order = np.argsort(cost, kind="stable")[:k]
+            idx, cost = idx[order], cost[order]
+        return idx, cost
@@ -0,0 +1,41 @@
+"""Keyframed camera paths sampled into per-frame poses."""
+import numpy as np
+
+INTERPOLATIONS = ("linear", "catmull_rom")
+
+
+def _catmull_rom(p0, p1, p2, p3, s: np.ndarray) -> np.ndarray:
+    """Uniform Catmull-Rom between p1 and p2 at local parameters s in [0, 1]."""
+    s = s[:, None]
+    return 0.5 * (
+        2 * p1
+        + (p2 - p0) * s
+        + (2 * p0 - 5 * p1 + 4 * p2 - p3) * s ** 2
+        + (3 * p1 - p0 - 3 * p2 + p3) * s ** 3
+    )
+
+
+def sample_path(keys: np.ndarray, frames: int, times: np.ndarray | None = None, interpolation: str = "linear") -> np.ndarray:
+    """Sample `frames` rows, evenly spaced in time, from (K, D) keyframe rows.
+
+    `times` are strictly increasing keyframe times (default: evenly spaced).
+    The first and last frames land exactly on the first and last keyframes.
+    `catmull_rom` passes through every keyframe with a continuous tangent;
+    interpolated direction vectors are left for the caller to renormalize.
+    """
+    if interpolation not in INTERPOLATIONS:
+        raise ValueError(f"Unknown interpolation {interpolation!r}")
+    keys = np.asarray(keys, dtype=np.float64)
+    if len(keys) == 1 or frames == 1:
+        return np.repeat(keys[:1], frames, axis=0)
+    times = np.arange(len(keys), dtype=np.float64) if times is None else np.asarray(times, dtype=np.float64)
+    if np.any(np.diff(times) <= 0):
+        raise ValueError("Keyframe times must be strictly increasing")
+    t = np.linspace(times[0], times[-1], frames)
+    seg = np.clip(np.searchsorted(times, t, side="right") - 1, 0, len(keys) - 2)
+    s = (t - times[seg]) / (times[seg + 1] - times[seg])
+    if interpolation == "linear":
+        return keys[seg] + (keys[seg + 1] - keys[seg]) * s[:, None]
+    # Reflect the end keyframes so the spline has neighbours on both sides
+    padded = np.concatenate([2 * keys[:1] - keys[1:2], keys, 2 * keys[-1:] - keys[-2:-1]])
+    return _catmull_rom(padded[seg], padded[seg + 1], padded[seg + 2], padded[seg + 3], s)
@@ -0,0 +1,97 @@
+"""Packed per-pixel buffers (RGB plus depth, alpha and source view) for one frame.
+
+Layout of a packed frame, all little-endian:
+
+    b"NRFB"                  magic
+    uint32                   length N of the JSON descriptor
+    N bytes                  UTF-8 JSON: {"version", "width", "height", "buffers": [...]}
+    buffers                  each starting at a multiple of 8 bytes from the start
+
+Each descriptor entry is `{"name", "dtype", "channels", "offset", "bytes"}`, plus
+the meaning of special values. Buffers are row-major, top row first, so they
+map straight onto JS typed arrays (`Uint8Array`, `Uint16Array`, `Float16Array`).
+
+- `rgb`: uint8 x 3.
+- `depth`: float16 camera-space z in scene units (meters for the demo scene), 0 where nothing was hit.
+- `alpha`: float16 coverage in [0, 1].
+- `source`: uint16 index of the input view each pixel came from, 65535 where none did.
+"""
+import json
+import struct
+import time
+
+import numpy as np
+from PIL import Image
+
+MEDIA_TYPE = "application/x-nerf-buffers"
+MAGIC = b"NRFB"
+VERSION = 1
+BUFFER_NAMES = ("depth", "alpha", "source")
+BUFFERS_PATTERN = r"^(depth|alpha|source)(,(depth|alpha|source))*$"
+NO_SOURCE = 0xFFFF
+_ALIGN = 8
+
+
+def parse_buffers(value: str | None) -> tuple[str, ...]:
+    """Comma-separated buffer names -> canonical tuple (known names, fixed order)."""
+    requested = set(value.split(",")) if value else set()
+    return tuple(name for name in BUFFER_NAMES if name in requested)
+
+
+def resize_nearest(arr: np.ndarray, width: int, height: int) -> np.ndarray:
+    """Nearest-neighbor resize of an (H, W) array; never blends depths or view ids across edges."""
+    h, w = arr.shape[:2]
+    if (w, h) == (width, height):
+        return arr
+    ys = np.minimum(((np.arange(height) + 0.5) * h / height).astype(np.int64), h - 1)
+    xs = np.minimum(((np.arange(width) + 0.5) * w / width).astype(np.int64), w - 1)
+    return arr[ys[:, None], xs[None, :]]
+
+
+def empty_buffers(width: int, height: int) -> dict[str, np.ndarray]:
+    """Buffers for a frame where nothing was hit."""
+    return {
+        "depth": np.zeros((height, width), np.float32),
+        "alpha": np.zeros((height, width), np.float32),
+        "source": np.full((height, width), NO_SOURCE, np.uint16),
+    }
+
+
+def pack_frame(pil: Image.Image, aux: dict[str, np.ndarray], names: tuple[str, ...]) -> tuple[bytes, float]:
+    """Pack RGB and the named aux buffers; returns (payload, packing time in ms) like `encode_image`."""
+    start = time.perf_counter()
+    width, height = pil.size
+    arrays = [("rgb", np.asarray(pil.convert("RGB"), dtype=np.uint8), 3, {})]
+    for name in names:
+        arr = aux.get(name)
+        if arr is None:
+            arr = empty_buffers(width, height)[name]
+        arr = resize_nearest(arr, width, height)
+        if name == "source":
+            arrays.append((name, arr.astype("<u2"), 1, {"none": NO_SOURCE}))
+        else:
+            extra = {"none": 0} if name == "depth" else {}
+            arrays.append((name, arr.astype("<f2"), 1, extra))
+
+    def layout(header_len: int) -> list[dict]:
+        entries, offset = [], header_len
+        for name, arr, channels, extra in arrays:
+            offset += -offset % _ALIGN
+            entries.append({"name": name, "dtype": arr.dtype.name, "channels": channels,
+                            "offset": offset, "bytes": arr.nbytes, **extra})
+            offset += arr.nbytes
+        return entries
+
+    # Offsets depend on the descriptor's length and vice versa; iterate until stable (two or three passes)
+    size = 0
+    while True:
+        entries = layout(len(MAGIC) + 4 + size)
+        header = json.dumps({"version": VERSION, "width": width, "height": height, "buffers": entries}).encode()
+        if len(header) == size:
+            break
+        size = len(header)
+    out = bytearray(MAGIC + struct.pack("<I", len(header)) + header)
+    for entry, (_, arr, _, _) in zip(entries, arrays):
+        out += bytes(entry["offset"] - len(out))
+        out += np.ascontiguousarray(arr).tobytes()
+    return bytes(out), (time.perf_counter() - start) * 1000.0
@@ -0,0 +1,25 @@
+"""ETag / If-None-Match helpers for responses that are pure functions of their inputs."""
+import hashlib
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag from the repr of everything the response bytes depend on."""
+    digest = hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """RFC 9110 If-None-Match check (weak comparison, `*` matches anything)."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def cache_headers(etag: str, max_age: int) -> dict[str, str]:
+    """Validator headers. With max_age 0 browsers revalidate on every use (a cheap 304)."""
+    control = f"public, max-age={max_age}" if max_age > 0 else "no-cache"
+    return {"ETag": etag, "Cache-Control": control}
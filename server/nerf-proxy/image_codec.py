@@ -0,0 +1,82 @@
+"""Output format negotiation and timed encoding for rendered frames."""
+import io
+import time
+
+from PIL import Image
+
+# Format name -> response media type. `raw` is packed 8-bit RGB rows, top to bottom.
+MEDIA_TYPES = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+    "raw": "application/octet-stream",
+}
+# Server preference when an Accept header ranks several formats equally
+PREFERENCE = ("webp", "jpeg", "png")
+DEFAULT_QUALITY = {"jpeg": 90, "webp": 90}
+# zlib level for PNG: 1 encodes several times faster than PIL's default (6)
+# for frames that are only a little larger.
+PNG_COMPRESS_LEVEL = 1
+FORMAT_PATTERN = "^(png|jpeg|webp|raw)$"
+
+
+def negotiate(fmt: str | None, accept: str | None) -> str:
+    """Pick an output format: explicit `fmt` wins, then the Accept header, then PNG.
+
+    Only explicitly listed image types are considered; wildcards such as
+    `image/*` or `*/*` keep the lossless PNG default.
+    """
+    if fmt:
+        return fmt
+    if not accept:
+        return "png"
+    by_type = {v: k for k, v in MEDIA_TYPES.items() if k != "raw"}
+    ranked: dict[str, float] = {}
+    for part in accept.split(","):
+        fields = part.strip().split(";")
+        name = by_type.get(fields[0].strip().lower())
+        if name is None:
+            continue
+        q = 1.0
+        for param in fields[1:]:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            ranked[name] = max(q, ranked.get(name, 0.0))
+    if not ranked:
+        return "png"
+    return max(ranked, key=lambda name: (ranked[name], -PREFERENCE.index(name)))
+
+
+def encode_image(pil: Image.Image, fmt: str = "png", quality: int | None = None) -> tuple[bytes, float]:
+    """Encode an RGB image; returns (payload, encode time in milliseconds)."""
+    start = time.perf_counter()
+    if fmt == "raw":
+        data = pil.convert("RGB").tobytes()
+    else:
+        buf = io.BytesIO()
+        if fmt == "png":
+            pil.save(buf, format="PNG", compress_level=PNG_COMPRESS_LEVEL)
+        elif fmt == "jpeg":
+            pil.save(buf, format="JPEG", quality=quality or DEFAULT_QUALITY["jpeg"])
+        elif fmt == "webp":
+            pil.save(buf, format="WEBP", quality=quality or DEFAULT_QUALITY["webp"], method=0)
+        else:
+            raise ValueError(f"Unsupported image format {fmt!r}")
+        data = buf.getvalue()
+    return data, (time.perf_counter() - start) * 1000.0
+
+
+def encode_headers(fmt: str, encode_ms: float | None, size: tuple[int, int]) -> dict[str, str]:
+    """Response headers describing an encoded frame."""
+    headers = {"X-Encode-Format": fmt, "Vary": "Accept"}
+    if encode_ms is not None:
+        headers["X-Encode-Ms"] = f"{encode_ms:.2f}"
+    if fmt == "raw":
+        headers["X-Image-Width"] = str(size[0])
+        headers["X-Image-Height"] = str(size[1])
+    return headers
@@ -0,0 +1,75 @@
+"""Per-image resolution pyramids with memoized resizes."""
+from collections import OrderedDict
+from threading import Lock
+
+from PIL import Image
+
+
+class ImagePyramid:
+    """Mip levels of one input image (full, 1/2, 1/4, ...) built on first use.
+
+    `resized` answers arbitrary sizes from the smallest level that is at least
+    as large as the request, so downscales read far fewer pixels than the
+    full-resolution source, and remembers the last few results.
+    """
+
+    def __init__(self, base: Image.Image, min_size: int = 16, memo_size: int = 8):
+        self.levels = [base]
+        self.min_size = min_size
+        self.memo_size = memo_size
+        self._memo: OrderedDict[tuple[int, int, float], Image.Image] = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate bytes held beyond the base image (levels and memoized resizes)."""
+        with self._lock:
+            images = {id(im): im for im in [*self.levels[1:], *self._memo.values()] if im is not self.levels[0]}
+        return sum(im.width * im.height * len(im.getbands()) for im in images.values())
+
+    def _build_levels(self) -> None:
+        while True:
+            w, h = self.levels[-1].size
+            if min(w, h) // 2 < self.min_size:
+                return
+            self.levels.append(self.levels[-1].reduce(2))
+
+    def level_for(self, width: int, height: int, snap: float = 0.0) -> tuple[Image.Image, bool]:
+        """Return (level, snapped) to serve a (width, height) request from.
+
+        With `snap > 0`, a level whose size is within that relative tolerance of
+        the request is served as-is (`snapped`). Otherwise this is the smallest
+        level at least as large as the request (the full image when upscaling).
+        """
+        with self._lock:
+            if len(self.levels) == 1:
+                self._build_levels()
+        if snap > 0:
+            for level in self.levels:
+                lw, lh = level.size
+                if abs(lw - width) <= snap * width and abs(lh - height) <= snap * height:
+                    return level, True
+        for level in reversed(self.levels):
+            lw, lh = level.size
+            if lw >= width and lh >= height:
+                return level, False
+        return self.levels[0], False
+
+    def resized(self, width: int, height: int, snap: float = 0.0) -> Image.Image:
+        """Return the image at (width, height), or a nearby level when `snap` allows."""
+        key = (width, height, snap)
+        with self._lock:
+            pil = self._memo.get(key)
+            if pil is not None:
+                self._memo.move_to_end(key)
+                return pil
+        level, snapped = self.level_for(width, height, snap)
+        if snapped or level.size == (width, height):
+            pil = level
+        else:
+            pil = level.resize((width, height), Image.BICUBIC)
+        with self._lock:
+            self._memo[key] = pil
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return pil
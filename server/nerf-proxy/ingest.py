@@ -0,0 +1,385 @@
+"""Background ingestion of captured image folders into packed scenes.
+
+A source directory holds images plus either a `cameras.json` in this
+server's format or a Nerfstudio `transforms.json`. An ingestion job:
+
+1. Reads the cameras and converts Nerfstudio frames (camera-to-world matrices,
+   OpenGL axes, focal lengths in pixels) to position/target/up/fov cameras.
+2. Reads every image header on a process pool to learn its size, skipping
+   unreadable files.
+3. Lays out the pack, preallocates it, and has the pool decode, downscale
+   (JPEG draft mode, then Lanczos) and write each image straight to its offset.
+   Pixels never travel back through the parent process.
+4. Publishes the pack and `cameras.json` into the scene directory and
+   registers the scene.
+
+Jobs run one at a time on a daemon thread, and their pool processes run at
+lower priority, so the server keeps answering requests. Progress is polled
+through `IngestJob.to_dict()`.
+"""
+import json
+import math
+import multiprocessing
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from scene_registry import PACK_FILE, PACK_INDEX, SceneRegistry, dataset_version, image_paths, pack_layout, publish_pack, read_pack_index
+
+FINISHED = ("done", "current", "error", "cancelled")
+
+
+# ---------------------------------------------------------------- cameras
+
+def _look_distance(positions: np.ndarray, forwards: np.ndarray) -> np.ndarray:
+    """Per-camera distance to the point closest to all optical axes (1.0 where undefined)."""
+    eye = np.eye(3)
+    proj = eye[None] - forwards[:, :, None] * forwards[:, None, :]
+    a = proj.sum(axis=0)
+    dist = np.ones(len(positions))
+    if len(positions) > 1 and np.linalg.cond(a) < 1e6:
+        focus = np.linalg.solve(a, (proj @ positions[:, :, None]).sum(axis=0)[:, 0])
+        d = np.einsum("ij,ij->i", focus - positions, forwards)
+        ahead = d > 1e-6
+        # Cameras looking away from the common focus (e.g. turned outwards) get a typical distance
+        dist = np.where(ahead, d, np.median(d[ahead]) if ahead.any() else 1.0)
+    return dist
+
+
+def _fov_y(frame: dict, meta: dict, size: tuple[int, int]) -> float:
+    """Vertical field of view in degrees from Nerfstudio/Blender intrinsics (frame keys override global)."""
+    get = lambda key: frame.get(key, meta.get(key))  # noqa: E731
+    w, h = get("w") or size[0], get("h") or size[1]
+    if get("fl_y"):
+        return math.degrees(2 * math.atan(h / (2 * get("fl_y"))))
+    if get("camera_angle_y"):
+        return math.degrees(get("camera_angle_y"))
+    if get("fl_x"):
+        return math.degrees(2 * math.atan(h / (2 * get("fl_x"))))
+    if get("camera_angle_x"):
+        return math.degrees(2 * math.atan(math.tan(get("camera_angle_x") / 2) * h / w))
+    raise ValueError("transforms.json has no focal length or camera angle")
+
+
+def transforms_paths(meta: dict, source: Path) -> list[Path]:
+    paths = []
+    for frame in meta["frames"]:
+        path = source / frame["file_path"]
+        # Blender synthetic scenes list paths without the extension
+        if not path.suffix and not path.exists():
+            path = path.with_suffix(".png")
+        paths.append(path)
+    return paths
+
+
+def cameras_from_transforms(frames: list[dict], meta: dict, sizes: list[tuple[int, int]]) -> list[dict]:
+    """Convert Nerfstudio frames (OpenGL camera-to-world: -Z forward, +Y up) to this server's cameras.
+
+    Principal point offsets and lens distortion are not modelled; renders assume centered pinhole cameras.
+    """
+    c2w = np.array([f["transform_matrix"] for f in frames], dtype=np.float64)[:, :3, :4]
+    positions = c2w[:, :, 3]
+    forwards = -c2w[:, :, 2] / np.linalg.norm(c2w[:, :, 2], axis=1, keepdims=True)
+    ups = c2w[:, :, 1] / np.linalg.norm(c2w[:, :, 1], axis=1, keepdims=True)
+    targets = positions + forwards * _look_distance(positions, forwards)[:, None]
+    return [
+        {
+            "position": positions[i].tolist(),
+            "target": targets[i].tolist(),
+            "up": ups[i].tolist(),
+            "fov": _fov_y(frame, meta, sizes[i]),
+        }
+        for i, frame in enumerate(frames)
+    ]
+
+
+def find_manifest(source: Path) -> Path:
+    for name in ("cameras.json", "transforms.json"):
+        if (source / name).is_file():
+            return source / name
+    raise FileNotFoundError(f"No cameras.json or transforms.json in {source}")
+
+
+# ---------------------------------------------------------------- pool work
+
+def _init_worker() -> None:
+    # Decoding is bulk work; leave the CPU to render workers when they need it
+    if hasattr(os, "nice"):
+        os.nice(10)
+
+
+def _probe(path: str) -> tuple[int, int] | None:
+    """Image size from its header, or None if the file is missing or unreadable."""
+    try:
+        with Image.open(path) as img:
+            return img.size
+    except (OSError, SyntaxError, ValueError):
+        return None
+
+
+def _decode_into(path: str, pack_path: str, offset: int, width: int, height: int) -> None:
+    with Image.open(path) as img:
+        # JPEG decodes at 1/2, 1/4 or 1/8 scale directly when that still covers the target size
+        img.draft("RGB", (width, height))
+        rgb = img.convert("RGB")
+    if rgb.size != (width, height):
+        rgb = rgb.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+    with open(pack_path, "r+b") as f:
+        f.seek(offset)
+        f.write(rgb.tobytes())
+
+
+def fit_size(width: int, height: int, max_size: int) -> tuple[int, int]:
+    """Downscaled size with the longer side at most `max_size` (0 keeps the size)."""
+    scale = max_size / max(width, height) if max_size else 1.0
+    if scale >= 1.0:
+        return width, height
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+# ---------------------------------------------------------------- jobs
+
+class IngestJob:
+    def __init__(self, scene_id: str, source: Path, out: Path, max_size: int):
+        self.id = secrets.token_hex(6)
+        self.scene_id = scene_id
+        self.source = source
+        self.out = out
+        self.max_size = max_size
+        self.state = "queued"
+        self.total = 0
+        self.done = 0
+        self.bytes = 0
+        self.skipped: list[str] = []
+        self.error: str | None = None
+        self.created = time.time()
+        self.started: float | None = None
+        self.decode_started: float | None = None
+        self.finished: float | None = None
+        self.cancel_requested = False
+
+    @property
+    def active(self) -> bool:
+        return self.state not in FINISHED
+
+    def to_dict(self) -> dict:
+        now = self.finished or time.time()
+        elapsed = now - self.started if self.started else 0.0
+        decoding = now - self.decode_started if self.decode_started else 0.0
+        rate = self.done / decoding if decoding > 0 else None
+        return {
+            "id": self.id,
+            "scene": self.scene_id,
+            "source": str(self.source),
+            "state": self.state,
+            "total": self.total,
+            "done": self.done,
+            "bytes": self.bytes,
+            "skipped": self.skipped,
+            "error": self.error,
+            "elapsed_s": round(elapsed, 3),
+            "images_per_s": round(rate, 2) if rate else None,
+            "eta_s": round((self.total - self.done) / rate, 1) if rate and self.active else None,
+        }
+
+
+class IngestCancelled(Exception):
+    pass
+
+
+class Ingester:
+    """Queue of ingestion jobs, run one at a time on a daemon thread with a process pool each.
+
+    `in_place` jobs pack an existing scene directory that has a `cameras.json`,
+    at full resolution and with the version `Scene` expects. This is the same
+    pack `Scene` would build on first request, built ahead of time and in parallel.
+    """
+
+    def __init__(self, scenes: SceneRegistry, workers: int = 1, keep: int = 100):
+        self.scenes = scenes
+        self.workers = max(1, workers)
+        self._jobs: OrderedDict[str, IngestJob] = OrderedDict()
+        self._queue: deque[tuple[IngestJob, bool]] = deque()
+        self._keep = keep
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._thread: threading.Thread | None = None
+        self.ingested = 0
+        self.images = 0
+
+    def submit(self, scene_id: str, source: Path, out: Path, max_size: int = 0, in_place: bool = False) -> IngestJob:
+        """Queue a job; raises ValueError if the scene already has an active job."""
+        job = IngestJob(scene_id, Path(source), Path(out), 0 if in_place else max_size)
+        with self._lock:
+            if any(j.active and j.scene_id == scene_id for j in self._jobs.values()):
+                raise ValueError(f"Scene {scene_id!r} is already being ingested")
+            self._jobs[job.id] = job
+            while len(self._jobs) > self._keep:
+                oldest = next((k for k, j in self._jobs.items() if not j.active), None)
+                if oldest is None:
+                    break
+                del self._jobs[oldest]
+            self._queue.append((job, in_place))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="ingest", daemon=True)
+                self._thread.start()
+            self._wake.notify()
+        return job
+
+    def get(self, job_id: str) -> IngestJob | None:
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> list[IngestJob]:
+        return list(self._jobs.values())
+
+    def active(self, scene_id: str) -> IngestJob | None:
+        for job in list(self._jobs.values()):
+            if job.active and job.scene_id == scene_id:
+                return job
+        return None
+
+    def cancel(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or not job.active:
+            return False
+        job.cancel_requested = True
+        return True
+
+    def stats(self) -> dict:
+        jobs = self.jobs()
+        return {
+            "workers": self.workers,
+            "active": [j.id for j in jobs if j.active],
+            "ingested": self.ingested,
+            "images": self.images,
+        }
+
+    def _loop(self) -> None:
+        while True:
+            with self._lock:
+                while not self._queue:
+                    self._wake.wait()
+                job, in_place = self._queue.popleft()
+            job.started = time.time()
+            try:
+                if job.cancel_requested:
+                    raise IngestCancelled()
+                self._run(job, in_place)
+            except IngestCancelled:
+                job.state = "cancelled"
+            except Exception as e:  # reported on the job, the loop keeps serving the queue
+                job.state, job.error = "error", f"{type(e).__name__}: {e}"
+            job.finished = time.time()
+
+    def _run(self, job: IngestJob, in_place: bool) -> None:
+        job.state = "reading"
+        manifest = find_manifest(job.source)
+        manifest_bytes = manifest.read_bytes()
+        meta = json.loads(manifest_bytes)
+        if manifest.name == "transforms.json":
+            if in_place or job.source.resolve() == job.out.resolve():
+                raise ValueError("transforms.json sources need a separate output directory")
+            frames = meta["frames"]
+            paths = transforms_paths(meta, job.source)
+        else:
+            frames = meta
+            paths = image_paths(job.source, meta)
+
+        if in_place:
+            version = dataset_version(manifest_bytes, paths)
+            index = read_pack_index(job.out)
+            have_images = all(p.exists() for p in paths)
+            if index is not None and len(index["images"]) == len(paths) and (
+                index["version"] == version or not have_images
+            ):
+                job.state, job.total, job.done = "current", len(paths), len(paths)
+                return
+            if not have_images:
+                raise FileNotFoundError(f"Images missing under {job.source}")
+        else:
+            # Same inputs, same output: re-ingesting an unchanged capture is a no-op for caches downstream
+            version = dataset_version(manifest_bytes + f"|max_size={job.max_size}".encode(), paths)
+
+        job.total = len(paths)
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(self.workers, mp_context=ctx, initializer=_init_worker) as pool:
+            job.state = "probing"
+            sizes = list(pool.map(_probe, [str(p) for p in paths], chunksize=64))
+            if in_place and None in sizes:
+                raise ValueError(f"Unreadable image {paths[sizes.index(None)]}")
+            keep = [i for i, size in enumerate(sizes) if size is not None]
+            job.skipped = [str(paths[i]) for i, size in enumerate(sizes) if size is None]
+            if not keep:
+                raise ValueError("No readable images")
+            frames = [frames[i] for i in keep]
+            paths = [paths[i] for i in keep]
+            sizes = [sizes[i] for i in keep]
+            job.total = len(paths)
+            if job.cancel_requested:
+                raise IngestCancelled()
+
+            if in_place:
+                cameras = None
+            elif manifest.name == "transforms.json":
+                cameras = cameras_from_transforms(frames, meta, sizes)
+            else:
+                cameras = [{k: v for k, v in cam.items() if k != "file"} for cam in frames]
+            out_sizes = [fit_size(w, h, job.max_size) for w, h in sizes]
+            if cameras is not None:
+                for cam, size in zip(cameras, out_sizes):
+                    cam["size"] = list(size)
+            entries, nbytes = pack_layout(out_sizes)
+
+            job.out.mkdir(parents=True, exist_ok=True)
+            tmp = f".tmp-ingest-{job.id}"
+            pack_tmp = job.out / (PACK_FILE + tmp)
+            try:
+                with open(pack_tmp, "wb") as f:
+                    f.truncate(nbytes)
+                job.state = "decoding"
+                self._decode_all(pool, job, paths, entries, str(pack_tmp))
+                job.state = "writing"
+                if cameras is not None:
+                    cams_tmp = job.out / ("cameras.json" + tmp)
+                    cams_tmp.write_text(json.dumps(cameras, indent=2))
+                    os.replace(cams_tmp, job.out / "cameras.json")
+                publish_pack(job.out, tmp, version, entries, nbytes)
+            finally:
+                for leftover in (pack_tmp, job.out / (PACK_INDEX + tmp), job.out / ("cameras.json" + tmp)):
+                    leftover.unlink(missing_ok=True)
+
+        self.scenes.register(job.scene_id, job.out)
+        self.ingested += 1
+        self.images += job.done
+        job.state = "done"
+
+    def _decode_all(self, pool: ProcessPoolExecutor, job: IngestJob, paths: list[Path], entries: list[dict], pack: str) -> None:
+        """Decode with a bounded window of outstanding tasks so cancellation takes effect quickly."""
+        todo = iter(zip(paths, entries))
+        pending: dict = {}  # future -> bytes it writes
+        window = self.workers * 4
+        job.decode_started = time.time()
+        while True:
+            while len(pending) < window and not job.cancel_requested:
+                item = next(todo, None)
+                if item is None:
+                    break
+                path, e = item
+                fut = pool.submit(_decode_into, str(path), pack, e["offset"], e["width"], e["height"])
+                pending[fut] = e["width"] * e["height"] * 3
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                fut.result()  # a decode error fails the job
+                job.done += 1
+                job.bytes += pending.pop(fut)
+        if job.cancel_requested:
+            raise IngestCancelled()
@@ -1,12 +1,38 @@
-from fastapi import FastAPI, Response, Query, HTTPException
+from fastapi import FastAPI, Header, Response, Query, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError, model_validator
+import asyncio
 import numpy as np
 from PIL import Image
-import io
 from pathlib import Path
 import json
+import hashlib
 import math
+import os
+import secrets
+import tempfile
+import time
+import zipfile
+from functools import lru_cache
+from typing import AsyncIterator
+
+from camera_path import sample_path
+from frame_buffers import BUFFERS_PATTERN, MEDIA_TYPE as BUFFERS_MEDIA_TYPE, NO_SOURCE, empty_buffers, pack_frame, parse_buffers, resize_nearest
+from ingest import Ingester
+from image_codec import FORMAT_PATTERN, MEDIA_TYPES, encode_headers, encode_image, negotiate
+from http_cache import cache_headers, etag_matches, make_etag
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY, MetricsMiddleware, collect, record, stage
+from ply_io import PlyWriter
+from prefetch import Prefetcher
+from profiler import SamplingProfiler
+from raster import encode_depth_mm, rasterize
+from render_cache import RenderCache, pose_key
+from render_pool import PoolSaturated, RenderPool
+from scene_registry import Scene, SceneRegistry
+from shared_cache import SharedFrameCache, SingleFlight, fcntl
+from tile_compositor import TileCompositor
 
 app = FastAPI(title="NeRF Proxy")
 app.add_middleware(
@@ -18,6 +44,18 @@ app.add_middleware(
 )
 
 
+# Datasets by scene id. "demo" is the generated demo dataset (registered on
+# startup); every subdirectory of SCENES_DIR is a scene, including ingested ones.
+DEFAULT_SCENE = "demo"
+SCENE_PATTERN = r"^[A-Za-z0-9][A-Za-z0-9_.-]*$"
+SCENES = SceneRegistry(budget_bytes=int(os.environ.get("NERF_SCENE_BUDGET_MB", "1024")) * 1024 * 1024)
+SCENES_DIR = Path(os.environ.get("NERF_SCENES_DIR", str(Path(__file__).resolve().parent / "scenes")))
+# Captures may only be ingested from below this directory; unset disables POST /ingest
+INGEST_ROOT = os.environ.get("NERF_INGEST_ROOT")
+INGEST_MAX_SIZE = int(os.environ.get("NERF_INGEST_MAX_SIZE", "2048"))
+INGESTER = Ingester(SCENES, workers=int(os.environ.get("NERF_INGEST_WORKERS", str(os.cpu_count() or 1))))
+
+
 class Pose(BaseModel):
     px: float
     py: float
@@ -31,32 +69,132 @@ class Pose(BaseModel):
     fov: float
 
 
-# In-memory demo dataset (filled on startup)
-DEMO = {
-    "images": [],  # list[Image.Image]
-    "cameras": [], # list[dict]
+class StreamPose(Pose):
+    """Pose message sent by clients over the /stream WebSocket."""
+    ux: float = 0
+    uy: float = 1
+    uz: float = 0
+    fov: float = 60
+    w: int = Field(960, ge=1, le=8192)
+    h: int = Field(540, ge=1, le=8192)
+    mode: str = Field("nearest", pattern="^(nearest|blend)$")
+    format: str = Field("png", pattern="^(png|jpeg|webp)$")
+    quality: int | None = Field(None, ge=1, le=100)
+    # Progressive streaming: frames for moving poses are rendered at this scale,
+    # then the full-size frame follows once no new pose arrived for refine_ms
+    preview_scale: float = Field(1.0, gt=0, le=1)
+    refine_ms: int = Field(150, ge=0, le=10_000)
+    scene: str = Field(DEFAULT_SCENE, pattern=SCENE_PATTERN, max_length=128)
+
+
+
+# Encoded /render frames keyed on quantized pose, fov and output size. Synced
+# panes and idle cameras re-request the same pose constantly.
+RENDER_CACHE = RenderCache(max_bytes=int(os.environ.get("NERF_RENDER_CACHE_MB", "64")) * 1024 * 1024)
+# Second frame cache level shared by every uvicorn worker on the host (see
+# shared_cache); off unless NERF_SHARED_CACHE_MB is set. Lives on tmpfs where there is one.
+SHARED_CACHE_MB = int(os.environ.get("NERF_SHARED_CACHE_MB", "0"))
+SHARED_CACHE_DIR = Path(os.environ.get(
+    "NERF_SHARED_CACHE_DIR",
+    str(Path("/dev/shm" if Path("/dev/shm").is_dir() else tempfile.gettempdir()) / "nerf-proxy-frames"),
+))
+SHARED_CACHE = (
+    SharedFrameCache(SHARED_CACHE_DIR, SHARED_CACHE_MB * 1024 * 1024)
+    if SHARED_CACHE_MB > 0 and fcntl is not None else None
+)
+# Concurrent requests for the same frame in this process wait for one render
+FRAME_FLIGHTS = SingleFlight()
+# Encoded /inputs/image responses as (payload, (w, h)); the inputs panel re-requests thumbnails.
+INPUT_CACHE = RenderCache(max_bytes=int(os.environ.get("NERF_INPUT_CACHE_MB", "32")) * 1024 * 1024)
+# Relative tolerance within which /inputs/image serves an existing pyramid level
+# instead of resampling to the exact requested size.
+INPUT_SNAP = 0.1
+
+# Where render/encode jobs run (see render_pool.RenderPool); created on startup.
+RENDER_BACKEND = os.environ.get("NERF_RENDER_BACKEND", "thread")
+RENDER_WORKERS = int(os.environ.get("NERF_RENDER_WORKERS", str(os.cpu_count() or 1)))
+RENDER_MAX_PENDING = int(os.environ.get("NERF_RENDER_MAX_PENDING", str(RENDER_WORKERS * 2)))
+BATCH_DIR = Path(os.environ.get("NERF_BATCH_DIR", str(Path(__file__).resolve().parent / "renders")))
+BATCH_MAX_FRAMES = int(os.environ.get("NERF_BATCH_MAX_FRAMES", "5000"))
+HTTP_MAX_AGE = int(os.environ.get("NERF_HTTP_MAX_AGE", "0"))
+# Bump when render or encode output changes for the same inputs, so ETags change with it
+RENDER_VERSION = 1
+PREFETCH_FRAMES = int(os.environ.get("NERF_PREFETCH_FRAMES", "3"))
+PREFETCH_TOLERANCE = float(os.environ.get("NERF_PREFETCH_TOLERANCE", "0"))
+PROFILE_SLOW_MS = float(os.environ.get("NERF_PROFILE_SLOW_MS", "0"))
+PROFILE_DIR = Path(os.environ.get("NERF_PROFILE_DIR", str(Path(__file__).resolve().parent / "profiles")))
+PROFILE_INTERVAL_MS = float(os.environ.get("NERF_PROFILE_INTERVAL_MS", "5"))
+PROFILER = SamplingProfiler(PROFILE_DIR, PROFILE_SLOW_MS, PROFILE_INTERVAL_MS) if PROFILE_SLOW_MS > 0 else None
+app.add_middleware(MetricsMiddleware, profiler=PROFILER)
+RENDER_POOL = RenderPool("inline")
+DEMO_DIR = Path(__file__).resolve().parent / "demo_dataset"
+PUBLIC_ASSETS = Path(__file__).resolve().parents[2] / "public" / "assets"
+
+# Everything that determines the generated demo dataset. The on-disk copy is
+# reused while its manifest fingerprint matches; bump "generator" whenever the
+# generation code changes its output.
+DATASET_PARAMS = {
+    "generator": 2,
+    "size": [320, 240],
+    "fov": 60.0,
+    "views": 8,
+    "radius": 3.0,
+    "elevation_deg": 20.0,
+    "cloud_points_per_triangle": 60,
+    "seed": 42,
 }
+# Vertex layout of the bundled demo_cloud.ply
+CLOUD_DTYPE = np.dtype([("x", "<f4"), ("y", "<f4"), ("z", "<f4"), ("red", "u1"), ("green", "u1"), ("blue", "u1")])
+# Downloading the sample Box.glb needs network access, so it is opt-in.
+FETCH_DEMO_MESH = os.environ.get("NERF_FETCH_DEMO_MESH", "0") == "1"
+
+
+def dataset_fingerprint(params: dict = DATASET_PARAMS) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _dataset_is_current(demo_dir: Path, ply_path: Path) -> bool:
+    """True when the on-disk dataset was generated with the current DATASET_PARAMS."""
+    try:
+        manifest = json.loads((demo_dir / "manifest.json").read_text())
+    except (OSError, ValueError):
+        return False
+    if manifest.get("fingerprint") != dataset_fingerprint():
+        return False
+    files = [demo_dir / "cameras.json", ply_path] + [demo_dir / name for name in manifest.get("images", [])]
+    return all(p.exists() for p in files)
+
 
+def ensure_demo_dataset(fetch_mesh: bool | None = None) -> None:
+    """Make sure the demo dataset exists on disk and register it as the default scene.
+
+    The dataset is regenerated only when its manifest fingerprint does not match
+    DATASET_PARAMS, so warm starts just read cameras.json. The sample mesh is
+    downloaded only when `fetch_mesh` (default: NERF_FETCH_DEMO_MESH=1) is set.
+    """
+    ply_path = PUBLIC_ASSETS / "demo_cloud.ply"
+    if not _dataset_is_current(DEMO_DIR, ply_path):
+        generate_demo_dataset(DEMO_DIR, PUBLIC_ASSETS)
+    if FETCH_DEMO_MESH if fetch_mesh is None else fetch_mesh:
+        fetch_demo_mesh(PUBLIC_ASSETS / "demo_mesh.glb")
+    load_demo_dataset(DEMO_DIR)
 
-def ensure_demo_dataset() -> None:
+
+def generate_demo_dataset(demo_dir: Path = DEMO_DIR, public_assets: Path = PUBLIC_ASSETS) -> None:
     """Generate a tiny synthetic dataset (cube) and publish assets for the web app.
-    - Saves input images + cameras JSON in server/nerf-proxy/demo_dataset/
+    - Saves input images, depth maps, masks + cameras JSON in server/nerf-proxy/demo_dataset/
     - Saves a point cloud PLY under public/assets/demo_cloud.ply
-    - Downloads a tiny Box.glb as the mesh under public/assets/demo_mesh.glb (if not present)
+    - Writes demo_dataset/manifest.json with the fingerprint of DATASET_PARAMS
     """
-    root = Path(__file__).resolve().parents[2]  # repo root
-    server_dir = Path(__file__).resolve().parent
-    public_assets = root / "public" / "assets"
     public_assets.mkdir(parents=True, exist_ok=True)
-    demo_dir = server_dir / "demo_dataset"
     demo_images = demo_dir / "images"
-    demo_images.mkdir(parents=True, exist_ok=True)
+    params = DATASET_PARAMS
 
     # Camera parameters
-    W, H = 320, 240
-    fov = 60.0
+    W, H = params["size"]
+    fov = params["fov"]
     cams = []
-    imgs = []
+    image_names = []
 
     # Define cube vertices and faces (12 triangles)
     verts = np.array([
@@ -80,67 +218,18 @@ def ensure_demo_dataset() -> None:
         (60,200,200),(60,200,200),
     ]
 
-    def look_at(pos, target, up):
-        f = target - pos
-        f = f / (np.linalg.norm(f) + 1e-8)
-        r = np.cross(f, up)
-        r = r / (np.linalg.norm(r) + 1e-8)
-        u = np.cross(r, f)
-        return r, u, f
-
-    def project(p, r, u, f, pos, fov_deg, W, H):
-        rel = p - pos
-        z = np.dot(rel, f)
-        if z <= 0: return None
-        x_cam = np.dot(rel, r) / z
-        y_cam = np.dot(rel, u) / z
-        fov_rad = math.radians(fov_deg)
-        aspect = W / H
-        sx = int((x_cam / math.tan(fov_rad/2) / aspect + 1) * W/2)
-        sy = int((-y_cam / math.tan(fov_rad/2) + 1) * H/2)
-        return sx, sy, z
-
     # Render N views around the cube
-    N = 8
-    radius = 3.0
+    N = params["views"]
+    radius = params["radius"]
+    for name in ("images", "depth", "masks"):
+        (demo_dir / name).mkdir(parents=True, exist_ok=True)
     for i in range(N):
         ang = i * (2*math.pi/N)
-        elev = math.radians(20)
+        elev = math.radians(params["elevation_deg"])
         pos = np.array([radius*math.cos(ang), radius*math.sin(elev), radius*math.sin(ang)], dtype=np.float32)
         target = np.array([0,0,0], dtype=np.float32)
         up = np.array([0,1,0], dtype=np.float32)
-        r,u,fv = look_at(pos, target, up)
-        # Painter's algorithm: sort triangles by depth
-        tri_info = []
-        for (a,b,c), col in zip(faces, face_colors):
-            pa, pb, pc = verts[a], verts[b], verts[c]
-            # center depth
-            center = (pa+pb+pc)/3
-            prj = [project(pa,r,u,fv,pos,fov,W,H), project(pb,r,u,fv,pos,fov,W,H), project(pc,r,u,fv,pos,fov,W,H)]
-            if any(p is None for p in prj):
-                continue
-            depth = np.dot(center - pos, fv)
-            tri_info.append((depth, prj, col))
-        tri_info.sort(reverse=True)  # far to near
-        canvas = np.zeros((H,W,3), dtype=np.uint8)
-        canvas[:,:,:] = (11,14,18)  # background
-        for _, ((x0,y0,_),(x1,y1,_),(x2,y2,_)), col in tri_info:
-            # rasterize filled triangle (naive)
-            minx = max(0, min(x0,x1,x2))
-            maxx = min(W-1, max(x0,x1,x2))
-            miny = max(0, min(y0,y1,y2))
-            maxy = min(H-1, max(y0,y1,y2))
-            area = (x1-x0)*(y2-y0) - (y1-y0)*(x2-x0)
-            if area == 0: continue
-            for y in range(miny, maxy+1):
-                for x in range(minx, maxx+1):
-                    w0 = (x1-x0)*(y-y0) - (y1-y0)*(x-x0)
-                    w1 = (x2-x1)*(y-y1) - (y2-y1)*(x-x1)
-                    w2 = (x0-x2)*(y-y2) - (y0-y2)*(x-x2)
-                    if (w0 >= 0 and w1 >= 0 and w2 >= 0) or (w0 <= 0 and w1 <= 0 and w2 <= 0):
-                        canvas[y,x] = col
-        pil = Image.fromarray(canvas, mode="RGB")
-        imgs.append(pil)
+        rgb, depth, mask = rasterize(verts, faces, pos, target, up, fov, W, H, face_colors=face_colors)
         cams.append({
             "position": pos.tolist(),
             "target": target.tolist(),
@@ -148,120 +237,163 @@ def ensure_demo_dataset() -> None:
             "fov": fov,
             "size": [W,H],
         })
-        pil.save(demo_images / f"{i:03d}.png")
+        Image.fromarray(rgb, mode="RGB").save(demo_images / f"{i:03d}.png")
+        Image.fromarray(encode_depth_mm(depth)).save(demo_dir / "depth" / f"{i:03d}.png")
+        Image.fromarray((mask * 255).astype(np.uint8), mode="L").save(demo_dir / "masks" / f"{i:03d}.png")
+        image_names.append(f"images/{i:03d}.png")
     # Save cameras
     (demo_dir / "cameras.json").write_text(json.dumps(cams, indent=2))
 
     # Also provide a small point cloud PLY under public/assets
-    # Sample points on cube faces
-    rng = np.random.default_rng(42)
-    pts = []
-    cols = []
-    for fi, ((a,b,c), col) in enumerate(zip(faces, face_colors)):
-        pa, pb, pc = verts[a], verts[b], verts[c]
-        # sample 60 points per triangle
-        for _ in range(60):
-            u1, u2 = rng.random(), rng.random()
-            if u1 + u2 > 1:
-                u1, u2 = 1-u1, 1-u2
-            p = pa + u1*(pb-pa) + u2*(pc-pa)
-            pts.append(p)
-            cols.append(col)
-    pts = np.array(pts)
-    cols = np.array(cols)
-    # Write ASCII PLY
+    # Sample points on cube faces (u1, u2 drawn per sample in triangle order)
+    rng = np.random.default_rng(params["seed"])
+    tri = np.asarray(faces)
+    u = rng.random((len(tri), params["cloud_points_per_triangle"], 2))
+    flip = u.sum(axis=2) > 1
+    u[flip] = 1 - u[flip]
+    u = u.astype(np.float32)
+    pa, pb, pc = verts[tri[:, 0], None], verts[tri[:, 1], None], verts[tri[:, 2], None]
+    pts = (pa + u[..., :1] * (pb - pa) + u[..., 1:] * (pc - pa)).reshape(-1, 3)
+    cloud = np.empty(len(pts), dtype=CLOUD_DTYPE)
+    cloud["x"], cloud["y"], cloud["z"] = pts.T
+    cols = np.repeat(np.asarray(face_colors, dtype=np.uint8), params["cloud_points_per_triangle"], axis=0)
+    cloud["red"], cloud["green"], cloud["blue"] = cols.T
+    # ASCII keeps the small bundled asset diffable
     ply_path = public_assets / "demo_cloud.ply"
-    with open(ply_path, 'w') as f:
-        f.write("ply\nformat ascii 1.0\n")
-        f.write(f"element vertex {len(pts)}\n")
-        f.write("property float x\nproperty float y\nproperty float z\n")
-        f.write("property uchar red\nproperty uchar green\nproperty uchar blue\n")
-        f.write("end_header\n")
-        for (x,y,z),(r,g,b) in zip(pts, cols):
-            f.write(f"{x:.5f} {y:.5f} {z:.5f} {int(r)} {int(g)} {int(b)}\n")
-
-    # Download Box.glb if missing
-    glb_path = public_assets / "demo_mesh.glb"
-    if not glb_path.exists():
-        try:
-            import urllib.request
-            url = "https://raw.githubusercontent.com/KhronosGroup/glTF-Sample-Models/master/2.0/Box/glTF-Binary/Box.glb"
-            urllib.request.urlretrieve(url, glb_path)
-        except Exception:
-            # If download fails, leave mesh absent; frontend will show demo geometry
-            pass
+    with PlyWriter(ply_path, CLOUD_DTYPE, len(cloud), fmt="ascii", float_fmt="%.5f") as ply:
+        ply.write(cloud)
+
+    # Written last: its presence marks the dataset above as complete
+    (demo_dir / "manifest.json").write_text(json.dumps({
+        "fingerprint": dataset_fingerprint(params),
+        "params": params,
+        "images": image_names,
+        # 16-bit PNGs: depth/NNN.png holds camera-space z in millimeters (0 = background),
+        # masks/NNN.png is 255 where geometry was hit
+        "depth_scale": 0.001,
+    }, indent=2))
+
+
+def fetch_demo_mesh(glb_path: Path) -> None:
+    """Download a tiny Box.glb as the demo mesh (if not present)."""
+    if glb_path.exists():
+        return
+    try:
+        import urllib.request
+        url = "https://raw.githubusercontent.com/KhronosGroup/glTF-Sample-Models/master/2.0/Box/glTF-Binary/Box.glb"
+        urllib.request.urlretrieve(url, glb_path)
+    except Exception:
+        # If download fails, leave mesh absent; frontend will show demo geometry
+        pass
+
+
+def load_demo_dataset(demo_dir: Path = DEMO_DIR) -> bool:
+    """Register a previously generated dataset as the default scene (no regeneration).
+
+    The scene itself loads on first use: its images are packed and memory-mapped
+    by SCENES.
+    """
+    if not (demo_dir / "cameras.json").exists():
+        return False
+    SCENES.register(DEFAULT_SCENE, demo_dir)
+    RENDER_CACHE.clear()
+    INPUT_CACHE.clear()
+    return True
+
+
+# Number of torus-knot samples drawn by the analytic renderer. Dense knots can
+# be requested per call via `samples`; the composite is vectorized, so cost
+# grows with covered pixels rather than Python iterations.
+DEFAULT_DUMMY_SAMPLES = 500
+MAX_DUMMY_SAMPLES = 200_000
+DUMMY_BACKGROUND = 0.043  # #0b0e12
+# Screen tiles of the analytic renderer: composited in parallel, reused while unchanged
+TILES = TileCompositor(
+    tile_size=int(os.environ.get("NERF_TILE_SIZE", "128")),
+    workers=int(os.environ.get("NERF_TILE_WORKERS", str(os.cpu_count() or 1))),
+    cache_bytes=int(os.environ.get("NERF_TILE_CACHE_MB", "64")) * 1024 * 1024,
+)
+
+
+@lru_cache(maxsize=8)
+def _torus_knot_samples(num_samples: int) -> tuple[np.ndarray, np.ndarray]:
+    """Return (points, colors) for `num_samples` points along the demo torus knot."""
+    t = np.arange(num_samples, dtype=np.float64) / num_samples * 2 * np.pi
+    p, q = 2, 3
+    r, R = 0.5, 1.0
+    x = (R + r * np.cos(q * t)) * np.cos(p * t)
+    y = (R + r * np.cos(q * t)) * np.sin(p * t)
+    z = r * np.sin(q * t)
+    points = np.stack([x, y, z], axis=1)
+    # Color based on position (same gradient as other viewers)
+    colors = np.stack([(x + 1.5) / 3.0, (y + 1.5) / 3.0, (z + 1) / 2.0], axis=1)
+    points.setflags(write=False)
+    colors.setflags(write=False)
+    return points, colors
+
+
+def _project_dummy(width: int, height: int, pose: Pose, samples: int):
+    """Project the torus-knot samples into the view: on-screen (sx, sy, footprint size, depth, colors)."""
+    # Camera setup
+    cam_pos = np.array([pose.px, pose.py, pose.pz])
+    target = np.array([pose.tx, pose.ty, pose.tz])
+    up = np.array([pose.ux, pose.uy, pose.uz])
+
+    # View matrix
+    forward = target - cam_pos
+    forward = forward / (np.linalg.norm(forward) + 1e-8)
+    right = np.cross(forward, up)
+    right = right / (np.linalg.norm(right) + 1e-8)
+    up_corrected = np.cross(right, forward)
+
+    # Project every sample at once
+    points, colors = _torus_knot_samples(samples)
+    rel = points - cam_pos
+    depth = rel @ forward
+    front = depth >= 0.1
+    rel, depth, colors = rel[front], depth[front], colors[front]
+    tan_half = np.tan(np.radians(pose.fov) / 2)
+    aspect = width / height
+    x_cam = (rel @ right) / depth
+    y_cam = (rel @ up_corrected) / depth
+    sx = ((x_cam / tan_half / aspect + 1) * width / 2).astype(np.int64)
+    sy = ((-y_cam / tan_half + 1) * height / 2).astype(np.int64)
+    on_screen = (sx >= 0) & (sx < width) & (sy >= 0) & (sy < height)
+    sx, sy, depth, colors = sx[on_screen], sy[on_screen], depth[on_screen], colors[on_screen]
+
+    # Soft-edged splats (simulated volumetric rendering), larger when nearer
+    sizes = np.maximum(2, (5 / depth).astype(np.int64))
+    return sx, sy, sizes, depth, colors
 
-    # Load images in-memory for serving
-    DEMO["images"] = imgs
-    DEMO["cameras"] = cams
 
+def render_dummy(
+    width: int = 960,
+    height: int = 540,
+    pose: Pose | None = None,
+    samples: int = DEFAULT_DUMMY_SAMPLES,
+    aux: dict[str, np.ndarray] | None = None,
+) -> Image.Image:
+    """Render a simple synthetic view of a torus knot matching the demo scene.
 
-def render_dummy(width: int = 960, height: int = 540, pose: Pose | None = None) -> bytes:
-    """Render a simple synthetic view of a torus knot matching the demo scene."""
-    # Create background gradient
-    img = np.ones((height, width, 3), dtype=np.float32) * 0.043  # Dark background #0b0e12
-    
+    Samples are projected once, then composited per screen tile by `TILES`.
+    If `aux` is given it receives `depth` (opacity-weighted mean splat depth),
+    `alpha` (accumulated opacity) and `source` (no input view) for every pixel.
+    """
+    rgb = depth_buf = alpha_buf = None
     if pose:
-        # Camera setup
-        cam_pos = np.array([pose.px, pose.py, pose.pz])
-        target = np.array([pose.tx, pose.ty, pose.tz])
-        up = np.array([pose.ux, pose.uy, pose.uz])
-        
-        # View matrix
-        forward = target - cam_pos
-        forward = forward / (np.linalg.norm(forward) + 1e-8)
-        right = np.cross(forward, up)
-        right = right / (np.linalg.norm(right) + 1e-8)
-        up_corrected = np.cross(right, forward)
-        
-        # Generate torus knot points
-        num_samples = 500
-        for i in range(num_samples):
-            t = (i / num_samples) * 2 * np.pi
-            p, q = 2, 3
-            r, R = 0.5, 1.0
-            
-            # 3D position
-            x = (R + r * np.cos(q * t)) * np.cos(p * t)
-            y = (R + r * np.cos(q * t)) * np.sin(p * t)
-            z = r * np.sin(q * t)
-            point = np.array([x, y, z])
-            
-            # Project to screen
-            rel = point - cam_pos
-            depth = np.dot(rel, forward)
-            if depth < 0.1:
-                continue
-            
-            # Perspective projection
-            x_cam = np.dot(rel, right) / depth
-            y_cam = np.dot(rel, up_corrected) / depth
-            fov_rad = np.radians(pose.fov)
-            aspect = width / height
-            
-            sx = int((x_cam / np.tan(fov_rad / 2) / aspect + 1) * width / 2)
-            sy = int((-y_cam / np.tan(fov_rad / 2) + 1) * height / 2)
-            
-            if 0 <= sx < width and 0 <= sy < height:
-                # Color based on position (same gradient as other viewers)
-                cr = (x + 1.5) / 3.0
-                cg = (y + 1.5) / 3.0
-                cb = (z + 1) / 2.0
-                
-                # Draw with soft edges (simulate volumetric rendering)
-                size = max(2, int(5 / depth))
-                for dx in range(-size, size+1):
-                    for dy in range(-size, size+1):
-                        px, py = sx + dx, sy + dy
-                        if 0 <= px < width and 0 <= py < height:
-                            dist = np.sqrt(dx*dx + dy*dy)
-                            alpha = max(0, 1 - dist / size) * 0.8
-                            img[py, px] = img[py, px] * (1 - alpha) + np.array([cr, cg, cb]) * alpha
-    
-    # Convert to uint8 and create image
-    img = np.clip(img * 255, 0, 255).astype(np.uint8)
-    pil = Image.fromarray(img, mode="RGB")
-    
+        sx, sy, sizes, depth, colors = _project_dummy(width, height, pose, samples)
+        with stage("composite"):
+            rgb, depth_buf, alpha_buf = TILES.composite(
+                sx, sy, sizes, depth, colors, width, height, DUMMY_BACKGROUND, with_aux=aux is not None
+            )
+    if rgb is None:
+        rgb = np.full((height, width, 3), np.uint8(DUMMY_BACKGROUND * 255), dtype=np.uint8)
+    if aux is not None:
+        aux.update(empty_buffers(width, height))
+        if depth_buf is not None:
+            aux["depth"], aux["alpha"] = depth_buf, alpha_buf
+    pil = Image.fromarray(rgb, mode="RGB")
+
     # Add info text
     try:
         from PIL import ImageDraw
@@ -270,39 +402,456 @@ def render_dummy(width: int = 960, height: int = 540, pose: Pose | None = None)
         draw.text((10, 10), text, fill=(180, 180, 180))
     except Exception:
         pass
-    
-    buf = io.BytesIO()
-    pil.save(buf, format="PNG")
-    return buf.getvalue()
+    return pil
 
 
-def render_nearest_view(width: int, height: int, pose: Pose) -> bytes | None:
-    if not DEMO["images"]:
+def render_nearest_view(
+    width: int,
+    height: int,
+    pose: Pose,
+    angle_weight: float = 0.0,
+    scene: Scene | None = None,
+    aux: dict[str, np.ndarray] | None = None,
+) -> Image.Image | None:
+    """Return the scene's input image closest to the pose (optionally weighing view direction).
+
+    If `aux` is given it receives that view's depth map and mask, resized the
+    same way, and its index as `source` for every pixel.
+    """
+    if scene is None or not len(scene.images):
         return None
     cam_pos = np.array([pose.px, pose.py, pose.pz])
-    best_i, best_d = -1, 1e9
-    for i, cam in enumerate(DEMO["cameras"]):
-        pos = np.array(cam["position"])
-        d = float(np.linalg.norm(pos - cam_pos))
-        if d < best_d:
-            best_d, best_i = d, i
-    if best_i < 0:
+    forward = np.array([pose.tx, pose.ty, pose.tz]) - cam_pos
+    idx, _ = scene.index.nearest(cam_pos, forward, k=1, angle_weight=angle_weight)
+    if not len(idx):
         return None
-    pil = DEMO["images"][best_i]
+    best_i = int(idx[0])
+    if aux is not None:
+        depth, alpha = scene.aux(best_i)
+        # Without a mask the input image is fully opaque; without a depth map depth is unknown (0)
+        aux["depth"] = resize_nearest(depth, width, height) if depth is not None else np.zeros((height, width), np.float32)
+        aux["alpha"] = resize_nearest(alpha, width, height) if alpha is not None else np.ones((height, width), np.float32)
+        aux["source"] = np.full((height, width), best_i, dtype=np.uint16)
+    with stage("resize"):
+        return scene.pyramid(best_i).resized(width, height)
+
+
+def _camera_basis(pos: np.ndarray, target: np.ndarray, up: np.ndarray):
+    """Return the (right, up, forward) unit vectors of a look-at camera."""
+    f = target - pos
+    f = f / (np.linalg.norm(f) + 1e-8)
+    r = np.cross(f, up)
+    r = r / (np.linalg.norm(r) + 1e-8)
+    return r, np.cross(r, f), f
+
+
+def _sample_bilinear(src: np.ndarray, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """Bilinearly sample an (H, W, 3) float image at continuous pixel coords (clamped)."""
+    h, w = src.shape[:2]
+    u = np.clip(u - 0.5, 0, w - 1)
+    v = np.clip(v - 0.5, 0, h - 1)
+    x0 = np.minimum(u.astype(np.int64), w - 2 if w > 1 else 0)
+    y0 = np.minimum(v.astype(np.int64), h - 2 if h > 1 else 0)
+    x1 = np.minimum(x0 + 1, w - 1)
+    y1 = np.minimum(y0 + 1, h - 1)
+    fx = (u - x0)[..., None]
+    fy = (v - y0)[..., None]
+    top = src[y0, x0] * (1 - fx) + src[y0, x1] * fx
+    bottom = src[y1, x0] * (1 - fx) + src[y1, x1] * fx
+    return top * (1 - fy) + bottom * fy
+
+
+def _sample_nearest(src: np.ndarray, u: np.ndarray, v: np.ndarray, width: int, height: int) -> np.ndarray:
+    """Sample an (H, W) map at pixel coords of a `width` x `height` image (the map may differ in size)."""
+    h, w = src.shape[:2]
+    x = np.clip((u * w / width).astype(np.int64), 0, w - 1)
+    y = np.clip((v * h / height).astype(np.int64), 0, h - 1)
+    return src[y, x]
+
+
+def render_blended_view(
+    width: int,
+    height: int,
+    pose: Pose,
+    k: int = 3,
+    angle_weight: float = 0.0,
+    scene: Scene | None = None,
+    aux: dict[str, np.ndarray] | None = None,
+) -> Image.Image | None:
+    """Synthesize a novel view by reprojecting and blending the k nearest input images.
+
+    Geometry is approximated by a proxy plane through the pose target, facing the
+    camera. Each output pixel's ray hits that plane, the hit point is projected
+    into every selected input camera, and the samples are blended with
+    per-camera weights (inverse selection cost), masked where a point falls
+    outside an input's frustum. Views closer to the pose dominate, so orbiting
+    cross-fades between inputs instead of snapping.
+
+    If `aux` is given it receives, from the same pass: `depth`, each input's
+    depth map sampled where its pixel was taken, re-expressed as z in this
+    camera and blended with the same weights; `alpha`, the blended masks; and
+    `source`, the input with the largest weight at each pixel.
+    """
+    if scene is None or not len(scene.images):
+        return None
+    cam_pos = np.array([pose.px, pose.py, pose.pz], dtype=np.float64)
+    target = np.array([pose.tx, pose.ty, pose.tz], dtype=np.float64)
+    right, up, forward = _camera_basis(cam_pos, target, np.array([pose.ux, pose.uy, pose.uz], dtype=np.float64))
+    idx, cost = scene.index.nearest(cam_pos, forward, k=k, angle_weight=angle_weight)
+    if not len(idx):
+        return None
+
+    # Warp at no more than input resolution; upsampling afterwards is equivalent and cheaper.
+    src_w = max(scene.images.size(int(i))[0] for i in idx)
+    scale = min(1.0, src_w / width)
+    gw, gh = max(1, int(round(width * scale))), max(1, int(round(height * scale)))
+
+    # Rays through pixel centers, intersected with the plane through the target
+    tan_half = math.tan(math.radians(pose.fov) / 2)
+    xs = ((np.arange(gw) + 0.5) / gw * 2 - 1) * tan_half * (width / height)
+    ys = (1 - (np.arange(gh) + 0.5) / gh * 2) * tan_half
+    rays = forward + xs[None, :, None] * right + ys[:, None, None] * up
+    plane_dist = float(np.dot(target - cam_pos, forward))
+    points = cam_pos + rays * plane_dist  # ray . forward == 1
+
+    weights = 1.0 / (cost + 1e-3) ** 2
+    acc = np.zeros((gh, gw, 3), dtype=np.float64)
+    wsum = np.zeros((gh, gw), dtype=np.float64)
+    if aux is not None:
+        dacc, dsum, aacc = np.zeros((gh, gw)), np.zeros((gh, gw)), np.zeros((gh, gw))
+        best_w = np.zeros((gh, gw))
+        source = np.full((gh, gw), NO_SOURCE, dtype=np.uint16)
+    for i, wgt in zip(idx.tolist(), weights.tolist()):
+        cam = scene.cameras[i]
+        src = scene.images.array(i).astype(np.float32)
+        sh, sw = src.shape[:2]
+        pos = np.asarray(cam["position"], dtype=np.float64)
+        r, u, f = _camera_basis(pos, np.asarray(cam["target"], dtype=np.float64), np.asarray(cam["up"], dtype=np.float64))
+        rel = points - pos
+        z = rel @ f
+        valid = z > 1e-6
+        z = np.where(valid, z, 1.0)
+        s_tan = math.tan(math.radians(cam["fov"]) / 2)
+        su = ((rel @ r) / z / s_tan / (sw / sh) + 1) * sw / 2
+        sv = (-(rel @ u) / z / s_tan + 1) * sh / 2
+        valid &= (su >= 0) & (su < sw) & (sv >= 0) & (sv < sh)
+        m = valid * wgt
+        acc += _sample_bilinear(src, su, sv) * m[..., None]
+        wsum += m
+        if aux is not None:
+            s_depth, s_alpha = scene.aux(i)
+            if s_depth is not None:
+                # The source pixel's surface point lies at its depth along the source ray (rel / z)
+                d = _sample_nearest(s_depth, su, sv, sw, sh)
+                z_out = float((pos - cam_pos) @ forward) + ((rel @ forward) / z) * d
+                hit = m * (d > 0)
+                dacc += z_out * hit
+                dsum += hit
+            aacc += (_sample_nearest(s_alpha, su, sv, sw, sh) if s_alpha is not None else 1.0) * m
+            better = m > best_w
+            best_w = np.where(better, m, best_w)
+            source[better] = i
+
+    background = np.array([11, 14, 18], dtype=np.float64)
+    covered = wsum > 0
+    out = np.where(covered[..., None], acc / np.where(covered, wsum, 1.0)[..., None], background)
+    pil = Image.fromarray(np.clip(out + 0.5, 0, 255).astype(np.uint8), mode="RGB")
     if pil.size != (width, height):
-        pil = pil.resize((width, height), Image.BICUBIC)
-    buf = io.BytesIO()
-    pil.save(buf, format="PNG")
-    return buf.getvalue()
+        pil = pil.resize((width, height), Image.BILINEAR)
+    if aux is not None:
+        has_depth = dsum > 0
+        aux["depth"] = resize_nearest(np.where(has_depth, dacc / np.where(has_depth, dsum, 1.0), 0.0).astype(np.float32), width, height)
+        aux["alpha"] = resize_nearest(np.where(covered, aacc / np.where(covered, wsum, 1.0), 0.0).astype(np.float32), width, height)
+        aux["source"] = resize_nearest(source, width, height)
+    return pil
+
+
+def _scene_ref(scene: Scene | None) -> tuple[str, str] | None:
+    """Picklable stand-in for a scene in pool job arguments."""
+    return (scene.id, str(scene.root)) if scene is not None else None
+
+
+def _job_scene(scene_ref: tuple[str, str] | None) -> Scene | None:
+    """Resolve a `_scene_ref` in whichever process runs the job (maps the shared pack)."""
+    if scene_ref is None:
+        return None
+    try:
+        return SCENES.ensure(scene_ref[0], Path(scene_ref[1]))
+    except (KeyError, OSError, ValueError):
+        return None
+
+
+def _render_uncached(
+    pose: Pose,
+    width: int,
+    height: int,
+    mode: str = "nearest",
+    samples: int = DEFAULT_DUMMY_SAMPLES,
+    angle_weight: float = 0.0,
+    fmt: str = "png",
+    quality: int | None = None,
+    scene_ref: tuple[str, str] | None = None,
+    buffers: tuple[str, ...] = (),
+) -> tuple[bytes, dict[str, float]]:
+    """Render and encode a frame; returns (payload, stage timings in ms).
+
+    With `buffers` (names from frame_buffers.BUFFER_NAMES) the renderer also
+    fills those per-pixel buffers and the payload is a packed frame instead of
+    an image in `fmt`. Runs on RENDER_POOL, possibly in a worker process.
+    """
+    with collect() as stages:
+        scene = _job_scene(scene_ref)
+        aux: dict[str, np.ndarray] | None = {} if buffers else None
+        # TODO: Integrate with Nerfstudio viewer or API here.
+        # - Option A: spawn a persistent ns-viewer and send camera pose via websocket/HTTP
+        # - Option B: load ns model via Python API and render directly
+        # Prefer dataset views if available, fallback to analytic renderer
+        if mode == "blend":
+            with stage("blend"):
+                pil = render_blended_view(width, height, pose, angle_weight=angle_weight, scene=scene, aux=aux)
+        else:
+            with stage("nearest"):
+                pil = render_nearest_view(width, height, pose, angle_weight, scene, aux)
+        if pil is None:
+            with stage("dummy"):
+                pil = render_dummy(width, height, pose, samples, aux)
+        if buffers:
+            data, stages["encode"] = pack_frame(pil, aux, buffers)
+        else:
+            data, stages["encode"] = encode_image(pil, fmt, quality)
+    return data, stages
+
+
+def _frame_key(pose: Pose, width: int, height: int, *options, scene: Scene | None) -> tuple:
+    """Frame cache key: quantized pose, size, render options and the scene's id and version."""
+    return pose_key(pose, width, height, *options, *((scene.id, scene.version) if scene else ("", "")))
+
+
+async def _render_frame(
+    pose: Pose,
+    width: int,
+    height: int,
+    mode: str = "nearest",
+    samples: int = DEFAULT_DUMMY_SAMPLES,
+    angle_weight: float = 0.0,
+    fmt: str = "png",
+    quality: int | None = None,
+    scene: Scene | None = None,
+    buffers: tuple[str, ...] = (),
+) -> tuple[bytes, bool, dict[str, float] | None]:
+    """Fetch a frame from cache or render it on the pool.
+
+    Returns (payload, cache_hit, stage timings in ms or None on a hit). Frames
+    taken from the shared cache, or from an identical render already in
+    flight, count as hits. Raises PoolSaturated when the render queue is full.
+    """
+    key = _frame_key(pose, width, height, mode, samples, angle_weight, fmt, quality, *buffers, scene=scene)
+    data = RENDER_CACHE.get(key)
+    if data is not None:
+        return data, True, None
+    args = (pose, width, height, mode, samples, angle_weight, fmt, quality, _scene_ref(scene), buffers)
+    (data, timings), leader = await FRAME_FLIGHTS.do(key, lambda: _render_shared(key, args))
+    if not leader:
+        return data, True, None
+    RENDER_CACHE.put(key, data)
+    return data, timings is None, timings
+
+
+async def _render_shared(key: tuple, args: tuple) -> tuple[bytes, dict[str, float] | None]:
+    """Render on the pool, through the shared cache when enabled; timings are None if another process rendered."""
+    timings = None
+
+    async def render() -> bytes:
+        nonlocal timings
+        data, timings = await RENDER_POOL.run(_render_uncached, *args)
+        record(timings)
+        return data
+
+    if SHARED_CACHE is None:
+        return await render(), timings
+    data, _ = await SHARED_CACHE.get_or_create((RENDER_VERSION, key), render)
+    return data, timings
+
+
+def _pose_vector(pose: Pose) -> np.ndarray:
+    return np.array([pose.px, pose.py, pose.pz, pose.tx, pose.ty, pose.tz, pose.ux, pose.uy, pose.uz, pose.fov])
+
+
+def _params_key(pose: Pose, params: tuple) -> tuple:
+    """`_frame_key` for `_render_frame(pose, *params)`."""
+    width, height, mode, samples, angle_weight, fmt, quality, scene, buffers = params
+    return _frame_key(pose, width, height, mode, samples, angle_weight, fmt, quality, *buffers, scene=scene)
+
+
+async def _prefetch_render(vec: np.ndarray, params: tuple) -> tuple:
+    """Render a predicted pose into RENDER_CACHE; returns its cache key."""
+    pose = Pose(**dict(zip(("px", "py", "pz", "tx", "ty", "tz", "ux", "uy", "uz", "fov"), vec.tolist())))
+    await _render_frame(pose, *params)
+    return _params_key(pose, params)
+
+
+# Prefetches only use workers that interactive requests leave idle
+PREFETCHER = Prefetcher(
+    _prefetch_render,
+    cached=RENDER_CACHE.peek,
+    idle=lambda: RENDER_POOL.pending < RENDER_POOL.workers,
+    steps=PREFETCH_FRAMES,
+    tolerance=PREFETCH_TOLERANCE,
+)
+
+
+async def _render_for_client(
+    client: str | None,
+    pose: Pose,
+    width: int,
+    height: int,
+    mode: str = "nearest",
+    samples: int = DEFAULT_DUMMY_SAMPLES,
+    angle_weight: float = 0.0,
+    fmt: str = "png",
+    quality: int | None = None,
+    scene: Scene | None = None,
+    buffers: tuple[str, ...] = (),
+) -> tuple[bytes, str, dict[str, float] | None, str | None]:
+    """`_render_frame` for an identified client, with trajectory prefetching.
+
+    Returns (payload, cache status `HIT`/`MISS`, stage timings or None, prefetch
+    match `exact`/`approximate` or None). An `approximate` frame was rendered
+    for a nearby pose (NERF_PREFETCH_TOLERANCE). Without a client id this is a
+    plain cached render.
+    """
+    params = (width, height, mode, samples, angle_weight, fmt, quality, scene, buffers)
+    if client is None:
+        data, hit, timings = await _render_frame(pose, *params)
+        return data, "HIT" if hit else "MISS", timings, None
+    prefetched = PREFETCHER.observe(client, _pose_vector(pose), params, _params_key(pose, params))
+    if prefetched is not None and not prefetched[1]:
+        data, status, timings, match = prefetched[0], "HIT", None, "approximate"
+    else:
+        # An exact prefetch is this request's own cache entry: look it up as usual so it counts once
+        data, hit, timings = await _render_frame(pose, *params)
+        status = "HIT" if hit else "MISS"
+        match = "exact" if prefetched is not None and hit else None
+    PREFETCHER.schedule(client)
+    return data, status, timings, match
 
 
 @app.get("/health")
 def health():
-    return {"ok": True}
+    return {
+        "ok": True,
+        "render_cache": RENDER_CACHE.stats(),
+        "input_cache": INPUT_CACHE.stats(),
+        "render_pool": RENDER_POOL.stats(),
+        "prefetch": PREFETCHER.stats(),
+        "scenes": SCENES.stats(),
+        "tiles": TILES.stats(),
+        "ingest": INGESTER.stats(),
+        "shared_cache": SHARED_CACHE.stats() if SHARED_CACHE else None,
+        "coalesced_renders": FRAME_FLIGHTS.coalesced,
+    }
+
+
+def _cache_stat(name: str):
+    return lambda: {("render",): RENDER_CACHE.stats()[name], ("input",): INPUT_CACHE.stats()[name]}
+
+
+REGISTRY.counter("nerf_cache_hits_total", "Frame/input cache hits.", ("cache",), _cache_stat("hits"))
+REGISTRY.counter("nerf_cache_misses_total", "Frame/input cache misses.", ("cache",), _cache_stat("misses"))
+REGISTRY.counter("nerf_cache_evictions_total", "Frame/input cache evictions.", ("cache",), _cache_stat("evictions"))
+REGISTRY.gauge("nerf_cache_bytes", "Bytes held by each cache.", ("cache",), _cache_stat("bytes"))
+REGISTRY.gauge("nerf_render_pool_pending", "Render jobs queued or running.", fn=lambda: RENDER_POOL.pending)
+REGISTRY.gauge("nerf_render_pool_workers", "Render pool size.", fn=lambda: RENDER_POOL.workers)
+REGISTRY.counter("nerf_render_pool_rejected_total", "Jobs refused because the queue was full.", fn=lambda: RENDER_POOL.rejected)
+REGISTRY.counter("nerf_prefetch_completed_total", "Prefetched frames rendered.", fn=lambda: PREFETCHER.completed)
+REGISTRY.counter("nerf_prefetch_hits_total", "Requests answered from a prefetched frame.", fn=lambda: PREFETCHER.hits)
+REGISTRY.counter("nerf_prefetch_observed_total", "Requests from prefetch clients (the hit rate denominator).",
+                 fn=lambda: PREFETCHER.observed)
+REGISTRY.counter("nerf_prefetch_approximate_total", "Requests answered with a frame prefetched for a nearby pose.",
+                 fn=lambda: PREFETCHER.approximate)
+REGISTRY.gauge("nerf_scenes_resident_bytes", "Mapped image packs plus pyramids of loaded scenes.",
+               fn=lambda: SCENES.stats()["resident_bytes"])
+REGISTRY.counter("nerf_scene_evictions_total", "Scenes unloaded to stay within NERF_SCENE_BUDGET_MB.", fn=lambda: SCENES.evictions)
+REGISTRY.counter("nerf_tiles_reused_total", "Analytic-renderer tiles copied from an identical earlier tile.",
+                 fn=lambda: TILES.cache.hits)
+REGISTRY.counter("nerf_tiles_composited_total", "Analytic-renderer tiles composited.", fn=lambda: TILES.cache.misses)
+REGISTRY.counter("nerf_renders_coalesced_total", "Requests that waited on an identical render already in flight.",
+                 fn=lambda: FRAME_FLIGHTS.coalesced)
+if SHARED_CACHE is not None:
+    def _shared_stat(name: str):
+        return lambda: SHARED_CACHE.stats()[name]
+
+    REGISTRY.counter("nerf_shared_cache_hits_total", "Frames served from the cross-process cache.", fn=_shared_stat("hits"))
+    REGISTRY.counter("nerf_shared_cache_misses_total", "Cross-process cache misses (renders).", fn=_shared_stat("misses"))
+    REGISTRY.counter("nerf_shared_cache_waits_total", "Lookups that waited on another process's render.",
+                     fn=_shared_stat("waits"))
+    REGISTRY.counter("nerf_shared_cache_evictions_total", "Frames evicted from the cross-process cache.",
+                     fn=_shared_stat("evictions"))
+    REGISTRY.gauge("nerf_shared_cache_bytes", "Bytes held by the cross-process cache.", fn=_shared_stat("bytes"))
+REGISTRY.counter("nerf_prefetch_diverged_total", "Times a client left its predicted trajectory.", fn=lambda: PREFETCHER.diverged)
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint."""
+    return Response(REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+def _busy() -> HTTPException:
+    return HTTPException(429, "Render queue full", headers={"Retry-After": "1"})
+
+
+def _resolve_scene(scene_id: str) -> Scene | None:
+    """Scene for a request. Unknown ids are a 404, scenes still being ingested a
+    503; a default scene without data on disk gives None (the analytic renderer)."""
+    job = INGESTER.active(scene_id)
+    if job is not None:
+        raise HTTPException(
+            503, f"Scene {scene_id!r} is being ingested ({job.done}/{job.total} images)", headers={"Retry-After": "5"}
+        )
+    if scene_id not in SCENES:
+        if scene_id == DEFAULT_SCENE:
+            return None
+        raise HTTPException(404, f"Unknown scene {scene_id!r}")
+    try:
+        return SCENES.get(scene_id)
+    except (OSError, ValueError) as e:
+        if scene_id == DEFAULT_SCENE:
+            return None
+        raise HTTPException(503, f"Scene {scene_id!r} could not be loaded: {e}")
+
+
+async def _request_scene(scene_id: str) -> Scene | None:
+    """`_resolve_scene` that loads (and possibly packs) scenes off the event loop."""
+    if SCENES.loaded(scene_id) is None:
+        return await run_in_threadpool(_resolve_scene, scene_id)
+    return _resolve_scene(scene_id)
+
+
+REVALIDATIONS = REGISTRY.counter(
+    "nerf_http_revalidations_total", "Requests with If-None-Match, by whether they got a 304.", ("endpoint", "result")
+)
+
+
+def _fresh(endpoint: str, if_none_match: str | None, etag: str) -> bool:
+    """Whether the client's copy is current (answer 304); counts every conditional request."""
+    if if_none_match is None:
+        return False
+    fresh = etag_matches(if_none_match, etag)
+    REVALIDATIONS.inc(endpoint=endpoint, result="not_modified" if fresh else "modified")
+    return fresh
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag, HTTP_MAX_AGE))
+
+
+def _scaled_size(width: int, height: int, scale: float) -> tuple[int, int]:
+    return max(1, round(width * scale)), max(1, round(height * scale))
 
 
 @app.get("/render")
-def render(
+async def render(
     px: float = Query(...),
     py: float = Query(...),
     pz: float = Query(...),
@@ -315,41 +864,522 @@ def render(
     fov: float = Query(60),
     w: int = Query(960),
     h: int = Query(540),
+    samples: int = Query(DEFAULT_DUMMY_SAMPLES, ge=1, le=MAX_DUMMY_SAMPLES),
+    angle_weight: float = Query(0.0, ge=0.0),
+    mode: str = Query("nearest", pattern="^(nearest|blend)$"),
+    format: str | None = Query(None, pattern=FORMAT_PATTERN),
+    quality: int | None = Query(None, ge=1, le=100),
+    scale: float = Query(1.0, gt=0, le=1),
+    scene: str = Query(DEFAULT_SCENE, pattern=SCENE_PATTERN, max_length=128),
+    client: str | None = Query(None, max_length=64),
+    buffers: str | None = Query(None, pattern=BUFFERS_PATTERN),
+    accept: str | None = Header(None),
+    if_none_match: str | None = Header(None),
 ):
     pose = Pose(px=px, py=py, pz=pz, tx=tx, ty=ty, tz=tz, ux=ux, uy=uy, uz=uz, fov=fov)
-    # TODO: Integrate with Nerfstudio viewer or API here.
-    # - Option A: spawn a persistent ns-viewer and send camera pose via websocket/HTTP
-    # - Option B: load ns model via Python API and render directly
-    # Prefer dataset nearest-view if available, fallback to analytic renderer
-    png = render_nearest_view(w, h, pose)
-    if png is None:
-        png = render_dummy(w, h, pose)
-    return Response(content=png, media_type="image/png")
+    aux = parse_buffers(buffers)
+    # Packed frames carry raw RGB, so the image format does not apply
+    fmt = "raw" if aux else negotiate(format, accept)
+    quality = None if aux else quality
+    w, h = _scaled_size(w, h, scale)
+    view = await _request_scene(scene)
+    with stage("etag"):
+        # Same key as the frame cache, so frames that share a cache entry share an ETag
+        etag = make_etag(RENDER_VERSION, _frame_key(pose, w, h, mode, samples, angle_weight, fmt, quality, *aux, scene=view))
+        fresh = _fresh("render", if_none_match, etag)
+    if fresh:
+        return _not_modified(etag)
+    try:
+        data, status, timings, prefetched = await _render_for_client(
+            client and f"http:{client}", pose, w, h, mode, samples, angle_weight, fmt, quality, view, aux
+        )
+    except PoolSaturated:
+        raise _busy()
+    headers = encode_headers(fmt, timings["encode"] if timings else None, (w, h))
+    headers["X-Cache"] = status
+    if prefetched:
+        headers["X-Prefetch"] = prefetched
+    if aux:
+        headers["X-Encode-Format"] = "buffers"
+    # An approximate prefetch is a frame of a nearby pose, not this one, so it gets no validator
+    if prefetched != "approximate":
+        headers.update(cache_headers(etag, HTTP_MAX_AGE))
+    return Response(content=data, media_type=BUFFERS_MEDIA_TYPE if aux else MEDIA_TYPES[fmt], headers=headers)
+
+
+class PathPose(Pose):
+    """Pose in a /render/batch request; `t` places a keyframe in time on a path."""
+    ux: float = 0
+    uy: float = 1
+    uz: float = 0
+    fov: float = 60
+    t: float | None = None
+
+
+class CameraPath(BaseModel):
+    """Keyframes sampled into `frames` evenly timed poses."""
+    keyframes: list[PathPose] = Field(..., min_length=1)
+    frames: int = Field(..., ge=1)
+    interpolation: str = Field("linear", pattern="^(linear|catmull_rom)$")
+
+
+class BatchRequest(BaseModel):
+    """Body of POST /render/batch: explicit `poses` or a keyframed `path`."""
+    poses: list[PathPose] | None = None
+    path: CameraPath | None = None
+    w: int = Field(960, ge=1, le=8192)
+    h: int = Field(540, ge=1, le=8192)
+    mode: str = Field("nearest", pattern="^(nearest|blend)$")
+    samples: int = Field(DEFAULT_DUMMY_SAMPLES, ge=1, le=MAX_DUMMY_SAMPLES)
+    angle_weight: float = Field(0.0, ge=0.0)
+    format: str = Field("png", pattern=FORMAT_PATTERN)
+    quality: int | None = Field(None, ge=1, le=100)
+    scene: str = Field(DEFAULT_SCENE, pattern=SCENE_PATTERN, max_length=128)
+    output: str = Field("multipart", pattern="^(multipart|zip|disk)$")
+    # Subdirectory of NERF_BATCH_DIR that output=disk writes into
+    name: str | None = Field(None, pattern=r"^[A-Za-z0-9][A-Za-z0-9_.-]*$", max_length=128)
+
+    @model_validator(mode="after")
+    def _one_source(self):
+        if (self.poses is None) == (self.path is None):
+            raise ValueError("Provide exactly one of 'poses' or 'path'")
+        if self.output == "disk" and not self.name:
+            raise ValueError("output=disk needs a 'name' for the output directory")
+        return self
+
+
+FRAME_EXTENSIONS = {"png": "png", "jpeg": "jpg", "webp": "webp", "raw": "rgb"}
+
+
+def _batch_poses(req: BatchRequest) -> list[Pose]:
+    """Expand a batch request into its per-frame poses."""
+    if req.poses is not None:
+        return list(req.poses)
+    keys = req.path.keyframes
+    times = None
+    if any(k.t is not None for k in keys):
+        if any(k.t is None for k in keys):
+            raise HTTPException(422, "Give every keyframe a 't' or none of them")
+        times = [k.t for k in keys]
+    rows = np.array([[k.px, k.py, k.pz, k.tx, k.ty, k.tz, k.ux, k.uy, k.uz, k.fov] for k in keys])
+    try:
+        rows = sample_path(rows, req.path.frames, times, req.path.interpolation)
+    except ValueError as e:
+        raise HTTPException(422, str(e))
+    up = rows[:, 6:9] / (np.linalg.norm(rows[:, 6:9], axis=1, keepdims=True) + 1e-8)
+    return [
+        Pose(px=r[0], py=r[1], pz=r[2], tx=r[3], ty=r[4], tz=r[5], ux=u[0], uy=u[1], uz=u[2], fov=r[9])
+        for r, u in zip(rows.tolist(), up.tolist())
+    ]
+
+
+async def _render_batch(
+    poses: list[Pose], req: BatchRequest, scene: Scene | None
+) -> AsyncIterator[tuple[int, bytes, bool]]:
+    """Yield (frame index, payload, cache hit) in completion order.
+
+    At most RENDER_WORKERS frames are in flight, leaving the rest of the pool's
+    queue to interactive clients; a saturated pool is waited out, not reported.
+    """
+    async def one(i: int) -> tuple[int, bytes, bool]:
+        while True:
+            try:
+                data, hit, _ = await _render_frame(
+                    poses[i], req.w, req.h, req.mode, req.samples, req.angle_weight, req.format, req.quality, scene
+                )
+                return i, data, hit
+            except PoolSaturated:
+                await asyncio.sleep(0.02)
+
+    pending: set[asyncio.Task] = set()
+    queued = iter(range(len(poses)))
+    try:
+        while True:
+            for i in queued:
+                pending.add(asyncio.ensure_future(one(i)))
+                if len(pending) >= RENDER_WORKERS:
+                    break
+            if not pending:
+                return
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        # Client went away or a frame failed: stop rendering the rest
+        for task in pending:
+            task.cancel()
+
+
+class _ZipStream:
+    """Write-only sink for zipfile; `drain` hands out what has been written so far."""
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+
+def _frame_name(i: int, fmt: str) -> str:
+    return f"frame_{i:05d}.{FRAME_EXTENSIONS[fmt]}"
+
+
+@app.post("/render/batch")
+async def render_batch(req: BatchRequest):
+    """Render many poses (or a sampled camera path) and stream frames as they finish.
+
+    `output=multipart` streams a multipart/mixed body with one part per frame
+    (`X-Frame-Index` header); `output=zip` streams a stored (uncompressed) zip of
+    `frame_NNNNN.<ext>` entries; `output=disk` writes those files plus
+    cameras.json under NERF_BATCH_DIR/<name> and streams NDJSON progress lines.
+    Frames arrive in completion order, not index order.
+    """
+    # Checked before a path is sampled, so an oversized request never allocates its frames
+    frames = len(req.poses) if req.poses is not None else req.path.frames
+    if frames > BATCH_MAX_FRAMES:
+        raise HTTPException(422, f"Batch has {frames} frames; the limit is {BATCH_MAX_FRAMES}")
+    poses = _batch_poses(req)
+    scene = await _request_scene(req.scene)
+    headers = {"X-Batch-Frames": str(len(poses))}
+
+    if req.output == "multipart":
+        boundary = f"frame-{secrets.token_hex(8)}"
+
+        async def body():
+            async for i, data, hit in _render_batch(poses, req, scene):
+                yield (
+                    f"--{boundary}\r\nContent-Type: {MEDIA_TYPES[req.format]}\r\n"
+                    f"Content-Length: {len(data)}\r\nX-Frame-Index: {i}\r\n"
+                    f"X-Cache: {'HIT' if hit else 'MISS'}\r\n\r\n"
+                ).encode("ascii") + data + b"\r\n"
+            yield f"--{boundary}--\r\n".encode("ascii")
+
+        return StreamingResponse(body(), media_type=f"multipart/mixed; boundary={boundary}", headers=headers)
+
+    if req.output == "zip":
+        async def body():
+            sink = _ZipStream()
+            with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as zf:
+                async for i, data, _ in _render_batch(poses, req, scene):
+                    zf.writestr(zipfile.ZipInfo(_frame_name(i, req.format), time.localtime()[:6]), data)
+                    yield sink.drain()
+            yield sink.drain()
+
+        headers["Content-Disposition"] = 'attachment; filename="frames.zip"'
+        return StreamingResponse(body(), media_type="application/zip", headers=headers)
+
+    out_dir = BATCH_DIR / req.name
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    async def body():
+        start = time.perf_counter()
+        async for i, data, hit in _render_batch(poses, req, scene):
+            name = _frame_name(i, req.format)
+            await asyncio.to_thread((out_dir / name).write_bytes, data)
+            yield json.dumps({"frame": i, "file": name, "bytes": len(data), "cache": "HIT" if hit else "MISS"}) + "\n"
+        cams = [{
+            "file": _frame_name(i, req.format),
+            "position": [p.px, p.py, p.pz],
+            "target": [p.tx, p.ty, p.tz],
+            "up": [p.ux, p.uy, p.uz],
+            "fov": p.fov,
+            "size": [req.w, req.h],
+        } for i, p in enumerate(poses)]
+        (out_dir / "cameras.json").write_text(json.dumps(cams, indent=2))
+        yield json.dumps({"done": True, "frames": len(poses), "dir": str(out_dir), "ms": round((time.perf_counter() - start) * 1000, 1)}) + "\n"
+
+    return StreamingResponse(body(), media_type="application/x-ndjson", headers=headers)
+
+
+# Frames the server may have sent but the client has not acked yet. Beyond this
+# the client is falling behind, so poses keep coalescing instead of queuing frames.
+STREAM_MAX_INFLIGHT = 2
+
+
+@app.websocket("/stream")
+async def stream(ws: WebSocket):
+    """Push frames for client poses, always rendering only the most recent pose.
+
+    Client messages are JSON: `{"type": "pose", px..., fov, w, h, mode}` and
+    `{"type": "ack"}` after each displayed frame. Poses that arrive while a frame
+    is rendering (or while too many frames are unacked) overwrite each other,
+    so intermediate drag positions are dropped rather than rendered. Each
+    connection is a prefetch client (see `_render_for_client`).
+
+    With `preview_scale` < 1 a new pose is first answered with a frame at that
+    scale; when no newer pose arrives within `refine_ms`, the full-size frame
+    for the same pose follows.
+    """
+    await ws.accept()
+    client = f"ws:{secrets.token_hex(8)}"
+    latest: StreamPose | None = None
+    inflight = 0
+    wake = asyncio.Event()
+    closed = False
+
+    async def receive():
+        nonlocal latest, inflight, closed
+        try:
+            while True:
+                try:
+                    msg = await ws.receive_json()
+                except ValueError:  # not JSON; the frame is consumed, so keep reading
+                    msg = None
+                if not isinstance(msg, dict):
+                    await ws.send_json({"type": "error", "detail": "Messages must be JSON objects"})
+                    continue
+                if msg.get("type") == "ack":
+                    inflight = max(0, inflight - 1)
+                else:
+                    try:
+                        latest = StreamPose.model_validate(msg)
+                    except ValidationError as e:
+                        await ws.send_json({"type": "error", "detail": e.errors(include_url=False)})
+                        continue
+                wake.set()
+        except (WebSocketDisconnect, RuntimeError, ValueError):
+            pass
+        finally:
+            closed = True
+            wake.set()
+
+    receiver = asyncio.create_task(receive())
+    refine: StreamPose | None = None  # pose whose preview was sent, awaiting its full-size frame
+    refine_at = 0.0
+    try:
+        while True:
+            # Waiting for acks blocks refinement too, so only time out when a frame could be sent
+            timeout = None if refine is None or inflight >= STREAM_MAX_INFLIGHT else refine_at - time.monotonic()
+            try:
+                await asyncio.wait_for(wake.wait(), max(0.0, timeout) if timeout is not None else None)
+            except asyncio.TimeoutError:
+                pass
+            wake.clear()
+            if closed:
+                break
+            if inflight >= STREAM_MAX_INFLIGHT:
+                continue
+            if latest is not None:
+                pose, latest, refine = latest, None, None
+                preview = pose.preview_scale < 1
+                w, h = _scaled_size(pose.w, pose.h, pose.preview_scale)
+                frame_client = client
+            elif refine is not None and time.monotonic() >= refine_at:
+                pose, refine, preview = refine, None, False
+                w, h = pose.w, pose.h
+                # Full-size frames are not part of the prefetched (preview) trajectory
+                frame_client = None
+            else:
+                continue
+            try:
+                view = await _request_scene(pose.scene)
+            except HTTPException as e:
+                await ws.send_json({"type": "error", "detail": e.detail})
+                continue
+            try:
+                frame, _, _, _ = await _render_for_client(
+                    frame_client, pose, w, h, pose.mode, fmt=pose.format, quality=pose.quality, scene=view
+                )
+            except PoolSaturated:
+                # Keep the pose unless a newer one arrived meanwhile, and retry shortly
+                if preview or frame_client is not None:
+                    latest = latest or pose
+                elif latest is None:
+                    refine = pose
+                await asyncio.sleep(0.01)
+                wake.set()
+                continue
+            if closed:
+                break
+            if preview and latest is None:
+                refine, refine_at = pose, time.monotonic() + pose.refine_ms / 1000
+            inflight += 1
+            await ws.send_bytes(frame)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        PREFETCHER.drop(client)
 
 
 @app.on_event("startup")
 def _on_start():
+    global RENDER_POOL
     # Create small demo dataset and publish assets
     ensure_demo_dataset()
+    # Packs for discovered scenes are checked and, if stale, rebuilt in the
+    # background; those scenes answer 503 until theirs is ready
+    for scene_id in SCENES.discover(SCENES_DIR):
+        INGESTER.submit(scene_id, SCENES_DIR / scene_id, SCENES_DIR / scene_id, in_place=True)
+    # Pool processes resolve scenes per job from (id, root), so they need no initializer
+    RENDER_POOL = RenderPool(RENDER_BACKEND, workers=RENDER_WORKERS, max_pending=RENDER_MAX_PENDING)
+    if PROFILER is not None:
+        PROFILER.start()
+
+
+@app.on_event("shutdown")
+def _on_stop():
+    RENDER_POOL.shutdown()
+    if PROFILER is not None:
+        PROFILER.stop()
+
+
+@app.get("/scenes")
+def list_scenes():
+    return {"default": DEFAULT_SCENE, "ids": SCENES.ids(), **SCENES.stats()}
+
+
+class IngestRequest(BaseModel):
+    # Directory below NERF_INGEST_ROOT with images and cameras.json or transforms.json
+    source: str = Field(..., min_length=1, max_length=1024)
+    scene: str = Field(..., pattern=SCENE_PATTERN, max_length=128)
+    # Longer image side after downscaling; 0 keeps full resolution
+    max_size: int = Field(INGEST_MAX_SIZE, ge=0, le=16384)
+
+
+def _ingest_job(job_id: str):
+    job = INGESTER.get(job_id)
+    if job is None:
+        raise HTTPException(404, f"Unknown ingestion job {job_id!r}")
+    return job
+
+
+@app.post("/ingest", status_code=202)
+def start_ingest(req: IngestRequest):
+    """Queue ingestion of a capture into scene `req.scene` (written to SCENES_DIR/<scene>)."""
+    if not INGEST_ROOT:
+        raise HTTPException(403, "Ingestion is disabled; set NERF_INGEST_ROOT")
+    root = Path(INGEST_ROOT).resolve()
+    source = (root / req.source).resolve()
+    if not source.is_relative_to(root) or not source.is_dir():
+        raise HTTPException(400, f"Source must be a directory below NERF_INGEST_ROOT: {req.source!r}")
+    if req.scene == DEFAULT_SCENE:
+        raise HTTPException(400, f"Scene id {DEFAULT_SCENE!r} is reserved for the demo dataset")
+    if not ((source / "cameras.json").is_file() or (source / "transforms.json").is_file()):
+        raise HTTPException(400, "Source has no cameras.json or transforms.json")
+    try:
+        job = INGESTER.submit(req.scene, source, SCENES_DIR / req.scene, max_size=req.max_size)
+    except ValueError as e:
+        raise HTTPException(409, str(e))
+    return job.to_dict()
+
+
+@app.get("/ingest")
+def list_ingest():
+    return {"jobs": [job.to_dict() for job in INGESTER.jobs()], **INGESTER.stats()}
+
+
+@app.get("/ingest/{job_id}")
+def get_ingest(job_id: str):
+    return _ingest_job(job_id).to_dict()
+
+
+@app.delete("/ingest/{job_id}")
+def cancel_ingest(job_id: str):
+    job = _ingest_job(job_id)
+    return {"cancelled": INGESTER.cancel(job_id), **job.to_dict()}
+
+
+@app.get("/ingest/{job_id}/events")
+async def ingest_events(job_id: str, interval: float = Query(0.5, ge=0.05, le=10)):
+    """NDJSON progress: a line whenever the job's status changes, until it finishes."""
+    job = _ingest_job(job_id)
+
+    async def body() -> AsyncIterator[bytes]:
+        last = None
+        while True:
+            status = job.to_dict()
+            # elapsed/rate change on every poll; only report actual progress
+            progress = (status["state"], status["done"], status["total"])
+            if progress != last:
+                last = progress
+                yield (json.dumps(status) + "\n").encode()
+            if not job.active:
+                break
+            await asyncio.sleep(interval)
+
+    return StreamingResponse(body(), media_type="application/x-ndjson", headers={"Cache-Control": "no-cache"})
 
 
 @app.get("/inputs")
-def list_inputs():
-    cams = DEMO["cameras"]
+def list_inputs(
+    response: Response,
+    scene: str = Query(DEFAULT_SCENE, pattern=SCENE_PATTERN, max_length=128),
+    if_none_match: str | None = Header(None),
+):
+    view = _resolve_scene(scene)
+    with stage("etag"):
+        etag = make_etag(view.id if view else "", view.version if view else "", "inputs")
+        fresh = _fresh("inputs", if_none_match, etag)
+    if fresh:
+        return _not_modified(etag)
+    response.headers.update(cache_headers(etag, HTTP_MAX_AGE))
+    cams = view.cameras if view else []
     return {"count": len(cams), "cameras": cams}
 
 
+def _encode_input_image(
+    idx: int, w: int | None, h: int | None, fmt: str, quality: int | None, scene_ref: tuple[str, str]
+) -> tuple[bytes, dict[str, float], tuple[int, int]]:
+    with collect() as stages:
+        scene = _job_scene(scene_ref)
+        if scene is None:
+            raise FileNotFoundError(f"Scene {scene_ref[0]!r} is unavailable")
+        pil = scene.images[idx]
+        if w and h:
+            with stage("resize"):
+                pil = scene.pyramid(idx).resized(int(w), int(h), snap=INPUT_SNAP)
+        data, stages["encode"] = encode_image(pil, fmt, quality)
+    return data, stages, pil.size
+
+
 @app.get("/inputs/image/{idx}")
-def get_input_image(idx: int, w: int | None = None, h: int | None = None):
-    if not DEMO["images"]:
-        raise HTTPException(404, "No demo images")
-    if idx < 0 or idx >= len(DEMO["images"]):
+async def get_input_image(
+    idx: int,
+    w: int | None = None,
+    h: int | None = None,
+    format: str | None = Query(None, pattern=FORMAT_PATTERN),
+    quality: int | None = Query(None, ge=1, le=100),
+    scene: str = Query(DEFAULT_SCENE, pattern=SCENE_PATTERN, max_length=128),
+    accept: str | None = Header(None),
+    if_none_match: str | None = Header(None),
+):
+    view = await _request_scene(scene)
+    if view is None or not len(view.images):
+        raise HTTPException(404, "No input images")
+    if idx < 0 or idx >= len(view.images):
         raise HTTPException(404, "Index out of range")
-    pil = DEMO["images"][idx]
-    if w and h:
-        pil = pil.resize((int(w), int(h)), Image.BICUBIC)
-    buf = io.BytesIO()
-    pil.save(buf, format="PNG")
-    return Response(content=buf.getvalue(), media_type="image/png")
+    fmt = negotiate(format, accept)
+    key = (view.id, view.version, idx, w, h, fmt, quality)
+    with stage("etag"):
+        etag = make_etag(RENDER_VERSION, key)
+        fresh = _fresh("inputs_image", if_none_match, etag)
+    if fresh:
+        return _not_modified(etag)
+    cached = INPUT_CACHE.get(key)
+    if cached is not None:
+        data, size = cached
+        headers = encode_headers(fmt, None, size)
+        headers["X-Cache"] = "HIT"
+        headers.update(cache_headers(etag, HTTP_MAX_AGE))
+        return Response(content=data, media_type=MEDIA_TYPES[fmt], headers=headers)
+    try:
+        data, timings, size = await RENDER_POOL.run(_encode_input_image, idx, w, h, fmt, quality, _scene_ref(view))
+    except PoolSaturated:
+        raise _busy()
+    record(timings)
+    INPUT_CACHE.put(key, (data, size), nbytes=len(data))
+    headers = encode_headers(fmt, timings["encode"], size)
+    headers["X-Cache"] = "MISS"
+    headers.update(cache_headers(etag, HTTP_MAX_AGE))
+    return Response(content=data, media_type=MEDIA_TYPES[fmt], headers=headers)
 
 # Run: uvicorn main:app --host 0.0.0.0 --port 7007
@@ -0,0 +1,215 @@
+"""Prometheus-style metrics and per-request stage timings.
+
+Hot paths wrap their work in `stage(name)`, which only reads the clock and
+adds to a dict. Pool jobs run `collect()` around their body and hand the dict
+back with their result. The event loop then passes it to `record()`, which
+feeds the stage histograms and the current request's `Server-Timing` header.
+This way timings also cross process-pool boundaries.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), fn: Callable | None = None):
+        """`fn`, if given, is called at scrape time and returns the value, or a
+        {label values tuple: value} dict for labelled metrics."""
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def samples(self) -> Iterator[tuple[str, str, float]]:
+        if self.fn is not None:
+            values = self.fn()
+            items = values.items() if isinstance(values, dict) else [((), values)]
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        for key, value in items:
+            yield self.name, _format_labels(self.labelnames, tuple(map(str, key))), float(value)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def samples(self) -> Iterator[tuple[str, str, float]]:
+        with self._lock:
+            series = [(key, list(counts), total) for key, (counts, total) in self._series.items()]
+        for key, counts, total in series:
+            running = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                running += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket", _format_labels((*self.labelnames, "le"), (*key, le)), running
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, running
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = (), fn: Callable | None = None) -> Counter:
+        return self._add(Counter(name, help, labelnames, fn))
+
+    def gauge(self, name: str, help: str, labelnames: tuple[str, ...] = (), fn: Callable | None = None) -> Gauge:
+        return self._add(Gauge(name, help, labelnames, fn))
+
+    def histogram(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {value:.17g}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+REQUEST_SECONDS = REGISTRY.histogram("nerf_request_duration_seconds", "HTTP request latency by route.", ("route", "method"))
+REQUESTS = REGISTRY.counter("nerf_requests_total", "HTTP responses by route and status.", ("route", "method", "status"))
+STAGE_SECONDS = REGISTRY.histogram("nerf_stage_duration_seconds", "Time in instrumented render/resize/encode stages.", ("stage",))
+
+_STAGES: ContextVar[dict[str, float] | None] = ContextVar("nerf_stages", default=None)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Add the block's wall time (ms) to the innermost `collect()` dict, if any."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages = _STAGES.get()
+        if stages is not None:
+            stages[name] = stages.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+
+@contextmanager
+def collect() -> Iterator[dict[str, float]]:
+    """Collect `stage()` timings (name -> ms) made in this context."""
+    stages: dict[str, float] = {}
+    token = _STAGES.set(stages)
+    try:
+        yield stages
+    finally:
+        _STAGES.reset(token)
+
+
+def record(stages: dict[str, float] | None) -> None:
+    """Observe stage timings returned by a pool job and add them to the current request."""
+    if not stages:
+        return
+    current = _STAGES.get()
+    for name, ms in stages.items():
+        STAGE_SECONDS.observe(ms / 1000, stage=name)
+        if current is not None:
+            current[name] = current.get(name, 0.0) + ms
+
+
+def server_timing(stages: dict[str, float], total_ms: float) -> str:
+    return ", ".join([f"{name};dur={ms:.2f}" for name, ms in stages.items()] + [f"total;dur={total_ms:.2f}"])
+
+
+class MetricsMiddleware:
+    """ASGI middleware: per-route latency and status metrics plus `Server-Timing`.
+
+    The header lists the stages recorded before the response started, and
+    `total` (time to first response byte). `profiler.finished(...)` is
+    called after every request when a profiler is given.
+    """
+
+    def __init__(self, app, profiler=None):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = server_timing(stages, (time.perf_counter() - start) * 1000)
+                message["headers"] = [*message.get("headers", []), (b"server-timing", header.encode("latin-1"))]
+            await send(message)
+
+        with collect() as stages:
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                end = time.perf_counter()
+                # The router stores the matched route in the shared scope
+                route = getattr(scope.get("route"), "path", "unmatched")
+                REQUEST_SECONDS.observe(end - start, route=route, method=scope["method"])
+                REQUESTS.inc(route=route, method=scope["method"], status=status)
+                if self.profiler is not None:
+                    self.profiler.finished(f"{scope['method']} {route}", start, end)
@@ -0,0 +1,210 @@
+"""Vectorized PLY reading and writing for point clouds and Gaussian splats.
+
+Each PLY element is a NumPy structured array whose field names and dtypes are
+the element's properties, e.g. `[("x", "<f4"), ("y", "<f4"), ("z", "<f4"),
+("red", "u1"), ("green", "u1"), ("blue", "u1")]`. Binary bodies are written as
+whole buffers and read back as memory maps, so files of tens of millions of
+points can be produced and consumed chunk by chunk with bounded memory.
+ASCII is supported for small, human-readable assets. List properties (mesh
+faces) are not supported.
+"""
+from pathlib import Path
+
+import numpy as np
+
+FORMATS = ("binary_little_endian", "binary_big_endian", "ascii")
+# PLY scalar type -> NumPy kind/size; both the 1.0 names and the sized aliases
+PLY_TYPES = {
+    "char": "i1", "int8": "i1",
+    "uchar": "u1", "uint8": "u1",
+    "short": "i2", "int16": "i2",
+    "ushort": "u2", "uint16": "u2",
+    "int": "i4", "int32": "i4",
+    "uint": "u4", "uint32": "u4",
+    "float": "f4", "float32": "f4",
+    "double": "f8", "float64": "f8",
+}
+_TYPE_NAMES = {"i1": "char", "u1": "uchar", "i2": "short", "u2": "ushort",
+               "i4": "int", "u4": "uint", "f4": "float", "f8": "double"}
+_BYTE_ORDER = {"binary_little_endian": "<", "binary_big_endian": ">", "ascii": "<"}
+# Rows per write/format call when streaming; ~32 MB for a 3DGS degree-0 record
+DEFAULT_CHUNK = 1 << 19
+# ASCII rows per formatting call; each row becomes a Python string first
+ASCII_CHUNK = 1 << 16
+
+
+def element_dtype(dtype: np.dtype, fmt: str = "binary_little_endian") -> np.dtype:
+    """Return `dtype` with every field in the byte order of `fmt`, validating PLY types."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported PLY format {fmt!r}")
+    dtype = np.dtype(dtype)
+    if dtype.names is None:
+        raise ValueError("PLY elements must be structured dtypes")
+    order = _BYTE_ORDER[fmt]
+    fields = []
+    for name in dtype.names:
+        field = dtype.fields[name][0]
+        kind = f"{field.kind}{field.itemsize}"
+        if kind not in _TYPE_NAMES or field.shape:
+            raise ValueError(f"Field {name!r} has no PLY scalar type ({field})")
+        fields.append((name, field.newbyteorder(order) if field.itemsize > 1 else field))
+    return np.dtype(fields)
+
+
+def format_header(elements: list[tuple[str, int, np.dtype]], fmt: str = "binary_little_endian", comments: list[str] = ()) -> bytes:
+    """Build a PLY header for (element name, count, structured dtype) triples."""
+    lines = ["ply", f"format {fmt} 1.0"]
+    lines += [f"comment {c}" for c in comments]
+    for name, count, dtype in elements:
+        lines.append(f"element {name} {count}")
+        for field in dtype.names:
+            ftype = dtype.fields[field][0]
+            lines.append(f"property {_TYPE_NAMES[f'{ftype.kind}{ftype.itemsize}']} {field}")
+    lines.append("end_header")
+    return ("\n".join(lines) + "\n").encode("ascii")
+
+
+def _ascii_formats(dtype: np.dtype, float_fmt: str) -> list[str]:
+    return [float_fmt if dtype.fields[n][0].kind == "f" else "%d" for n in dtype.names]
+
+
+class PlyWriter:
+    """Stream one PLY element to disk in chunks.
+
+    The element count goes into the header, so it must be known up front;
+    `close` raises if a different number of rows was written.
+
+        with PlyWriter(path, dtype, count) as ply:
+            for chunk in chunks:
+                ply.write(chunk)
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        dtype: np.dtype,
+        count: int,
+        fmt: str = "binary_little_endian",
+        element: str = "vertex",
+        comments: list[str] = (),
+        float_fmt: str = "%.6g",
+    ):
+        self.dtype = element_dtype(dtype, fmt)
+        self.count = int(count)
+        self.fmt = fmt
+        self.written = 0
+        self._row_fmt = " ".join(_ascii_formats(self.dtype, float_fmt)) + "\n"
+        self._file = open(path, "wb")
+        self._file.write(format_header([(element, self.count, self.dtype)], fmt, comments))
+
+    def write(self, rows: np.ndarray) -> None:
+        """Append rows; fields are matched by name and cast to the element dtype.
+
+        ASCII output formats the values as given, so float64 input keeps its
+        precision in the text even when the header declares `float`.
+        """
+        if self.written + len(rows) > self.count:
+            raise ValueError(f"PLY element overflow: {self.written + len(rows)} > {self.count} rows")
+        if self.fmt == "ascii":
+            columns = [rows[name] for name in self.dtype.names]
+            for start in range(0, len(rows), ASCII_CHUNK):
+                block = [c[start:start + ASCII_CHUNK].tolist() for c in columns]
+                text = (self._row_fmt * len(block[0])) % tuple(v for row in zip(*block) for v in row)
+                self._file.write(text.encode("ascii"))
+        else:
+            if rows.dtype != self.dtype:
+                cast = np.empty(len(rows), dtype=self.dtype)
+                for name in self.dtype.names:
+                    cast[name] = rows[name]
+                rows = cast
+            self._file.write(np.ascontiguousarray(rows).data)
+        self.written += len(rows)
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self._file.close()
+        if self.written != self.count:
+            raise ValueError(f"PLY header declares {self.count} rows but {self.written} were written")
+
+    def __enter__(self) -> "PlyWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+
+
+def write_ply(
+    path: str | Path,
+    data: np.ndarray,
+    fmt: str = "binary_little_endian",
+    element: str = "vertex",
+    comments: list[str] = (),
+    float_fmt: str = "%.6g",
+    chunk_size: int = DEFAULT_CHUNK,
+) -> None:
+    """Write a structured array as a single-element PLY file."""
+    with PlyWriter(path, data.dtype, len(data), fmt, element, comments, float_fmt) as ply:
+        for start in range(0, len(data), chunk_size):
+            ply.write(data[start:start + chunk_size])
+
+
+def read_header(path: str | Path) -> tuple[str, list[tuple[str, int, np.dtype]], int]:
+    """Parse a PLY header; returns (format, [(element, count, dtype)], body offset)."""
+    elements: list[tuple[str, int, list]] = []
+    fmt = None
+    with open(path, "rb") as f:
+        if f.readline().strip() != b"ply":
+            raise ValueError(f"{path} is not a PLY file")
+        while True:
+            line = f.readline()
+            if not line:
+                raise ValueError(f"{path}: missing end_header")
+            words = line.decode("ascii").split()
+            if not words or words[0] in ("comment", "obj_info"):
+                continue
+            if words[0] == "end_header":
+                offset = f.tell()
+                break
+            if words[0] == "format":
+                fmt = words[1]
+                if fmt not in FORMATS:
+                    raise ValueError(f"{path}: unsupported PLY format {fmt!r}")
+            elif words[0] == "element":
+                elements.append((words[1], int(words[2]), []))
+            elif words[0] == "property":
+                if words[1] == "list":
+                    raise ValueError(f"{path}: list properties are not supported ({words[-1]})")
+                if not elements:
+                    raise ValueError(f"{path}: property before any element")
+                elements[-1][2].append((words[2], PLY_TYPES[words[1]]))
+    if fmt is None:
+        raise ValueError(f"{path}: missing format line")
+    order = _BYTE_ORDER[fmt]
+    return fmt, [(name, count, np.dtype([(n, order + t) for n, t in props])) for name, count, props in elements], offset
+
+
+def read_ply(path: str | Path, mmap: bool = True) -> dict[str, np.ndarray]:
+    """Read every element of a PLY file as {element name: structured array}.
+
+    Binary elements are returned as read-only memory maps when `mmap` is true,
+    so slicing them streams from disk; ASCII files are parsed into memory.
+    """
+    fmt, elements, offset = read_header(path)
+    out: dict[str, np.ndarray] = {}
+    if fmt == "ascii":
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for name, count, dtype in elements:
+                out[name] = np.loadtxt(f, dtype=dtype, max_rows=count, ndmin=1) if count else np.empty(0, dtype)
+        return out
+    for name, count, dtype in elements:
+        if mmap and count:
+            out[name] = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,))
+        else:
+            out[name] = np.fromfile(path, dtype=dtype, count=count, offset=offset)
+        offset += count * dtype.itemsize
+    return out
@@ -0,0 +1,281 @@
+"""Predictive per-client prefetching of frames along the camera trajectory.
+
+Each client's recent poses are kept as 10-vectors (position, target, up, fov).
+The next few poses are extrapolated either as an orbit about a fixed target
+(the common OrbitControls drag) or with a constant velocity, and rendered while
+the render pool has idle workers. Prefetched frames go into the caller's
+frame cache under their own keys, so a request that quantizes to a predicted
+pose is an ordinary cache hit. Optionally, a request within `tolerance` of a
+prefetched pose is answered with that frame instead. When the real pose
+leaves the predicted trajectory, outstanding prefetches are cancelled.
+"""
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Hashable
+
+import numpy as np
+
+# Slots of a pose vector
+POS, TARGET, UP, FOV = slice(0, 3), slice(3, 6), slice(6, 9), 9
+# Pose difference (see pose_distance) beyond which the client left its predicted trajectory
+DIVERGENCE = 0.03
+# Predictions closer than this to an already prefetched pose are not rendered again
+SAME_POSE = 1e-6
+
+
+def pose_distance(a: np.ndarray, b: np.ndarray) -> float:
+    """Pose difference relative to the camera's distance from its target.
+
+    Position and target offsets are divided by that distance, and fov by its
+    value, so the same tolerance works for any scene scale.
+    """
+    radius = max(float(np.linalg.norm(a[POS] - a[TARGET])), 1e-6)
+    return max(
+        float(np.linalg.norm(a[POS] - b[POS])) / radius,
+        float(np.linalg.norm(a[TARGET] - b[TARGET])) / radius,
+        float(np.linalg.norm(a[UP] - b[UP])),
+        abs(float(a[FOV] - b[FOV])) / max(abs(float(a[FOV])), 1e-6),
+    )
+
+
+def _spherical(offset: np.ndarray, up: np.ndarray, e1: np.ndarray, e2: np.ndarray) -> tuple[float, float]:
+    """(azimuth about `up` measured from e1 towards e2, polar angle from `up`) of a camera offset."""
+    polar = float(np.arccos(np.clip(offset.dot(up) / np.linalg.norm(offset), -1.0, 1.0)))
+    return float(np.arctan2(offset.dot(e2), offset.dot(e1))), polar
+
+
+def predict_poses(times: list[float], poses: list[np.ndarray], steps: int, dt: float) -> tuple[str, list[np.ndarray]]:
+    """Extrapolate `steps` poses spaced `dt` seconds after the last one.
+
+    Returns (model, poses) with model "orbit", "velocity" or "still" (no motion,
+    nothing to predict). Orbit is chosen when the target stayed put while the
+    camera moved: azimuth about the up vector, polar angle and distance to the
+    target are extrapolated linearly, as OrbitControls moves the camera, so
+    orbit + dolly also works.
+    """
+    if len(poses) < 2 or steps <= 0:
+        return "still", []
+    p0, p1 = poses[-2], poses[-1]
+    elapsed = max(times[-1] - times[-2], 1e-3)
+    radius0 = float(np.linalg.norm(p0[POS] - p0[TARGET]))
+    radius1 = float(np.linalg.norm(p1[POS] - p1[TARGET]))
+    scale = max(radius1, 1e-6)
+    if pose_distance(p1, p0) < 1e-5:
+        return "still", []
+
+    out = []
+    o0, o1 = p0[POS] - p0[TARGET], p1[POS] - p1[TARGET]
+    sin = float(np.linalg.norm(np.cross(o0, o1)))
+    target_still = float(np.linalg.norm(p1[TARGET] - p0[TARGET])) < 1e-3 * scale
+    up = p1[UP] / max(float(np.linalg.norm(p1[UP])), 1e-9)
+    # Azimuth reference: o1 projected onto the plane normal to up (degenerate looking straight along up)
+    e1 = o1 - up * o1.dot(up)
+    flat = float(np.linalg.norm(e1))
+    if target_still and radius0 > 1e-6 and sin > 1e-9 * radius0 * radius1 and flat > 1e-6 * radius1:
+        e1 /= flat
+        e2 = np.cross(up, e1)
+        az0, polar0 = _spherical(o0, up, e1, e2)
+        az1, polar1 = _spherical(o1, up, e1, e2)
+        omega = -az0 / elapsed  # az1 is 0 by construction
+        polar_rate = (polar1 - polar0) / elapsed
+        dolly = (radius1 - radius0) / elapsed
+        fov_rate = (p1[FOV] - p0[FOV]) / elapsed
+        for k in range(1, steps + 1):
+            ahead = k * dt
+            az = omega * ahead
+            polar = float(np.clip(polar1 + polar_rate * ahead, 1e-6, np.pi - 1e-6))
+            direction = np.sin(polar) * (np.cos(az) * e1 + np.sin(az) * e2) + np.cos(polar) * up
+            pose = p1.copy()
+            pose[POS] = p1[TARGET] + direction * max(radius1 + dolly * ahead, 1e-6)
+            pose[FOV] = p1[FOV] + fov_rate * ahead
+            out.append(pose)
+        return "orbit", out
+
+    velocity = (p1 - p0) / elapsed
+    for k in range(1, steps + 1):
+        pose = p1 + velocity * (k * dt)
+        pose[UP] = p1[UP]
+        out.append(pose)
+    return "velocity", out
+
+
+class _Client:
+    def __init__(self, history: int):
+        self.times: deque[float] = deque(maxlen=history)
+        self.poses: deque[np.ndarray] = deque(maxlen=history)
+        self.queue: deque[np.ndarray] = deque()
+        self.predicted: list[np.ndarray] = []
+        # Cache keys of prefetched frames -> (pose, params)
+        self.frames: OrderedDict[Hashable, tuple[np.ndarray, Hashable]] = OrderedDict()
+        self.params: Hashable = None
+        self.task: asyncio.Task | None = None
+
+
+class Prefetcher:
+    """Tracks clients' pose histories and prefetches predicted frames when idle.
+
+    `render(pose, params)` renders a predicted pose into the frame cache and
+    returns its cache key; `cached(key)` reads that cache. `idle()` says
+    whether the render pool has spare capacity right now. With `tolerance`
+    above 0, a request with the same `params` (size, mode, format, ...) and a
+    pose within `tolerance` (see `pose_distance`) of a prefetched one may be
+    answered with that frame.
+    """
+
+    def __init__(
+        self,
+        render: Callable[[np.ndarray, Hashable], Awaitable[Hashable]],
+        cached: Callable[[Hashable], object | None],
+        idle: Callable[[], bool],
+        steps: int = 3,
+        tolerance: float = 0.0,
+        history: int = 8,
+        max_clients: int = 256,
+    ):
+        self.render = render
+        self.cached = cached
+        self.idle = idle
+        self.steps = steps
+        self.tolerance = tolerance
+        self.history = history
+        self.max_clients = max_clients
+        self._clients: OrderedDict[Hashable, _Client] = OrderedDict()
+        self.issued = 0
+        self.completed = 0
+        self.observed = 0
+        self.hits = 0
+        self.approximate = 0
+        self.skipped_busy = 0
+        self.diverged = 0
+        self.cancelled = 0
+        self.models = {"orbit": 0, "velocity": 0, "still": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.steps > 0
+
+    def _client(self, client_id: Hashable) -> _Client:
+        client = self._clients.get(client_id)
+        if client is None:
+            client = self._clients[client_id] = _Client(self.history)
+            while len(self._clients) > self.max_clients:
+                _, old = self._clients.popitem(last=False)
+                self._cancel(old)
+        self._clients.move_to_end(client_id)
+        return client
+
+    def _cancel(self, client: _Client) -> None:
+        if client.task is not None and not client.task.done():
+            client.task.cancel()
+            self.cancelled += 1
+        client.task = None
+        client.queue.clear()
+        client.frames.clear()
+        client.predicted = []
+
+    def observe(self, client_id: Hashable, pose: np.ndarray, params: Hashable, key: Hashable) -> tuple[object, bool] | None:
+        """Record a requested pose (cache key `key`); returns (frame, exact) if a prefetched frame answers it.
+
+        `exact` is False for a frame prefetched for a nearby pose (only with
+        `tolerance` > 0). Cancels outstanding prefetches when the pose left
+        the predicted trajectory or the render parameters changed.
+        """
+        if not self.enabled:
+            return None
+        self.observed += 1
+        client = self._client(client_id)
+        client.times.append(time.monotonic())
+        client.poses.append(pose)
+        if params != client.params or (
+            client.predicted
+            and min(pose_distance(pose, p) for p in client.predicted) > max(DIVERGENCE, 3 * self.tolerance)
+        ):
+            if client.predicted or client.frames:
+                self.diverged += 1
+            self._cancel(client)
+            client.params = params
+        if key in client.frames:
+            frame = self.cached(key)
+            if frame is not None:
+                self.hits += 1
+                return frame, True
+        best, best_d = None, self.tolerance
+        if self.tolerance > 0:
+            for frame_key, (p, frame_params) in client.frames.items():
+                d = pose_distance(pose, p)
+                if frame_params == params and d <= best_d:
+                    best, best_d = frame_key, d
+        frame = self.cached(best) if best is not None else None
+        if frame is None:
+            return None
+        self.hits += 1
+        self.approximate += 1
+        return frame, False
+
+    def schedule(self, client_id: Hashable) -> None:
+        """Queue predictions from the client's latest poses, replacing older ones."""
+        if not self.enabled:
+            return
+        client = self._client(client_id)
+        times = list(client.times)
+        intervals = np.diff(times[-4:])
+        if self.tolerance > 0:
+            # Predict at the client's own pose cadence
+            dt = float(np.clip(np.median(intervals), 1 / 120, 0.25)) if len(intervals) else 0.05
+        else:
+            # Only frames whose cache key a request hits are useful: repeat the client's last pose step exactly
+            dt = float(intervals[-1]) if len(intervals) else 0.05
+        model, poses = predict_poses(times, list(client.poses), self.steps, dt)
+        self.models[model] += 1
+        client.predicted = poses
+        client.queue = deque(
+            p for p in poses
+            if not any(pose_distance(p, q) <= max(self.tolerance, SAME_POSE) for q, _ in client.frames.values())
+        )
+        if client.queue and (client.task is None or client.task.done()):
+            client.task = asyncio.ensure_future(self._run(client))
+
+    async def _run(self, client: _Client) -> None:
+        while client.queue:
+            pose = client.queue.popleft()
+            if not self.idle():
+                self.skipped_busy += 1
+                continue
+            params = client.params
+            self.issued += 1
+            try:
+                key = await self.render(pose, params)
+            except Exception:
+                continue  # e.g. the pool filled up meanwhile; prefetching is best effort
+            if params != client.params:
+                continue
+            self.completed += 1
+            client.frames[key] = (pose, params)
+            client.frames.move_to_end(key)
+            while len(client.frames) > 2 * self.steps:
+                client.frames.popitem(last=False)
+
+    def drop(self, client_id: Hashable) -> None:
+        """Forget a client (e.g. its WebSocket closed)."""
+        client = self._clients.pop(client_id, None)
+        if client is not None:
+            self._cancel(client)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "steps": self.steps,
+            "clients": len(self._clients),
+            "issued": self.issued,
+            "completed": self.completed,
+            "observed": self.observed,
+            "hits": self.hits,
+            "approximate": self.approximate,
+            # Share of a client's requests answered by a prefetched frame
+            "hit_rate": self.hits / self.observed if self.observed else 0.0,
+            "skipped_busy": self.skipped_busy,
+            "diverged": self.diverged,
+            "cancelled": self.cancelled,
+            "models": dict(self.models),
+        }
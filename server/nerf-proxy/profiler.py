@@ -0,0 +1,84 @@
+"""Opt-in sampling profiler that dumps collapsed stacks for slow requests.
+
+A daemon thread samples every thread's Python stack at a fixed interval and
+keeps a short ring buffer. When a request is slower than the threshold, the
+samples taken during that request are written as collapsed stacks
+(`frame;frame;frame count` per line). flamegraph.pl, speedscope and inferno
+read this format directly. Samples come from all busy threads, including
+render pool threads. Jobs on the process backend run elsewhere, so they
+show up only as the event loop waiting.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+
+# Frames at the top of a stack that mean the thread is just waiting for work
+IDLE_FILES = ("threading.py", "queue.py", "selectors.py")
+
+
+def _collapse(frame) -> str | None:
+    """Root-first `func (file:line)` stack, or None for idle threads."""
+    top = frame.f_code
+    if os.path.basename(top.co_filename) in IDLE_FILES or (top.co_name == "_worker" and top.co_filename.endswith("thread.py")):
+        return None
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    def __init__(self, out_dir: Path, slow_ms: float, interval_ms: float = 5.0, window_s: float = 60.0, keep: int = 200):
+        self.out_dir = Path(out_dir)
+        self.slow_ms = slow_ms
+        self.interval = interval_ms / 1000
+        self.window_s = window_s
+        self.keep = keep
+        self.dumped = 0
+        self._samples: deque[tuple[float, str]] = deque()
+        self._files: deque[Path] = deque()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            stacks = [s for tid, f in sys._current_frames().items() if tid != me and (s := _collapse(f))]
+            with self._lock:
+                self._samples.extend((now, s) for s in stacks)
+                while self._samples and self._samples[0][0] < now - self.window_s:
+                    self._samples.popleft()
+
+    def finished(self, label: str, start: float, end: float) -> Path | None:
+        """Dump the samples taken in [start, end] if the request was slow."""
+        ms = (end - start) * 1000
+        if ms < self.slow_ms:
+            return None
+        with self._lock:
+            stacks = Counter(s for t, s in self._samples if start <= t <= end)
+        if not stacks:
+            return None
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", label).strip("_")
+        path = self.out_dir / f"{time.strftime('%Y%m%d-%H%M%S')}-{self.dumped:05d}-{slug}-{ms:.0f}ms.folded"
+        path.write_text("".join(f"{stack} {n}\n" for stack, n in stacks.most_common()))
+        self.dumped += 1
+        self._files.append(path)
+        while len(self._files) > self.keep:
+            self._files.popleft().unlink(missing_ok=True)
+        return path
@@ -0,0 +1,87 @@
+"""Byte-budgeted LRU cache for encoded frames, keyed on quantized camera pose."""
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable
+
+
+def quantize(value: float, step: float) -> int:
+    """Snap a float onto an integer grid so near-identical poses share a key."""
+    return int(round(value / step))
+
+
+def pose_key(pose, width: int, height: int, *extra: Hashable, pos_step: float = 1e-3, fov_step: float = 1e-2) -> tuple:
+    """Build a cache key from a pose, output size and any render options that change the frame."""
+    return (
+        quantize(pose.px, pos_step), quantize(pose.py, pos_step), quantize(pose.pz, pos_step),
+        quantize(pose.tx, pos_step), quantize(pose.ty, pos_step), quantize(pose.tz, pos_step),
+        quantize(pose.ux, pos_step), quantize(pose.uy, pos_step), quantize(pose.uz, pos_step),
+        quantize(pose.fov, fov_step),
+        int(width), int(height),
+        *extra,
+    )
+
+
+class RenderCache:
+    """Thread-safe LRU of encoded frames bounded by total payload bytes.
+
+    Values are usually `bytes`; other values can be stored by passing their
+    payload size to `put` explicitly.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, key: Hashable) -> Any | None:
+        """Like `get`, but leaves hit/miss counters and LRU order alone (for bookkeeping lookups)."""
+        with self._lock:
+            entry = self._items.get(key)
+            return None if entry is None else entry[0]
+
+    def put(self, key: Hashable, value: Any, nbytes: int | None = None) -> None:
+        size = len(value) if nbytes is None else nbytes
+        if size > self.max_bytes:
+            return  # never let one oversized frame flush the whole cache
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._items[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
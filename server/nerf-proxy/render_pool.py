@@ -0,0 +1,80 @@
+"""Bounded execution backends for CPU-heavy render and encode work."""
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+from fastapi.concurrency import run_in_threadpool
+
+BACKENDS = ("inline", "thread", "process")
+
+
+class PoolSaturated(Exception):
+    """Raised when a job is submitted while the pool's queue is already full."""
+
+
+class RenderPool:
+    """Run render/encode jobs off the event loop with bounded queue depth.
+
+    - `inline`: Starlette's shared threadpool (the pre-pool behavior).
+    - `thread`: a dedicated thread pool; NumPy and PIL release the GIL for most work.
+    - `process`: a spawn-based process pool; `initializer` runs once per worker,
+      e.g. to load the shared dataset, so jobs only carry pose arguments.
+
+    At most `max_pending` jobs may be queued or running; beyond that `run`
+    raises `PoolSaturated` instead of letting latency grow without bound.
+    """
+
+    def __init__(
+        self,
+        backend: str = "thread",
+        workers: int = 4,
+        max_pending: int = 8,
+        initializer: Callable[..., None] | None = None,
+        initargs: tuple = (),
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown render backend {backend!r}; expected one of {BACKENDS}")
+        self.backend = backend
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.pending = 0
+        self.rejected = 0
+        self._executor: Executor | None = None
+        if backend == "thread":
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="render")
+        elif backend == "process":
+            self._executor = ProcessPoolExecutor(
+                self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=initializer,
+                initargs=initargs,
+            )
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Await `fn(*args)` on the backend; raise `PoolSaturated` if the queue is full."""
+        # Only touched from the event loop thread, so no lock is needed
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PoolSaturated()
+        self.pending += 1
+        try:
+            if self._executor is None:
+                return await run_in_threadpool(fn, *args)
+            return await asyncio.wrap_future(self._executor.submit(fn, *args))
+        finally:
+            self.pending -= 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,334 @@
+"""Scenes keyed by id, loaded on demand from packed, memory-mapped image files.
+
+A scene directory holds `cameras.json` (one entry per view; optional `file`
+relative to the directory, default `images/NNN.png`) and its images, plus
+optional depth maps and masks (`depth_file`/`mask_file`, default
+`depth/NNN.png` and `masks/NNN.png`). On
+first load the images are decoded once into `images.pack`: raw RGB rows
+back to back, described by `images.pack.json` (offset and size per image,
+plus the dataset version they were built from). Every process, whether a
+uvicorn worker or a render pool process, maps the same file read-only, so
+the decoded pixels live once in the OS page cache. Views are wrapped as PIL
+images only when accessed. Loaded scenes are kept in LRU order and evicted
+when their mapped packs plus pyramids exceed the memory budget.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from camera_index import CameraIndex
+from image_pyramid import ImagePyramid
+from metrics import stage
+
+PACK_FILE = "images.pack"
+PACK_INDEX = "images.pack.json"
+PACK_VERSION = 1
+# Depth PNGs hold camera-space z as uint16 in these units unless a camera sets `depth_scale`
+DEFAULT_DEPTH_SCALE = 0.001
+
+
+def image_paths(root: Path, cameras: list[dict]) -> list[Path]:
+    return [root / cam.get("file", f"images/{i:03d}.png") for i, cam in enumerate(cameras)]
+
+
+def dataset_version(cams_bytes: bytes, paths: list[Path]) -> str:
+    """Hash of cameras.json plus each image's size and mtime (cheap: no image reads)."""
+    h = hashlib.sha256(cams_bytes)
+    for path in paths:
+        try:
+            st = path.stat()
+            h.update(f"{path.name}:{st.st_size}:{st.st_mtime_ns};".encode())
+        except OSError:
+            h.update(f"{path.name}:missing;".encode())
+    return h.hexdigest()[:16]
+
+
+def pack_layout(sizes) -> tuple[list[dict], int]:
+    """Pack index entries (offset, width, height) and total bytes for images of the given (width, height)."""
+    entries = []
+    offset = 0
+    for w, h in sizes:
+        entries.append({"offset": offset, "width": w, "height": h})
+        offset += w * h * 3
+    return entries, offset
+
+
+def publish_pack(root: Path, tmp: str, version: str, entries: list[dict], nbytes: int) -> dict:
+    """Move a fully written `PACK_FILE + tmp` into place and write its index, index last,
+    so concurrent readers never see a partial pack."""
+    root = Path(root)
+    index = {"pack_version": PACK_VERSION, "version": version, "bytes": nbytes, "images": entries}
+    (root / (PACK_INDEX + tmp)).write_text(json.dumps(index))
+    os.replace(root / (PACK_FILE + tmp), root / PACK_FILE)
+    os.replace(root / (PACK_INDEX + tmp), root / PACK_INDEX)
+    return index
+
+
+def write_pack(root: Path, images, version: str) -> dict:
+    """Write RGB images (PIL images or HxWx3 uint8 arrays, any iterable) as a pack."""
+    root = Path(root)
+    tmp = f".tmp{os.getpid()}-{threading.get_ident()}"
+    sizes = []
+    with open(root / (PACK_FILE + tmp), "wb") as f:
+        for img in images:
+            rgb = np.asarray(img.convert("RGB") if isinstance(img, Image.Image) else img, dtype=np.uint8)
+            f.write(np.ascontiguousarray(rgb).tobytes())
+            sizes.append((rgb.shape[1], rgb.shape[0]))
+    entries, nbytes = pack_layout(sizes)
+    return publish_pack(root, tmp, version, entries, nbytes)
+
+
+def read_pack_index(root: Path) -> dict | None:
+    try:
+        index = json.loads((Path(root) / PACK_INDEX).read_text())
+    except (OSError, ValueError):
+        return None
+    return index if index.get("pack_version") == PACK_VERSION else None
+
+
+class PackedImages:
+    """Read-only sequence of the images in a pack, backed by one memory map."""
+
+    def __init__(self, root: Path, index: dict):
+        self._entries = index["images"]
+        self.nbytes = index["bytes"]
+        self._mm = np.memmap(Path(root) / PACK_FILE, dtype=np.uint8, mode="r") if self.nbytes else np.zeros(0, np.uint8)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def size(self, idx: int) -> tuple[int, int]:
+        e = self._entries[idx]
+        return e["width"], e["height"]
+
+    def array(self, idx: int) -> np.ndarray:
+        """(H, W, 3) uint8 view into the map; pages are read on first touch."""
+        e = self._entries[idx]
+        n = e["width"] * e["height"] * 3
+        return self._mm[e["offset"]:e["offset"] + n].reshape(e["height"], e["width"], 3)
+
+    def __getitem__(self, idx: int) -> Image.Image:
+        if idx < 0:
+            idx += len(self)
+        return Image.frombuffer("RGB", self.size(idx), self.array(idx), "raw", "RGB", 0, 1)
+
+
+class Scene:
+    """One dataset: cameras, their spatial index, packed images and per-view pyramids.
+
+    Pyramids and decoded aux maps share one LRU and are dropped once the pack
+    plus both exceed `budget_bytes` (None: unbounded); the most recently used
+    entry stays.
+    """
+
+    def __init__(self, scene_id: str, root: Path, budget_bytes: int | None = None):
+        self.id = scene_id
+        self.root = Path(root)
+        cams_bytes = (self.root / "cameras.json").read_bytes()
+        self.cameras: list[dict] = json.loads(cams_bytes)
+        paths = image_paths(self.root, self.cameras)
+        index = read_pack_index(self.root)
+        if all(p.exists() for p in paths):
+            self.version = dataset_version(cams_bytes, paths)
+            if index is None or index["version"] != self.version or len(index["images"]) != len(paths):
+                with stage("decode"):
+                    index = write_pack(self.root, (Image.open(p) for p in paths), self.version)
+        elif index is not None and len(index["images"]) == len(self.cameras):
+            # Packed by ingestion without keeping the source images
+            self.version = index["version"]
+        else:
+            raise FileNotFoundError(f"Scene {scene_id!r}: images missing under {self.root}")
+        self.images = PackedImages(self.root, index)
+        self.index = CameraIndex.from_cameras(self.cameras)
+        self.budget_bytes = budget_bytes
+        self.evictions = 0
+        # ("pyramid" | "aux", view index) -> ImagePyramid | (depth, alpha), least recently used first
+        self._derived: OrderedDict[tuple[str, int], ImagePyramid | tuple] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def pyramids(self) -> dict[int, ImagePyramid]:
+        with self._lock:
+            return {idx: v for (kind, idx), v in self._derived.items() if kind == "pyramid"}
+
+    def _remember(self, key: tuple[str, int], build):
+        with self._lock:
+            value = self._derived.get(key)
+            if value is not None:
+                self._derived.move_to_end(key)
+                return value
+        value = build()
+        with self._lock:
+            value = self._derived.setdefault(key, value)
+        # Pyramid levels are built on first use, so this accounts for the entries used before this one
+        self.shrink()
+        return value
+
+    def shrink(self, budget_bytes: int | None = None) -> None:
+        """Drop least recently used pyramids and aux maps while over `budget_bytes` (default: the scene's own)."""
+        budget = self.budget_bytes if budget_bytes is None else budget_bytes
+        if budget is None:
+            return
+        with self._lock:
+            total = self.images.nbytes + sum(_nbytes(v) for v in self._derived.values())
+            while total > budget and len(self._derived) > 1:
+                _, value = self._derived.popitem(last=False)
+                total -= _nbytes(value)
+                self.evictions += 1
+
+    def pyramid(self, idx: int) -> ImagePyramid:
+        return self._remember(("pyramid", idx), lambda: ImagePyramid(self.images[idx]))
+
+    def aux(self, idx: int) -> tuple[np.ndarray | None, np.ndarray | None]:
+        """(depth, alpha) of view `idx` as float32 (H, W) arrays, None where the file is missing.
+
+        Depth is camera-space z in scene units (0 = no surface); alpha is the mask scaled to [0, 1].
+        Decoded on first use and kept with the scene's pyramids.
+        """
+        return self._remember(("aux", idx), lambda: self._decode_aux(idx))
+
+    def _decode_aux(self, idx: int) -> tuple[np.ndarray | None, np.ndarray | None]:
+        cam = self.cameras[idx]
+        with stage("decode"):
+            depth = _read_gray(self.root / cam.get("depth_file", f"depth/{idx:03d}.png"))
+            if depth is not None:
+                depth *= cam.get("depth_scale", DEFAULT_DEPTH_SCALE)
+            alpha = _read_gray(self.root / cam.get("mask_file", f"masks/{idx:03d}.png"))
+            if alpha is not None:
+                alpha /= 255.0
+        return depth, alpha
+
+    @property
+    def resident_bytes(self) -> int:
+        """Mapped pack size plus memory held by pyramid levels, resize memos and decoded aux maps."""
+        with self._lock:
+            derived = list(self._derived.values())
+        return self.images.nbytes + sum(_nbytes(v) for v in derived)
+
+
+def _nbytes(value: ImagePyramid | tuple) -> int:
+    if isinstance(value, ImagePyramid):
+        return value.nbytes
+    return sum(a.nbytes for a in value if a is not None)
+
+
+def _read_gray(path: Path) -> np.ndarray | None:
+    try:
+        with Image.open(path) as img:
+            return np.asarray(img, dtype=np.float32).copy()
+    except OSError:
+        return None
+
+
+class SceneRegistry:
+    """Scene id -> directory, with lazily loaded scenes evicted LRU over `budget_bytes`.
+
+    The most recently used scene is never evicted; if it alone exceeds the
+    budget it drops its own pyramids and aux maps instead. Evicted scenes load again (cheaply: the pack is reused) on
+    their next request.
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self._roots: dict[str, Path] = {}
+        self._loaded: OrderedDict[str, Scene] = OrderedDict()
+        self._loading: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+        self._gets = 0
+
+    def register(self, scene_id: str, root: Path) -> None:
+        """Add or repoint a scene; a loaded copy is dropped so the next get() reloads it."""
+        with self._lock:
+            self._roots[scene_id] = Path(root)
+            self._loaded.pop(scene_id, None)
+
+    def discover(self, scenes_dir: Path) -> list[str]:
+        """Register every subdirectory with a cameras.json under its name."""
+        found = []
+        for root in sorted(Path(scenes_dir).iterdir()) if Path(scenes_dir).is_dir() else []:
+            if (root / "cameras.json").exists():
+                self.register(root.name, root)
+                found.append(root.name)
+        return found
+
+    def __contains__(self, scene_id: str) -> bool:
+        return scene_id in self._roots
+
+    def ids(self) -> list[str]:
+        return sorted(self._roots)
+
+    def get(self, scene_id: str) -> Scene:
+        """The loaded scene; raises KeyError if unknown, OSError/ValueError if its data is unusable."""
+        with self._lock:
+            scene = self._loaded.get(scene_id)
+            if scene is not None:
+                self._loaded.move_to_end(scene_id)
+                self._gets += 1
+        if scene is not None:
+            # Pyramids grow with use; re-check the budget now and then rather than on every frame
+            if self._gets % 64 == 0:
+                self.trim()
+            return scene
+        with self._lock:
+            root = self._roots[scene_id]
+            loading = self._loading.setdefault(scene_id, threading.Lock())
+        # Load outside the registry lock so other scenes stay available meanwhile
+        with loading:
+            with self._lock:
+                scene = self._loaded.get(scene_id)
+            if scene is None:
+                scene = Scene(scene_id, root, self.budget_bytes)
+                with self._lock:
+                    if self._roots.get(scene_id) == root:
+                        self._loaded[scene_id] = scene
+                    self.loads += 1
+        self.trim()
+        return scene
+
+    def ensure(self, scene_id: str, root: Path) -> Scene:
+        """get() that first registers `root` if this process does not know the scene under it.
+
+        Lets render pool processes resolve scenes registered after they started.
+        """
+        if self._roots.get(scene_id) != Path(root):
+            self.register(scene_id, root)
+        return self.get(scene_id)
+
+    def loaded(self, scene_id: str) -> Scene | None:
+        return self._loaded.get(scene_id)
+
+    def unload(self, scene_id: str) -> None:
+        with self._lock:
+            self._loaded.pop(scene_id, None)
+
+    def trim(self) -> None:
+        """Evict least recently used scenes while over budget, then shrink the last one to fit."""
+        with self._lock:
+            total = sum(s.resident_bytes for s in self._loaded.values())
+            while total > self.budget_bytes and len(self._loaded) > 1:
+                _, scene = self._loaded.popitem(last=False)
+                total -= scene.resident_bytes
+                self.evictions += 1
+            last = next(reversed(self._loaded.values()), None) if total > self.budget_bytes else None
+        if last is not None:
+            last.shrink(self.budget_bytes)
+
+    def stats(self) -> dict:
+        with self._lock:
+            loaded = {sid: s.resident_bytes for sid, s in self._loaded.items()}
+        return {
+            "scenes": len(self._roots),
+            "loaded": list(loaded),
+            "resident_bytes": sum(loaded.values()),
+            "budget_bytes": self.budget_bytes,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
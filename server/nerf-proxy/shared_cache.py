@@ -0,0 +1,332 @@
+"""Frame cache shared by every server process on the host, with single-flight renders.
+
+Frames are files named by a hash of their cache key under `directory`
+(tmpfs by default, so they live in RAM and survive worker restarts). An
+index file, memory-mapped by every process, is an open-addressed hash table
+of fixed slots (key digest, size, last access, state, owner). Index changes
+happen under an exclusive `flock` on a lock file, plus a thread lock.
+
+A miss claims its slot as *pending* before rendering. Other processes
+asking for the same key see the pending slot and poll until it becomes
+ready, instead of rendering it again. A claim is abandoned if its process
+exits or its lease runs out. Total bytes are kept under `max_bytes` by
+evicting least recently used frames. Within one process, `SingleFlight`
+coalesces concurrent callers before they reach the index.
+"""
+import asyncio
+import hashlib
+import mmap
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Hashable
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # no flock (Windows): the shared cache is unavailable there
+    fcntl = None
+
+MAGIC = b"NFC2"
+HEADER = np.dtype([
+    ("magic", "S4"), ("slots", "<u4"), ("bytes", "<u8"), ("used", "<u4"), ("tombstones", "<u4"),
+    ("hits", "<u8"), ("misses", "<u8"), ("waits", "<u8"), ("evictions", "<u8"), ("pad", "V8"),
+])  # 64 bytes
+SLOT = np.dtype([
+    ("digest", "V16"), ("size", "<u8"), ("atime", "<f8"), ("lease", "<f8"), ("state", "<u4"), ("pid", "<u4"),
+    ("token", "<u8"),
+])  # 56 bytes; token identifies one pending claim, as a process may claim a key again after its lease ran out
+EMPTY, READY, PENDING, DELETED = 0, 1, 2, 3
+# Evict down to this share of the budget so eviction scans are amortized over many inserts
+EVICT_TO = 0.9
+# Beyond this share of live slots, LRU entries are evicted even under the byte budget
+MAX_LOAD = 0.7
+
+
+class SingleFlight:
+    """Coalesce concurrent async calls with the same key into one call.
+
+    The call runs as its own task, so a caller that is cancelled (e.g. a client
+    that disconnected) does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._tasks: dict[Hashable, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """Returns (result, whether this caller started the call)."""
+        task = self._tasks.get(key)
+        leader = task is None
+        if leader:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task), leader
+
+    def _done(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()  # retrieved, so an error nobody awaited is not logged as lost
+
+    @property
+    def inflight(self) -> int:
+        return len(self._tasks)
+
+
+def key_digest(key: Hashable) -> bytes:
+    """Index and file name digest of a cache key (its repr must be stable across processes)."""
+    return hashlib.blake2b(repr(key).encode(), digest_size=16).digest()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedFrameCache:
+    def __init__(self, directory: Path, max_bytes: int, slots: int = 65536, lease_s: float = 30.0):
+        if fcntl is None:
+            raise RuntimeError("The shared frame cache needs fcntl.flock")
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.lease_s = lease_s
+        self.objects = self.directory / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self._thread_lock = threading.Lock()
+        self._lock_fd = os.open(self.directory / "index.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        self._pid = os.getpid()
+        size = HEADER.itemsize + slots * SLOT.itemsize
+        path = self.directory / "index"
+        with self._locked():
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if os.fstat(fd).st_size != size:
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, size)
+                self._mm = mmap.mmap(fd, size)
+            finally:
+                os.close(fd)
+            self._header = np.frombuffer(self._mm, dtype=HEADER, count=1)[0:1]
+            self._slots = np.frombuffer(self._mm, dtype=SLOT, count=slots, offset=HEADER.itemsize)
+            if bytes(self._header["magic"][0]) != MAGIC or int(self._header["slots"][0]) != slots:
+                # New or incompatible index: start empty
+                self._mm[:] = bytes(size)
+                self._header["magic"] = MAGIC
+                self._header["slots"] = slots
+                for stale in self.objects.glob("*/*"):
+                    stale.unlink(missing_ok=True)
+        self.renders = 0
+
+    @contextmanager
+    def _locked(self):
+        # flock excludes other processes; threads of this one share the lock's file description
+        with self._thread_lock:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _path(self, digest: bytes) -> Path:
+        name = digest.hex()
+        return self.objects / name[:2] / name
+
+    def _find(self, digest: bytes) -> tuple[int, int]:
+        """(slot holding `digest` or -1, first free slot on its probe path or -1). Caller holds the lock."""
+        slots = self._slots
+        n = len(slots)
+        i = int.from_bytes(digest[:8], "little") % n
+        free = -1
+        for _ in range(n):
+            state = int(slots["state"][i])
+            if state == EMPTY:
+                return -1, free if free >= 0 else i
+            if state == DELETED:
+                if free < 0:
+                    free = i
+            elif slots["digest"][i].tobytes() == digest:
+                return i, free
+            i = (i + 1) % n
+        return -1, free
+
+    def _claim(self, digest: bytes) -> tuple[str, int]:
+        """(`hit`, `pending` (someone else is rendering it) or `claimed` (the caller must render it), claim token).
+
+        The token (0 unless claimed) must be passed back to `_publish`/`_release`.
+        """
+        now = time.time()
+        with self._locked():
+            i, free = self._find(digest)
+            if i >= 0:
+                state = int(self._slots["state"][i])
+                if state == READY:
+                    self._slots["atime"][i] = now
+                    self._header["hits"] += 1
+                    return "hit", 0
+                pid = int(self._slots["pid"][i])
+                if self._slots["lease"][i] > now and (pid == self._pid or _pid_alive(pid)):
+                    self._header["waits"] += 1
+                    return "pending", 0
+                free = i  # abandoned claim: take it over
+            else:
+                if free < 0 or self._header["used"][0] + 1 > MAX_LOAD * len(self._slots):
+                    self._evict(count=max(1, len(self._slots) // 20))
+                    i, free = self._find(digest)
+                if free < 0:
+                    return "claimed", 0  # table full of pending claims: render without publishing
+                if self._slots["state"][free] == DELETED:
+                    self._header["tombstones"] -= 1
+                self._header["used"] += 1
+            slot = self._slots[free:free + 1]
+            slot["digest"] = np.void(digest)
+            slot["state"] = PENDING
+            slot["pid"] = self._pid
+            slot["lease"] = now + self.lease_s
+            slot["size"] = 0
+            token = secrets.randbits(64) or 1
+            slot["token"] = token
+            self._header["misses"] += 1
+            return "claimed", token
+
+    def _forget(self, digest: bytes) -> None:
+        """Drop a ready entry whose file has disappeared."""
+        with self._locked():
+            i, _ = self._find(digest)
+            if i >= 0 and int(self._slots["state"][i]) == READY:
+                self._delete(i)
+
+    def _release(self, digest: bytes, token: int, size: int | None, tmp: Path | None = None) -> bool:
+        """Mark our pending claim ready with `size` bytes, moving `tmp` into place, or drop it (size None).
+
+        False if we no longer hold the claim (never made, or taken over after the lease ran out).
+        """
+        with self._locked():
+            i, _ = self._find(digest)
+            if i < 0 or int(self._slots["state"][i]) != PENDING or int(self._slots["token"][i]) != token:
+                return False
+            if size is None:
+                self._delete(i)
+                return True
+            if tmp is not None:
+                os.replace(tmp, self._path(digest))
+            self._slots["state"][i] = READY
+            self._slots["size"][i] = size
+            self._slots["atime"][i] = time.time()
+            self._header["bytes"] += size
+            if self._header["bytes"][0] > self.max_bytes:
+                self._evict()
+            return True
+
+    def _delete(self, i: int) -> None:
+        if int(self._slots["state"][i]) == READY:
+            self._header["bytes"] -= self._slots["size"][i]
+            self._path(self._slots["digest"][i].tobytes()).unlink(missing_ok=True)
+        self._slots["state"][i] = DELETED
+        self._header["used"] -= 1
+        self._header["tombstones"] += 1
+
+    def _evict(self, count: int = 0) -> None:
+        """Drop least recently used frames until under EVICT_TO of the budget (and at least `count`)."""
+        ready = np.flatnonzero(self._slots["state"] == READY)
+        order = ready[np.argsort(self._slots["atime"][ready], kind="stable")]
+        target = self.max_bytes * EVICT_TO
+        for n, i in enumerate(order):
+            if n >= count and self._header["bytes"][0] <= target:
+                break
+            self._delete(int(i))
+            self._header["evictions"] += 1
+        if self._header["tombstones"][0] > len(self._slots) // 4:
+            self._compact()
+
+    def _compact(self) -> None:
+        """Rebuild the table without tombstones so probe chains stay short."""
+        live = self._slots[(self._slots["state"] == READY) | (self._slots["state"] == PENDING)].copy()
+        self._slots[:] = np.zeros(len(self._slots), dtype=SLOT)
+        for entry in live:
+            _, free = self._find(entry["digest"].tobytes())
+            self._slots[free] = entry
+        self._header["used"] = len(live)
+        self._header["tombstones"] = 0
+
+    def _read(self, digest: bytes) -> bytes | None:
+        try:
+            return self._path(digest).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def _write_tmp(self, digest: bytes, token: int, data: bytes) -> Path:
+        """Write `data` next to its final path; `_release` moves it there only if the claim still holds."""
+        path = self._path(digest)
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_name(f"{path.name}.tmp{token:x}")
+        tmp.write_bytes(data)
+        return tmp
+
+    async def get_or_create(self, key: Hashable, create: Callable[[], Awaitable[bytes]]) -> tuple[bytes, bool]:
+        """Cached frame for `key`, or the result of `create()` published for every process.
+
+        Returns (payload, whether `create` ran here). While another process
+        renders the same key, this polls for its result.
+        """
+        digest = key_digest(key)
+        delay = 0.002
+        while True:
+            status, token = await asyncio.to_thread(self._claim, digest)
+            if status == "hit":
+                data = await asyncio.to_thread(self._read, digest)
+                if data is not None:
+                    return data, False
+                # Evicted between lookup and read, or removed behind our back; look again
+                await asyncio.to_thread(self._forget, digest)
+                continue
+            if status == "claimed":
+                try:
+                    data = await create()
+                except BaseException:
+                    await asyncio.to_thread(self._release, digest, token, None)
+                    raise
+                self.renders += 1
+                await asyncio.to_thread(self._publish, digest, token, data)
+                return data, True
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.05)
+
+    def _publish(self, digest: bytes, token: int, data: bytes) -> None:
+        if not token:
+            return  # rendered without a claim
+        if len(data) > self.max_bytes * EVICT_TO:
+            self._release(digest, token, None)  # would evict everything else
+            return
+        tmp = self._write_tmp(digest, token, data)
+        if not self._release(digest, token, len(data), tmp):
+            tmp.unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        h = self._header[0]
+        lookups = int(h["hits"]) + int(h["misses"])
+        return {
+            "dir": str(self.directory),
+            "bytes": int(h["bytes"]),
+            "max_bytes": self.max_bytes,
+            "entries": int(np.count_nonzero(self._slots["state"] == READY)),
+            "pending": int(np.count_nonzero(self._slots["state"] == PENDING)),
+            "hits": int(h["hits"]),
+            "misses": int(h["misses"]),
+            "waits": int(h["waits"]),
+            "evictions": int(h["evictions"]),
+            "hit_rate": int(h["hits"]) / lookups if lookups else 0.0,
+            "renders_here": self.renders,
+        }
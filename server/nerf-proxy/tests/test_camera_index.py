@@ -0,0 +1,63 @@
+import numpy as np
+
+from camera_index import CameraIndex
+
+
+def brute_force(positions, forwards, query, forward, k, angle_weight):
+    cost = np.linalg.norm(positions - query, axis=1)
+    if forward is not None and angle_weight > 0:
+        f = forward / np.linalg.norm(forward)
+        fwd = forwards / np.linalg.norm(forwards, axis=1, keepdims=True)
+        cost = cost + angle_weight * np.arccos(np.clip(fwd @ f, -1.0, 1.0))
+    order = np.argsort(cost, kind="stable")[:k]
+    return order, cost[order]
+
+
+def test_knn_matches_brute_force():
+    rng = np.random.default_rng(0)
+    positions = rng.normal(size=(500, 3)) * [5, 1, 3]
+    forwards = rng.normal(size=(500, 3))
+    index = CameraIndex(positions, forwards, leaf_size=8)
+    for query in rng.normal(size=(50, 3)) * 4:
+        for k in (1, 5, 17):
+            idx, cost = index.nearest(query, k=k)
+            expected, expected_cost = brute_force(positions, forwards, query, None, k, 0.0)
+            assert idx.tolist() == expected.tolist()
+            np.testing.assert_allclose(cost, expected_cost)
+
+
+def test_angle_weight_reranks_by_view_direction():
+    # Two cameras equally far from the query; only one looks the same way
+    positions = np.array([[1.0, 0, 0], [-1.0, 0, 0], [10.0, 0, 0]])
+    forwards = np.array([[0, 0, 1.0], [0, 0, -1.0], [0, 0, -1.0]])
+    index = CameraIndex(positions, forwards)
+    idx, _ = index.nearest([0, 0, 0], forward=[0, 0, -1], k=1, angle_weight=1.0)
+    assert idx.tolist() == [1]
+    idx, _ = index.nearest([0, 0, 0], forward=[0, 0, 1], k=1, angle_weight=1.0)
+    assert idx.tolist() == [0]
+
+
+def test_angle_weight_matches_brute_force_within_candidates():
+    rng = np.random.default_rng(1)
+    positions = rng.normal(size=(200, 3))
+    forwards = rng.normal(size=(200, 3))
+    index = CameraIndex(positions, forwards)
+    query, forward = np.zeros(3), np.array([0.0, 0.0, 1.0])
+    idx, cost = index.nearest(query, forward, k=3, angle_weight=0.5, candidates=len(positions))
+    expected, expected_cost = brute_force(positions, forwards, query, forward, 3, 0.5)
+    assert idx.tolist() == expected.tolist()
+    np.testing.assert_allclose(cost, expected_cost)
+
+
+def test_from_cameras_and_small_indexes():
+    cameras = [{"position": [0, 0, 3], "target": [0, 0, 0]}, {"position": [3, 0, 0], "target": [0, 0, 0]}]
+    index = CameraIndex.from_cameras(cameras)
+    assert len(index) == 2
+    idx, cost = index.nearest([2.9, 0, 0.1], k=5)  # k beyond the camera count
+    assert idx.tolist() == [1, 0]
+    assert cost[0] < cost[1]
+    np.testing.assert_allclose(np.linalg.norm(index.forwards, axis=1), 1.0)
+
+    empty = CameraIndex.from_cameras([])
+    idx, cost = empty.nearest([0, 0, 0])
+    assert len(idx) == 0 and len(cost) == 0
@@ -0,0 +1,84 @@
+import json
+import struct
+
+import numpy as np
+from PIL import Image
+
+from frame_buffers import MAGIC, MEDIA_TYPE, NO_SOURCE, VERSION, pack_frame, parse_buffers, resize_nearest
+
+
+def unpack(payload: bytes) -> tuple[dict, dict[str, np.ndarray]]:
+    """Decode a packed frame the way a client does: header, then typed views at the given offsets."""
+    assert payload[:4] == MAGIC
+    (length,) = struct.unpack("<I", payload[4:8])
+    header = json.loads(payload[8:8 + length])
+    arrays = {}
+    for entry in header["buffers"]:
+        assert entry["offset"] % 8 == 0 and entry["offset"] >= 8 + length
+        dtype = np.dtype(entry["dtype"]).newbyteorder("<")
+        flat = np.frombuffer(payload, dtype, count=entry["bytes"] // dtype.itemsize, offset=entry["offset"])
+        shape = (header["height"], header["width"]) + ((entry["channels"],) if entry["channels"] > 1 else ())
+        arrays[entry["name"]] = flat.reshape(shape)
+    return header, arrays
+
+
+def test_parse_buffers_is_canonical():
+    assert parse_buffers(None) == ()
+    assert parse_buffers("source,depth") == ("depth", "source")
+    assert parse_buffers("alpha,alpha,bogus") == ("alpha",)
+
+
+def test_pack_round_trip():
+    rng = np.random.default_rng(0)
+    rgb = rng.integers(0, 256, size=(5, 7, 3), dtype=np.uint8)
+    depth = rng.uniform(0.5, 8.0, size=(5, 7)).astype(np.float32)
+    depth[0, 0] = 0
+    alpha = rng.uniform(0, 1, size=(5, 7)).astype(np.float32)
+    source = rng.integers(0, 40, size=(5, 7)).astype(np.uint16)
+    payload, pack_ms = pack_frame(Image.fromarray(rgb), {"depth": depth, "alpha": alpha, "source": source},
+                                  ("depth", "alpha", "source"))
+    assert pack_ms >= 0
+    header, arrays = unpack(payload)
+    assert (header["version"], header["width"], header["height"]) == (VERSION, 7, 5)
+    assert [e["name"] for e in header["buffers"]] == ["rgb", "depth", "alpha", "source"]
+    entries = {e["name"]: e for e in header["buffers"]}
+    assert entries["depth"]["none"] == 0 and entries["source"]["none"] == NO_SOURCE
+    assert np.array_equal(arrays["rgb"], rgb)
+    np.testing.assert_allclose(arrays["depth"], depth, rtol=1e-3)
+    np.testing.assert_allclose(arrays["alpha"], alpha, atol=1e-3)
+    assert np.array_equal(arrays["source"], source)
+    last = header["buffers"][-1]
+    assert len(payload) == last["offset"] + last["bytes"]
+
+
+def test_missing_buffers_are_empty_and_others_are_resized():
+    depth = np.array([[1.0, 2.0], [3.0, 4.0]], np.float32)
+    payload, _ = pack_frame(Image.new("RGB", (4, 4)), {"depth": depth}, ("depth", "source"))
+    _, arrays = unpack(payload)
+    assert np.array_equal(arrays["depth"], np.repeat(np.repeat(depth, 2, 0), 2, 1))
+    assert (arrays["source"] == NO_SOURCE).all()
+
+
+def test_resize_nearest_never_blends():
+    ids = np.arange(12, dtype=np.uint16).reshape(3, 4)
+    assert resize_nearest(ids, 4, 3) is ids
+    small = resize_nearest(ids, 2, 2)
+    assert small.tolist() == [[1, 3], [9, 11]]
+    assert set(resize_nearest(ids, 9, 7).ravel()) <= set(ids.ravel())
+
+
+def test_render_endpoint_returns_packed_buffers():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    client = TestClient(main.app)
+    query = {"px": 0.3, "py": 0.4, "pz": 3, "tx": 0, "ty": 0, "tz": 0, "ux": 0, "uy": 1, "uz": 0, "fov": 60, "w": 32, "h": 24}
+    response = client.get("/render", params={**query, "buffers": "alpha,depth"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == MEDIA_TYPE
+    header, arrays = unpack(response.content)
+    assert (header["width"], header["height"]) == (32, 24)
+    assert sorted(arrays) == ["alpha", "depth", "rgb"]
+    assert ((arrays["alpha"] >= 0) & (arrays["alpha"] <= 1)).all()
+    assert client.get("/render", params={**query, "buffers": "normals"}).status_code == 422
@@ -0,0 +1,71 @@
+from http_cache import cache_headers, etag_matches, make_etag
+
+
+def test_etag_is_strong_and_depends_on_every_part():
+    etag = make_etag(1, ("pose", 0.5), "png")
+    assert etag.startswith('"') and etag.endswith('"') and not etag.startswith("W/")
+    assert etag == make_etag(1, ("pose", 0.5), "png")
+    assert etag != make_etag(2, ("pose", 0.5), "png")
+    assert etag != make_etag(1, ("pose", 0.5), "webp")
+
+
+def test_if_none_match():
+    etag = make_etag("frame")
+    other = make_etag("other")
+    assert etag_matches(etag, etag)
+    assert etag_matches(f"W/{etag}", etag)  # weak comparison
+    assert etag_matches(f"{other}, {etag}", etag)
+    assert etag_matches(f"{other},W/{etag}", etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(other, etag)
+    assert not etag_matches(etag.strip('"'), etag)  # unquoted is a different tag
+    assert not etag_matches(None, etag)
+    assert not etag_matches("", etag)
+
+
+def test_cache_headers():
+    assert cache_headers('"a"', 0) == {"ETag": '"a"', "Cache-Control": "no-cache"}
+    assert cache_headers('"a"', 60) == {"ETag": '"a"', "Cache-Control": "public, max-age=60"}
+
+
+def test_render_revalidation():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    client = TestClient(main.app)
+    query = {"px": 0.4, "py": 0.2, "pz": 3, "tx": 0, "ty": 0, "tz": 0, "ux": 0, "uy": 1, "uz": 0, "fov": 60, "w": 32, "h": 24}
+    first = client.get("/render", params=query)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    again = client.get("/render", params=query, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["ETag"] == etag
+
+    moved = client.get("/render", params={**query, "px": 0.5}, headers={"If-None-Match": etag})
+    assert moved.status_code == 200
+    assert moved.content and moved.headers["ETag"] != etag
+
+
+def test_revalidations_are_counted_and_timed():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    def count(result):
+        samples = {labels: value for _, labels, value in main.REVALIDATIONS.samples()}
+        return samples.get(f'{{endpoint="render",result="{result}"}}', 0.0)
+
+    client = TestClient(main.app)
+    query = {"px": 0.3, "py": 0.1, "pz": 3, "tx": 0, "ty": 0, "tz": 0, "w": 32, "h": 24}
+    etag = client.get("/render", params=query).headers["ETag"]
+    before = count("not_modified"), count("modified")
+
+    again = client.get("/render", params=query, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert "etag;dur=" in again.headers["Server-Timing"]
+    client.get("/render", params={**query, "px": 0.35}, headers={"If-None-Match": etag})
+    assert (count("not_modified"), count("modified")) == (before[0] + 1, before[1] + 1)
+    assert 'nerf_http_revalidations_total{endpoint="render",result="not_modified"}' in client.get("/metrics").text
@@ -0,0 +1,84 @@
+import io
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import main
+from image_codec import encode_headers, encode_image, negotiate
+
+
+@pytest.mark.parametrize(
+    "fmt, accept, expected",
+    [
+        ("raw", "image/webp", "raw"),  # explicit format wins
+        (None, None, "png"),
+        (None, "*/*", "png"),
+        (None, "image/*, */*;q=0.8", "png"),
+        (None, "image/jpeg", "jpeg"),
+        (None, "image/webp,image/png;q=0.9", "webp"),
+        (None, "image/webp;q=0.5, image/jpeg;q=0.8", "jpeg"),
+        (None, "image/png, image/jpeg, image/webp", "webp"),  # ties follow server preference
+        (None, "image/webp;q=0, image/jpeg;q=bad", "png"),
+        (None, "IMAGE/JPEG ; q=0.7", "jpeg"),
+    ],
+)
+def test_negotiate(fmt, accept, expected):
+    assert negotiate(fmt, accept) == expected
+
+
+def gradient(width=40, height=30) -> Image.Image:
+    x = np.linspace(0, 255, width, dtype=np.uint8)
+    y = np.linspace(0, 255, height, dtype=np.uint8)
+    rgb = np.stack(np.broadcast_arrays(x[None, :], y[:, None], np.full((height, width), 90, np.uint8)), axis=-1)
+    return Image.fromarray(rgb)
+
+
+def test_raw_is_packed_rgb_rows():
+    pil = gradient()
+    data, encode_ms = encode_image(pil.convert("RGBA"), "raw")
+    assert encode_ms >= 0
+    assert data == pil.tobytes()
+    assert np.array_equal(np.frombuffer(data, np.uint8).reshape(30, 40, 3), np.asarray(pil))
+    assert encode_headers("raw", 1.234, pil.size) == {
+        "X-Encode-Format": "raw",
+        "Vary": "Accept",
+        "X-Encode-Ms": "1.23",
+        "X-Image-Width": "40",
+        "X-Image-Height": "30",
+    }
+
+
+@pytest.mark.parametrize("fmt, tolerance", [("png", 0), ("jpeg", 12), ("webp", 12)])
+def test_encoded_formats_decode_back(fmt, tolerance):
+    pil = gradient()
+    data, _ = encode_image(pil, fmt)
+    decoded = Image.open(io.BytesIO(data))
+    assert decoded.format == fmt.upper()
+    diff = np.abs(np.asarray(decoded.convert("RGB"), int) - np.asarray(pil, int))
+    assert diff.mean() <= tolerance
+
+
+def test_quality_changes_lossy_size():
+    pil = gradient(128, 96)
+    assert len(encode_image(pil, "jpeg", 20)[0]) < len(encode_image(pil, "jpeg", 95)[0])
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        encode_image(gradient(), "gif")
+
+
+def test_render_endpoint_negotiates_format():
+    main.RENDER_CACHE.clear()
+    client = TestClient(main.app)
+    query = {"px": 0.2, "py": 0.1, "pz": 3, "tx": 0, "ty": 0, "tz": 0, "ux": 0, "uy": 1, "uz": 0, "fov": 60, "w": 32, "h": 24}
+    raw = client.get("/render", params={**query, "format": "raw"})
+    assert raw.headers["content-type"] == "application/octet-stream"
+    assert (raw.headers["X-Image-Width"], raw.headers["X-Image-Height"]) == ("32", "24")
+    assert len(raw.content) == 32 * 24 * 3
+    jpeg = client.get("/render", params=query, headers={"Accept": "image/jpeg"})
+    assert jpeg.headers["content-type"] == "image/jpeg"
+    assert Image.open(io.BytesIO(jpeg.content)).size == (32, 24)
+    assert client.get("/render", params={**query, "format": "gif"}).status_code == 422
@@ -0,0 +1,44 @@
+import numpy as np
+from PIL import Image
+
+from image_pyramid import ImagePyramid
+
+
+def make_image(width=200, height=120) -> Image.Image:
+    rng = np.random.default_rng(0)
+    return Image.fromarray(rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8))
+
+
+def test_levels_halve_down_to_min_size():
+    pyramid = ImagePyramid(make_image(), min_size=16)
+    pyramid.level_for(10, 10)
+    assert [level.size for level in pyramid.levels] == [(200, 120), (100, 60), (50, 30)]
+
+
+def test_picks_smallest_level_covering_the_request():
+    pyramid = ImagePyramid(make_image(), min_size=16)
+    assert pyramid.level_for(100, 60) == (pyramid.levels[1], False)
+    assert pyramid.level_for(101, 60)[0].size == (200, 120)
+    assert pyramid.level_for(40, 20)[0].size == (50, 30)
+    assert pyramid.level_for(10, 5)[0].size == (50, 30)  # the smallest level
+    assert pyramid.level_for(400, 240)[0].size == (200, 120)  # upscales come from the full image
+
+
+def test_snap_serves_a_nearby_level_as_is():
+    pyramid = ImagePyramid(make_image(), min_size=16)
+    level, snapped = pyramid.level_for(95, 57, snap=0.1)
+    assert snapped and level.size == (100, 60)
+    assert pyramid.resized(95, 57, snap=0.1).size == (100, 60)
+    assert pyramid.level_for(80, 48, snap=0.1) == (pyramid.levels[1], False)
+
+
+def test_resized_matches_resampling_the_level_and_is_memoized():
+    base = make_image()
+    pyramid = ImagePyramid(base, min_size=16, memo_size=2)
+    out = pyramid.resized(64, 40)
+    assert out.size == (64, 40)
+    assert out.tobytes() == base.reduce(2).resize((64, 40), Image.BICUBIC).tobytes()
+    assert pyramid.resized(64, 40) is out
+    pyramid.resized(30, 20)
+    pyramid.resized(20, 12)
+    assert pyramid.resized(64, 40) is not out  # evicted from the memo
@@ -0,0 +1,123 @@
+import json
+import math
+import time
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from ingest import Ingester, cameras_from_transforms, find_manifest, fit_size, transforms_paths
+from scene_registry import SceneRegistry
+
+
+def look_at_c2w(position, target=(0.0, 0.0, 0.0), up=(0.0, 1.0, 0.0)) -> list[list[float]]:
+    """OpenGL camera-to-world matrix: columns right, up, backward (-forward), position."""
+    position = np.asarray(position, float)
+    forward = np.asarray(target, float) - position
+    forward /= np.linalg.norm(forward)
+    right = np.cross(forward, up)
+    right /= np.linalg.norm(right)
+    cam_up = np.cross(right, forward)
+    c2w = np.eye(4)
+    c2w[:3, 0], c2w[:3, 1], c2w[:3, 2], c2w[:3, 3] = right, cam_up, -forward, position
+    return c2w.tolist()
+
+
+def ring(n=4, radius=3.0) -> list[list[float]]:
+    return [[radius * math.cos(a), 0.5, radius * math.sin(a)] for a in np.linspace(0, 2 * math.pi, n, endpoint=False)]
+
+
+def test_cameras_from_transforms_recovers_look_at_cameras():
+    positions = ring()
+    frames = [{"transform_matrix": look_at_c2w(p)} for p in positions]
+    cameras = cameras_from_transforms(frames, {"fl_y": 50.0, "h": 100, "w": 160}, [(160, 100)] * 4)
+    for cam, position in zip(cameras, positions):
+        np.testing.assert_allclose(cam["position"], position)
+        np.testing.assert_allclose(cam["target"], [0, 0, 0], atol=1e-9)  # the common focus of all optical axes
+        assert abs(np.dot(cam["up"], np.subtract(cam["target"], cam["position"]))) < 1e-9
+        assert cam["fov"] == pytest.approx(math.degrees(2 * math.atan(100 / 100)))
+
+
+def test_field_of_view_sources():
+    frames = [{"transform_matrix": look_at_c2w(p)} for p in ring(2)]
+    sizes = [(200, 100)] * 2
+
+    def fov(meta, frame_extra=None):
+        fs = [{**f, **(frame_extra or {})} for f in frames]
+        return cameras_from_transforms(fs, meta, sizes)[0]["fov"]
+
+    assert fov({"camera_angle_y": math.radians(40)}) == pytest.approx(40)
+    # Horizontal angle converts through the aspect ratio
+    assert fov({"camera_angle_x": 2 * math.atan(2.0)}) == pytest.approx(math.degrees(2 * math.atan(1.0)))
+    assert fov({"fl_x": 50.0}) == pytest.approx(90)
+    assert fov({"fl_y": 100.0}, {"fl_y": 50.0}) == pytest.approx(90)  # per-frame intrinsics win
+    with pytest.raises(ValueError):
+        fov({})
+
+
+def test_manifest_and_paths(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        find_manifest(tmp_path)
+    (tmp_path / "transforms.json").write_text("{}")
+    assert find_manifest(tmp_path).name == "transforms.json"
+    (tmp_path / "cameras.json").write_text("[]")
+    assert find_manifest(tmp_path).name == "cameras.json"
+    (tmp_path / "r_1.jpg").touch()
+    meta = {"frames": [{"file_path": "./train/r_0"}, {"file_path": "r_1.jpg"}]}
+    assert transforms_paths(meta, tmp_path) == [tmp_path / "train" / "r_0.png", tmp_path / "r_1.jpg"]
+
+
+def test_fit_size():
+    assert fit_size(4000, 3000, 0) == (4000, 3000)
+    assert fit_size(4000, 3000, 1000) == (1000, 750)
+    assert fit_size(300, 200, 1000) == (300, 200)
+
+
+def wait_for(job, timeout=60):
+    deadline = time.monotonic() + timeout
+    while job.active:
+        assert time.monotonic() < deadline, job.to_dict()
+        time.sleep(0.05)
+    return job.to_dict()
+
+
+def test_ingests_a_nerfstudio_capture(tmp_path):
+    source, out = tmp_path / "capture", tmp_path / "scenes" / "cap"
+    (source / "images").mkdir(parents=True)
+    rng = np.random.default_rng(0)
+    frames = []
+    for i, position in enumerate(ring()):
+        path = f"images/frame_{i:05d}.png"
+        if i == 2:
+            (source / path).write_bytes(b"not an image")
+        else:
+            Image.fromarray(rng.integers(0, 256, (60, 80, 3), dtype=np.uint8)).save(source / path)
+        frames.append({"file_path": path, "transform_matrix": look_at_c2w(position)})
+    (source / "transforms.json").write_text(json.dumps({"fl_y": 40.0, "frames": frames}))
+
+    registry = SceneRegistry(budget_bytes=1 << 20)
+    job = Ingester(registry, workers=1).submit("cap", source, out, max_size=40)
+    info = wait_for(job)
+    assert info["state"] == "done", info
+    assert (info["total"], info["done"]) == (3, 3)
+    assert info["skipped"] == [str(source / "images" / "frame_00002.png")]
+
+    cameras = json.loads((out / "cameras.json").read_text())
+    assert len(cameras) == 3 and all(cam["size"] == [40, 30] for cam in cameras)
+    scene = registry.get("cap")
+    assert len(scene.images) == 3
+    expected = Image.open(source / "images" / "frame_00003.png").resize((40, 30), Image.LANCZOS, reducing_gap=3.0)
+    assert np.array_equal(scene.images.array(2), np.asarray(expected))
+
+
+def test_in_place_job_is_current_once_packed(tmp_path):
+    root = tmp_path / "scene"
+    (root / "images").mkdir(parents=True)
+    for i in range(2):
+        Image.new("RGB", (16, 12), (i * 100, 0, 0)).save(root / "images" / f"{i:03d}.png")
+    (root / "cameras.json").write_text(json.dumps([{"position": p, "target": [0, 0, 0], "fov": 60} for p in ring(2)]))
+    registry = SceneRegistry(budget_bytes=1 << 20)
+    ingester = Ingester(registry)
+    assert wait_for(ingester.submit("s", root, root, in_place=True))["state"] == "done"
+    assert registry.get("s").images.array(1)[0, 0].tolist() == [100, 0, 0]
+    assert wait_for(ingester.submit("s", root, root, in_place=True))["state"] == "current"
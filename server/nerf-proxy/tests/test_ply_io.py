@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from ply_io import PlyWriter, read_header, read_ply, write_ply
+
+CLOUD = np.dtype([("x", "<f4"), ("y", "<f4"), ("z", "<f4"), ("red", "u1"), ("green", "u1"), ("blue", "u1")])
+
+
+def make_cloud(n: int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    data = np.empty(n, dtype=CLOUD)
+    for axis in "xyz":
+        data[axis] = rng.normal(size=n)
+    for channel in ("red", "green", "blue"):
+        data[channel] = rng.integers(0, 256, size=n)
+    return data
+
+
+@pytest.mark.parametrize("fmt", ["binary_little_endian", "binary_big_endian"])
+def test_binary_round_trip_is_memory_mapped(tmp_path, fmt):
+    data = make_cloud(1000)
+    path = tmp_path / "cloud.ply"
+    write_ply(path, data, fmt=fmt, chunk_size=256, comments=["made in a test"])
+    header = path.read_bytes()[:200].decode("ascii", "replace")
+    assert f"format {fmt} 1.0" in header and "comment made in a test" in header
+    vertex = read_ply(path)["vertex"]
+    assert isinstance(vertex, np.memmap)
+    assert vertex.dtype.names == CLOUD.names
+    for name in CLOUD.names:
+        np.testing.assert_array_equal(vertex[name], data[name])
+    eager = read_ply(path, mmap=False)["vertex"]
+    assert not isinstance(eager, np.memmap)
+    np.testing.assert_array_equal(eager, vertex)
+
+
+def test_binary_body_is_packed_records(tmp_path):
+    data = make_cloud(10)
+    path = tmp_path / "cloud.ply"
+    write_ply(path, data)
+    fmt, elements, offset = read_header(path)
+    assert fmt == "binary_little_endian"
+    assert [(name, count) for name, count, _ in elements] == [("vertex", 10)]
+    assert path.read_bytes()[offset:] == data.tobytes()
+
+
+def test_streaming_writer_casts_fields_by_name(tmp_path):
+    path = tmp_path / "stream.ply"
+    data = make_cloud(300)
+    with PlyWriter(path, CLOUD, len(data)) as ply:
+        for start in range(0, len(data), 128):
+            chunk = data[start:start + 128]
+            # Same fields in another order and precision
+            wide = np.empty(len(chunk), dtype=[("blue", "i8"), ("x", "f8"), ("y", "f8"), ("z", "f8"), ("red", "i8"), ("green", "i8")])
+            for name in CLOUD.names:
+                wide[name] = chunk[name]
+            ply.write(wide)
+    np.testing.assert_array_equal(read_ply(path)["vertex"], data)
+
+
+def test_ascii_round_trip(tmp_path):
+    data = make_cloud(50)
+    path = tmp_path / "cloud.ply"
+    write_ply(path, data, fmt="ascii", float_fmt="%.9g")
+    assert path.read_text().splitlines()[10].split()[3:] == [str(v) for v in data[0][["red", "green", "blue"]].tolist()]
+    vertex = read_ply(path)["vertex"]
+    np.testing.assert_array_equal(vertex, data)
+
+
+def test_row_count_must_match_header(tmp_path):
+    with pytest.raises(ValueError):
+        with PlyWriter(tmp_path / "short.ply", CLOUD, 5) as ply:
+            ply.write(make_cloud(3))
+    with PlyWriter(tmp_path / "long.ply", CLOUD, 2) as ply:
+        with pytest.raises(ValueError):
+            ply.write(make_cloud(3))
+        ply.write(make_cloud(2))
+
+
+def test_rejects_unsupported_inputs(tmp_path):
+    with pytest.raises(ValueError):
+        write_ply(tmp_path / "a.ply", np.zeros(3, dtype=[("x", "f2")]))
+    faces = tmp_path / "faces.ply"
+    faces.write_bytes(b"ply\nformat ascii 1.0\nelement face 1\nproperty list uchar int vertex_indices\nend_header\n3 0 1 2\n")
+    with pytest.raises(ValueError):
+        read_ply(faces)
+    (tmp_path / "b.ply").write_bytes(b"not a ply\n")
+    with pytest.raises(ValueError):
+        read_ply(tmp_path / "b.ply")
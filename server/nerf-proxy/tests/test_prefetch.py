@@ -0,0 +1,132 @@
+import asyncio
+import math
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import prefetch
+from prefetch import Prefetcher, pose_distance, predict_poses
+
+
+def orbit(angle: float, elevation: float = 1.0, radius: float = 3.0) -> np.ndarray:
+    return np.array([radius * math.cos(angle), elevation, radius * math.sin(angle), 0, 0, 0, 0, 1, 0, 60.0])
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Pose timestamps advance 50 ms per observed pose, independent of the event loop."""
+    now = [0.0]
+
+    def monotonic():
+        now[0] += 0.05
+        return now[0]
+
+    monkeypatch.setattr(prefetch, "time", SimpleNamespace(monotonic=monotonic))
+
+
+def test_orbit_prediction_follows_constant_elevation_orbit():
+    model, poses = predict_poses([0.0, 0.05], [orbit(0.0), orbit(0.05)], steps=3, dt=0.05)
+    assert model == "orbit"
+    for k, pose in enumerate(poses, 2):
+        np.testing.assert_allclose(pose, orbit(0.05 * k), atol=1e-9)
+
+
+def test_velocity_and_still_models():
+    a, b = orbit(0.0), orbit(0.0)
+    b[:6] += 0.1  # target moved with the camera: a pan
+    model, poses = predict_poses([0.0, 1.0], [a, b], steps=2, dt=1.0)
+    assert model == "velocity"
+    np.testing.assert_allclose(poses[1][:6], a[:6] + 0.3)
+    assert predict_poses([0.0, 1.0], [a, a.copy()], steps=2, dt=1.0) == ("still", [])
+
+
+def test_pose_distance_is_relative_to_the_orbit_radius():
+    for radius in (3.0, 300.0):
+        assert pose_distance(orbit(0.0, 0.0, radius), orbit(0.01, 0.0, radius)) == pytest.approx(0.01, rel=1e-3)
+
+
+def run_client(tolerance: float, request_poses: list[np.ndarray], idle: bool = True) -> tuple[list, Prefetcher, dict]:
+    """Replay poses for one client; the cache key is the pose rounded like render_cache.pose_key."""
+    cache: dict = {}
+
+    def key(pose: np.ndarray) -> tuple:
+        return tuple(np.round(pose / 1e-3).astype(int).tolist())
+
+    async def render(pose, params):
+        cache[key(pose)] = ("frame", key(pose))
+        return key(pose)
+
+    async def scenario():
+        prefetcher = Prefetcher(render, cached=cache.get, idle=lambda: idle, steps=3, tolerance=tolerance)
+        answers = []
+        for pose in request_poses:
+            answers.append(prefetcher.observe("client", pose, "params", key(pose)))
+            prefetcher.schedule("client")
+            await asyncio.sleep(0)
+        return answers, prefetcher
+
+    answers, prefetcher = asyncio.run(scenario())
+    return answers, prefetcher, cache
+
+
+def test_prefetched_frames_answer_exact_keys(clock):
+    answers, prefetcher, _ = run_client(0.0, [orbit(0.05 * i) for i in range(10)])
+    assert answers[:2] == [None, None]
+    assert all(a is not None and a[1] for a in answers[2:])  # exact
+    stats = prefetcher.stats()
+    assert stats["observed"] == 10
+    assert stats["hits"] == 8 and stats["approximate"] == 0
+    assert stats["hit_rate"] == 0.8
+
+
+def test_nearby_frames_only_answer_with_a_tolerance(clock):
+    # Requests slightly off the predicted orbit never match a prefetched key exactly
+    poses = [orbit(0.05 * i, elevation=1.0 + 0.002 * (i % 2)) for i in range(10)]
+    answers, prefetcher, _ = run_client(0.0, poses)
+    assert prefetcher.hits == 0
+    answers, prefetcher, _ = run_client(0.01, poses)
+    assert prefetcher.hits > 0
+    assert prefetcher.approximate == sum(1 for a in answers if a is not None and not a[1])
+
+
+def test_leaving_the_trajectory_drops_prefetched_frames(clock):
+    poses = [orbit(0.05 * i) for i in range(4)] + [orbit(2.0, elevation=-1.0)]
+    answers, prefetcher, _ = run_client(0.0, poses)
+    assert answers[-1] is None
+    assert prefetcher.diverged == 1
+
+
+def test_busy_pool_skips_prefetching(clock):
+    answers, prefetcher, cache = run_client(0.0, [orbit(0.05 * i) for i in range(5)], idle=False)
+    assert cache == {} and answers == [None] * 5
+    assert prefetcher.skipped_busy > 0
+
+
+def test_prefetch_bookkeeping_does_not_count_as_cache_lookups(clock, monkeypatch):
+    import main
+
+    def render(*args):
+        return b"frame", 0.0
+
+    monkeypatch.setattr(main, "_render_uncached", render)
+    monkeypatch.setattr(main.PREFETCHER, "tolerance", 0.01)
+    main.RENDER_CACHE.clear()
+    before = (main.RENDER_CACHE.hits, main.RENDER_CACHE.misses, main.PREFETCHER.issued)
+
+    async def scenario():
+        matches = []
+        for i in range(10):
+            pose = main.Pose(**dict(zip("px py pz tx ty tz ux uy uz fov".split(), orbit(0.05 * i, 1.0 + 0.002 * (i % 2)))))
+            _, _, _, match = await main._render_for_client("peek-test", pose, 32, 24)
+            matches.append(match)
+            await asyncio.sleep(0.01)
+        main.PREFETCHER.drop("peek-test")
+        return matches
+
+    matches = asyncio.run(scenario())
+    assert "approximate" in matches
+    lookups = main.RENDER_CACHE.hits + main.RENDER_CACHE.misses - before[0] - before[1]
+    prefetches = main.PREFETCHER.issued - before[2]
+    # One lookup per rendered or directly served frame; approximate answers reuse another pose's frame
+    assert lookups == prefetches + sum(m != "approximate" for m in matches)
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from raster import BACKGROUND, encode_depth_mm, project, rasterize
+
+CAMERA = dict(pos=[0.0, 0.0, 4.0], target=[0.0, 0.0, 0.0], up=[0.0, 1.0, 0.0], fov=50.0)
+
+
+def reference(positions, faces, face_colors, width, height):
+    """Pixel-by-pixel edge tests and 1/z depth test, one triangle at a time."""
+    sx, sy, z = project(positions, width=width, height=height, **CAMERA)
+    rgb = np.empty((height, width, 3))
+    rgb[:] = BACKGROUND
+    zbuf = np.zeros((height, width))
+    for f, (i, j, k) in enumerate(faces):
+        x, y, tz = sx[[i, j, k]], sy[[i, j, k]], z[[i, j, k]]
+        area = (x[1] - x[0]) * (y[2] - y[0]) - (y[1] - y[0]) * (x[2] - x[0])
+        if area == 0 or (tz <= 1e-3).any():
+            continue
+        s = np.sign(area)
+        for py in range(height):
+            for px in range(width):
+                cx, cy = px + 0.5, py + 0.5
+                w = []
+                for e0, e1 in ((1, 2), (2, 0), (0, 1)):
+                    a = (y[e0] - y[e1]) * s
+                    b = (x[e1] - x[e0]) * s
+                    c = (x[e0] * y[e1] - x[e1] * y[e0]) * s
+                    w.append((b * cy + c) + a * cx)
+                if min(w) < 0:
+                    continue
+                zinv = sum(wk / (abs(area) * zk) for wk, zk in zip(w, tz))
+                if zinv > zbuf[py, px]:
+                    zbuf[py, px] = zinv
+                    rgb[py, px] = face_colors[f]
+    return rgb.astype(np.uint8), zbuf
+
+
+def test_matches_per_pixel_reference():
+    rng = np.random.default_rng(3)
+    n = 40
+    centers = rng.uniform(-1.2, 1.2, size=(n, 3)) * [1, 1, 0.5]
+    positions = (centers[:, None, :] + rng.normal(scale=0.35, size=(n, 3, 3))).reshape(-1, 3)
+    faces = np.arange(3 * n).reshape(n, 3)
+    colors = rng.integers(0, 256, size=(n, 3))
+    width, height = 48, 36
+    rgb, depth, mask = rasterize(positions, faces, width=width, height=height, face_colors=colors, **CAMERA)
+    ref_rgb, ref_zinv = reference(positions, faces, colors, width, height)
+    assert mask.sum() > 200  # the scene covers a good part of the frame
+    np.testing.assert_array_equal(mask, ref_zinv > 0)
+    np.testing.assert_array_equal(rgb, ref_rgb)
+    np.testing.assert_allclose(depth[mask], 1.0 / ref_zinv[mask], rtol=1e-6)
+
+
+def test_vertex_colors_interpolate_across_a_facing_quad():
+    # A quad facing the camera: colors vary linearly in screen space
+    positions = np.array([[-1, -1, 0], [1, -1, 0], [1, 1, 0], [-1, 1, 0]], dtype=float)
+    faces = np.array([[0, 1, 2], [0, 2, 3]])
+    colors = np.array([[0, 0, 0], [255, 0, 0], [255, 0, 0], [0, 0, 0]], dtype=float)
+    rgb, depth, mask = rasterize(positions, faces, width=64, height=64, vertex_colors=colors, **CAMERA)
+    row = rgb[32, mask[32]]
+    assert (np.diff(row[:, 0].astype(int)) >= 0).all()
+    assert row[0, 0] < 10 and row[-1, 0] > 245
+    np.testing.assert_allclose(depth[mask], 4.0, rtol=1e-6)
+    assert (rgb[~mask] == BACKGROUND).all()
+
+
+def test_requires_exactly_one_color_source():
+    positions = np.zeros((3, 3))
+    with pytest.raises(ValueError):
+        rasterize(positions, [[0, 1, 2]], width=4, height=4, **CAMERA)
+
+
+def test_encode_depth_mm():
+    depth = np.array([0.0, 0.0014, 1.2344, 70.0])
+    assert encode_depth_mm(depth).tolist() == [0, 1, 1234, 65535]
@@ -0,0 +1,36 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+KEYFRAMES = [{"px": 3, "py": 0, "pz": 0, "tx": 0, "ty": 0, "tz": 0}, {"px": 0, "py": 0, "pz": 3, "tx": 0, "ty": 0, "tz": 0}]
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+def test_oversized_path_is_rejected_before_sampling(client, monkeypatch):
+    def sample_path(*args, **kwargs):
+        raise AssertionError("path sampled")
+
+    monkeypatch.setattr(main, "sample_path", sample_path)
+    response = client.post("/render/batch", json={"path": {"keyframes": KEYFRAMES, "frames": 10**12}})
+    assert response.status_code == 422
+    assert str(main.BATCH_MAX_FRAMES) in response.json()["detail"]
+
+
+def test_oversized_pose_list_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(main, "BATCH_MAX_FRAMES", 2)
+    response = client.post("/render/batch", json={"poses": KEYFRAMES * 2})
+    assert response.status_code == 422
+
+
+def test_path_renders_every_sampled_frame(client):
+    body = {"path": {"keyframes": KEYFRAMES, "frames": 3}, "w": 16, "h": 12, "format": "raw"}
+    response = client.post("/render/batch", json=body)
+    assert response.status_code == 200
+    assert response.headers["X-Batch-Frames"] == "3"
+    indexes = sorted(int(line.split(b":")[1]) for line in response.content.split(b"\r\n") if line.startswith(b"X-Frame-Index"))
+    assert indexes == [0, 1, 2]
@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+from render_cache import RenderCache, pose_key
+
+
+def make_pose(**overrides):
+    fields = dict(px=0.0, py=0.0, pz=3.0, tx=0.0, ty=0.0, tz=0.0, ux=0.0, uy=1.0, uz=0.0, fov=60.0)
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+def test_hit_and_miss_are_counted():
+    cache = RenderCache(max_bytes=1024)
+    assert cache.get("a") is None
+    cache.put("a", b"frame")
+    assert cache.get("a") == b"frame"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["bytes"]) == (1, 1, 1, 5)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_evicts_least_recently_used_within_byte_budget():
+    cache = RenderCache(max_bytes=10)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    cache.get("a")  # "b" is now the least recently used
+    cache.put("c", b"cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa" and cache.get("c") == b"cccc"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_oversized_frame_is_not_cached():
+    cache = RenderCache(max_bytes=4)
+    cache.put("a", b"aaa")
+    cache.put("big", b"x" * 5)
+    assert cache.get("big") is None
+    assert cache.get("a") == b"aaa"
+
+
+def test_pose_key_quantizes_near_identical_poses():
+    base = pose_key(make_pose(), 64, 48, 500)
+    assert pose_key(make_pose(px=2e-4, fov=60.004), 64, 48, 500) == base
+    assert pose_key(make_pose(px=2e-3), 64, 48, 500) != base
+    assert pose_key(make_pose(fov=60.02), 64, 48, 500) != base
+    assert pose_key(make_pose(), 64, 48, 600) != base
+    assert pose_key(make_pose(), 96, 48, 500) != base
+
+
+def test_render_endpoint_serves_repeat_pose_from_cache():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    main.RENDER_CACHE.clear()
+    client = TestClient(main.app)
+    params = {"px": 0.3, "py": 0.2, "pz": 2.5, "tx": 0, "ty": 0, "tz": 0, "ux": 0, "uy": 1, "uz": 0,
+              "fov": 60, "w": 48, "h": 32, "samples": 50}
+    first = client.get("/render", params=params)
+    second = client.get("/render", params={**params, "px": 0.3002})
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.content == first.content
+
+
+def test_put_with_explicit_size_for_non_bytes_values():
+    cache = RenderCache(max_bytes=10)
+    cache.put("a", (b"payload", (4, 4)), nbytes=6)
+    cache.put("b", (b"payload", (4, 4)), nbytes=6)
+    assert cache.get("a") is None
+    assert cache.get("b") == (b"payload", (4, 4))
+    assert cache.stats()["bytes"] == 6
+
+
+def test_peek_leaves_counters_and_order_alone():
+    cache = RenderCache(max_bytes=8)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    assert cache.peek("a") == b"aaaa" and cache.peek("missing") is None
+    assert (cache.hits, cache.misses) == (0, 0)
+    cache.put("c", b"cccc")  # "a" is still the least recently used
+    assert cache.peek("a") is None and cache.peek("b") == b"bbbb"
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+
+import pytest
+
+from render_pool import PoolSaturated, RenderPool
+
+
+def test_rejects_jobs_beyond_max_pending():
+    release = threading.Event()
+
+    async def scenario():
+        pool = RenderPool("thread", workers=1, max_pending=2)
+        try:
+            running = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            assert pool.pending == 2
+            with pytest.raises(PoolSaturated):
+                await pool.run(release.wait)
+            release.set()
+            assert await asyncio.gather(*running) == [True, True]
+            # Slots free up again once jobs finish
+            assert pool.pending == 0
+            assert await pool.run(sum, [1, 2, 3]) == 6
+            return pool.stats()
+        finally:
+            release.set()
+            pool.shutdown()
+
+    stats = asyncio.run(scenario())
+    assert stats["rejected"] == 1
+    assert stats["pending"] == 0
+
+
+def test_failed_job_frees_its_slot():
+    async def scenario():
+        pool = RenderPool("thread", workers=1, max_pending=1)
+        try:
+            with pytest.raises(ZeroDivisionError):
+                await pool.run(divmod, 1, 0)
+            return await pool.run(divmod, 7, 2), pool.pending
+        finally:
+            pool.shutdown()
+
+    assert asyncio.run(scenario()) == ((3, 1), 0)
+
+
+@pytest.mark.parametrize("backend", ["inline", "process"])
+def test_other_backends_run_jobs(backend):
+    async def scenario():
+        pool = RenderPool(backend, workers=1, max_pending=1)
+        try:
+            return await pool.run(pow, 2, 10)
+        finally:
+            pool.shutdown()
+
+    assert asyncio.run(scenario()) == 1024
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        RenderPool("gpu")
+
+
+def test_render_endpoint_answers_429_when_pool_is_full(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+
+    started, release = threading.Event(), threading.Event()
+
+    def render(*args):
+        started.set()
+        assert release.wait(5)
+        return b"frame", 0.0
+
+    pool = RenderPool("thread", workers=1, max_pending=1)
+    monkeypatch.setattr(main, "RENDER_POOL", pool)
+    monkeypatch.setattr(main, "_render_uncached", render)
+    main.RENDER_CACHE.clear()
+    client = TestClient(main.app)
+    query = {"px": 0, "py": 0, "pz": 3, "tx": 0, "ty": 0, "tz": 0, "ux": 0, "uy": 1, "uz": 0, "fov": 60, "w": 32, "h": 24}
+    first = {}
+    worker = threading.Thread(target=lambda: first.update(response=client.get("/render", params=query)))
+    worker.start()
+    try:
+        assert started.wait(5)
+        busy = client.get("/render", params={**query, "px": 1})
+        assert busy.status_code == 429
+        assert busy.headers["Retry-After"] == "1"
+    finally:
+        release.set()
+        worker.join(5)
+        pool.shutdown()
+    assert first["response"].status_code == 200
+    assert first["response"].content == b"frame"
@@ -0,0 +1,158 @@
+import json
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from scene_registry import PACK_FILE, PACK_INDEX, PackedImages, Scene, SceneRegistry, read_pack_index
+
+
+def make_scene(root, views=3, size=(24, 16), seed=0):
+    """Write a scene directory with random views; returns their pixels."""
+    rng = np.random.default_rng(seed)
+    (root / "images").mkdir(parents=True)
+    cameras, pixels = [], []
+    for i in range(views):
+        rgb = rng.integers(0, 256, size=(size[1], size[0], 3), dtype=np.uint8)
+        Image.fromarray(rgb).save(root / "images" / f"{i:03d}.png")
+        cameras.append({"position": [3.0 * np.cos(i), 0.0, 3.0 * np.sin(i)], "target": [0, 0, 0], "fov": 60})
+        pixels.append(rgb)
+    (root / "cameras.json").write_text(json.dumps(cameras))
+    return pixels
+
+
+def test_scene_reads_views_from_the_memory_mapped_pack(tmp_path):
+    pixels = make_scene(tmp_path / "a")
+    scene = Scene("a", tmp_path / "a")
+    assert isinstance(scene.images, PackedImages)
+    assert isinstance(scene.images._mm, np.memmap)
+    assert (tmp_path / "a" / PACK_FILE).stat().st_size == scene.images.nbytes == 3 * 24 * 16 * 3
+    assert len(scene.images) == len(scene.index) == 3
+    for i, rgb in enumerate(pixels):
+        assert scene.images.size(i) == (24, 16)
+        assert np.array_equal(scene.images.array(i), rgb)
+        assert np.array_equal(np.asarray(scene.images[i]), rgb)
+    assert np.array_equal(np.asarray(scene.images[-1]), pixels[-1])
+
+
+def test_pack_is_reused_until_the_dataset_changes(tmp_path):
+    root = tmp_path / "a"
+    pixels = make_scene(root)
+    version = Scene("a", root).version
+    pack_mtime = (root / PACK_FILE).stat().st_mtime_ns
+    assert Scene("a", root).version == version
+    assert (root / PACK_FILE).stat().st_mtime_ns == pack_mtime
+
+    Image.fromarray(pixels[0][::-1].copy()).save(root / "images" / "000.png")
+    os.utime(root / "images" / "000.png", ns=(1, 1))
+    scene = Scene("a", root)
+    assert scene.version != version
+    assert read_pack_index(root)["version"] == scene.version
+    assert np.array_equal(scene.images.array(0), pixels[0][::-1])
+
+
+def test_scene_can_be_served_from_the_pack_alone(tmp_path):
+    root = tmp_path / "a"
+    pixels = make_scene(root)
+    version = Scene("a", root).version
+    for path in (root / "images").iterdir():
+        path.unlink()
+    scene = Scene("a", root)
+    assert scene.version == version
+    assert np.array_equal(scene.images.array(2), pixels[2])
+    (root / PACK_INDEX).unlink()
+    with pytest.raises(FileNotFoundError):
+        Scene("a", root)
+
+
+def test_scene_drops_least_recently_used_pyramids_over_budget(tmp_path):
+    make_scene(tmp_path / "a", views=4, size=(64, 64))
+    pack_bytes = 4 * 64 * 64 * 3
+    pyramid_bytes = (32 * 32 + 16 * 16) * 3  # levels below the full image
+    scene = Scene("a", tmp_path / "a", budget_bytes=pack_bytes + 2 * pyramid_bytes)
+    for i in range(3):
+        scene.pyramid(i).resized(32, 32)
+    assert list(scene.pyramids) == [0, 1, 2] and scene.evictions == 0
+    scene.pyramid(0)  # now most recently used
+    scene.pyramid(3).resized(32, 32)
+    assert list(scene.pyramids) == [2, 0, 3] and scene.evictions == 1
+    scene.shrink()  # pyramid 3 grew after it was added
+    assert list(scene.pyramids) == [0, 3]
+    assert scene.resident_bytes == pack_bytes + 2 * pyramid_bytes
+    scene.shrink(budget_bytes=0)
+    assert list(scene.pyramids) == [3]  # the most recent pyramid stays
+
+
+def test_aux_maps_share_the_scene_budget_with_pyramids(tmp_path):
+    root = tmp_path / "a"
+    make_scene(root, views=3, size=(64, 64))
+    (root / "depth").mkdir()
+    for i in range(3):
+        Image.fromarray(np.full((64, 64), 1000 * (i + 1), np.uint16)).save(root / "depth" / f"{i:03d}.png")
+    pack_bytes = 3 * 64 * 64 * 3
+    depth_bytes = 64 * 64 * 4
+    scene = Scene("a", root, budget_bytes=pack_bytes + 2 * depth_bytes)
+    depth, alpha = scene.aux(0)
+    assert alpha is None and depth[0, 0] == pytest.approx(1.0)
+    scene.aux(1)
+    scene.aux(2)
+    assert scene.evictions == 1 and scene.resident_bytes == pack_bytes + 2 * depth_bytes
+    assert scene.aux(0)[0] is not depth  # decoded again after eviction
+
+
+def test_registry_shrinks_the_last_scene_to_the_budget(tmp_path):
+    make_scene(tmp_path / "a", views=4, size=(64, 64))
+    pack_bytes = 4 * 64 * 64 * 3
+    registry = SceneRegistry(budget_bytes=pack_bytes + 16 * 1024)
+    registry.register("a", tmp_path / "a")
+    scene = registry.get("a")
+    for i in range(4):
+        scene.pyramid(i).resized(48, 48)  # grows after the scene last checked its budget
+    assert scene.resident_bytes > registry.budget_bytes
+    registry.trim()
+    assert registry.loaded("a") is scene and registry.evictions == 0
+    assert scene.resident_bytes <= registry.budget_bytes and scene.evictions > 0
+
+
+def test_registry_loads_once_and_evicts_least_recently_used(tmp_path):
+    for i, name in enumerate("abc"):
+        make_scene(tmp_path / name, seed=i)
+    (tmp_path / "not-a-scene").mkdir()
+    scene_bytes = 3 * 24 * 16 * 3
+    registry = SceneRegistry(budget_bytes=2 * scene_bytes)
+    assert registry.discover(tmp_path) == ["a", "b", "c"]
+    assert "a" in registry and "not-a-scene" not in registry
+
+    a = registry.get("a")
+    assert registry.get("a") is a
+    registry.get("b")
+    registry.get("a")  # "b" is now least recently used
+    registry.get("c")
+    stats = registry.stats()
+    assert stats["loaded"] == ["a", "c"]
+    assert (stats["loads"], stats["evictions"]) == (3, 1)
+    assert stats["resident_bytes"] == 2 * scene_bytes
+    assert registry.loaded("b") is None
+    assert registry.get("b") is not None and registry.stats()["loads"] == 4
+    with pytest.raises(KeyError):
+        registry.get("missing")
+
+
+def test_most_recent_scene_stays_loaded_over_budget(tmp_path):
+    make_scene(tmp_path / "a")
+    registry = SceneRegistry(budget_bytes=1)
+    registry.register("a", tmp_path / "a")
+    scene = registry.get("a")
+    assert registry.loaded("a") is scene
+    assert registry.stats()["evictions"] == 0
+
+
+def test_register_repoints_a_loaded_scene(tmp_path):
+    make_scene(tmp_path / "one", seed=1)
+    make_scene(tmp_path / "two", views=2, seed=2)
+    registry = SceneRegistry(budget_bytes=1 << 20)
+    registry.register("s", tmp_path / "one")
+    assert len(registry.get("s").images) == 3
+    registry.ensure("s", tmp_path / "two")
+    assert len(registry.get("s").images) == 2
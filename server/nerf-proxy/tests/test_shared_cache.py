@@ -0,0 +1,196 @@
+import asyncio
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from shared_cache import DELETED, PENDING, READY, SharedFrameCache, SingleFlight, fcntl, key_digest
+
+pytestmark = pytest.mark.skipif(fcntl is None, reason="the shared cache needs flock")
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+
+
+def digest(n: int) -> bytes:
+    return n.to_bytes(16, "little")
+
+
+def claim(cache: SharedFrameCache, n: int) -> str:
+    return cache._claim(digest(n))[0]
+
+
+def publish(cache: SharedFrameCache, n: int, data: bytes) -> None:
+    status, token = cache._claim(digest(n))
+    assert status == "claimed"
+    cache._publish(digest(n), token, data)
+
+
+def run_in_other_process(directory: Path, code: str) -> subprocess.Popen:
+    """Start a Python process with a SharedFrameCache `cache` on `directory` that runs `code`."""
+    script = f"from shared_cache import SharedFrameCache\ncache = SharedFrameCache({str(directory)!r}, 1 << 20)\n{code}"
+    return subprocess.Popen([sys.executable, "-c", script], cwd=SERVER_DIR, stdout=subprocess.PIPE, text=True)
+
+
+def test_claim_pending_then_hit(tmp_path):
+    a = SharedFrameCache(tmp_path, 1 << 20)
+    b = SharedFrameCache(tmp_path, 1 << 20)
+    status, token = a._claim(digest(1))
+    assert status == "claimed"
+    assert claim(b, 1) == "pending"
+    a._publish(digest(1), token, b"frame")
+    assert claim(b, 1) == "hit"
+    assert b._read(digest(1)) == b"frame"
+    assert b.stats()["entries"] == 1
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    stale = SharedFrameCache(tmp_path, 1 << 20, lease_s=0.0)
+    fresh = SharedFrameCache(tmp_path, 1 << 20)
+    stale_status, stale_token = stale._claim(digest(1))
+    fresh_status, fresh_token = fresh._claim(digest(1))
+    assert (stale_status, fresh_status) == ("claimed", "claimed")
+    fresh._publish(digest(1), fresh_token, b"fresh")
+    # The first owner finishing late must neither replace the frame nor leave a file behind
+    assert not stale._release(digest(1), stale_token, 5)
+    stale._publish(digest(1), stale_token, b"stale")
+    assert claim(fresh, 1) == "hit"
+    assert fresh._read(digest(1)) == b"fresh"
+    assert fresh.stats()["bytes"] == len(b"fresh")
+    assert len([p for p in (tmp_path / "objects").rglob("*") if p.is_file()]) == 1
+
+
+def test_claim_of_dead_process_is_taken_over(tmp_path):
+    cache = SharedFrameCache(tmp_path, 1 << 20)
+    proc = run_in_other_process(tmp_path, f"print(cache._claim({digest(1)!r})[0])")
+    assert proc.communicate(timeout=60)[0].strip() == "claimed"
+    assert claim(cache, 1) == "claimed"
+
+
+def test_get_or_create_waits_for_other_process(tmp_path):
+    cache = SharedFrameCache(tmp_path, 1 << 20)
+    proc = run_in_other_process(tmp_path, (
+        f"status, token = cache._claim({key_digest('frame')!r})\n"
+        "print(status, flush=True)\n"
+        "import time; time.sleep(0.3)\n"
+        f"cache._publish({key_digest('frame')!r}, token, b'rendered elsewhere')"
+    ))
+    assert proc.stdout.readline().strip() == "claimed"
+
+    async def create():
+        raise AssertionError("rendered twice")
+
+    data, created = asyncio.run(cache.get_or_create("frame", create))
+    proc.wait(timeout=60)
+    assert (data, created) == (b"rendered elsewhere", False)
+    assert cache.stats()["waits"] >= 1
+
+
+def test_failed_render_releases_claim(tmp_path):
+    cache = SharedFrameCache(tmp_path, 1 << 20)
+
+    async def fail():
+        raise RuntimeError("render failed")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_create("key", fail))
+
+    async def ok():
+        return b"second try"
+
+    assert asyncio.run(cache.get_or_create("key", ok)) == (b"second try", True)
+
+
+def test_compact_keeps_live_entries(tmp_path):
+    cache = SharedFrameCache(tmp_path, 1 << 20, slots=64)
+    for n in range(30):
+        publish(cache, n, bytes([n]) * 10)
+    assert claim(cache, 100) == "claimed"
+    with cache._locked():
+        for n in range(0, 30, 2):
+            cache._delete(cache._find(digest(n))[0])
+        assert int(cache._header["tombstones"][0]) == 15
+        cache._compact()
+    assert int(cache._header["tombstones"][0]) == 0
+    assert int(cache._header["used"][0]) == 16
+    assert int((cache._slots["state"] == DELETED).sum()) == 0
+    for n in range(1, 30, 2):
+        assert claim(cache, n) == "hit"
+        assert cache._read(digest(n)) == bytes([n]) * 10
+    assert int(cache._slots["state"][cache._find(digest(100))[0]]) == PENDING
+    assert cache.stats()["bytes"] == 15 * 10
+
+
+def test_eviction_keeps_recent_frames_within_budget(tmp_path):
+    cache = SharedFrameCache(tmp_path, 10_000)
+    for n in range(20):
+        publish(cache, n, b"x" * 1000)
+        time.sleep(0.001)
+        assert claim(cache, 0) == "hit"  # keep frame 0 recently used
+    stats = cache.stats()
+    assert stats["bytes"] <= 10_000
+    assert stats["evictions"] > 0
+    assert claim(cache, 0) == "hit"
+    assert claim(cache, 1) == "claimed"  # least recently used, evicted
+    files = [p for p in (tmp_path / "objects").rglob("*") if p.is_file()]
+    assert len(files) == int((cache._slots["state"] == READY).sum())
+
+
+def test_oversized_frame_is_not_stored(tmp_path):
+    cache = SharedFrameCache(tmp_path, 1000)
+    publish(cache, 1, b"x" * 2000)
+    assert cache.stats()["entries"] == 0
+    assert claim(cache, 1) == "claimed"
+
+
+def test_missing_file_is_forgotten(tmp_path):
+    cache = SharedFrameCache(tmp_path, 1 << 20)
+    asyncio.run(cache.get_or_create("key", lambda: asyncio.sleep(0, b"one")))
+    for path in (tmp_path / "objects").rglob("*"):
+        if path.is_file():
+            path.unlink()
+    assert asyncio.run(cache.get_or_create("key", lambda: asyncio.sleep(0, b"two"))) == (b"two", True)
+
+
+def test_single_flight_coalesces_and_survives_cancellation():
+    calls = 0
+
+    async def render():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return b"frame"
+
+    async def scenario():
+        flights = SingleFlight()
+        leader = asyncio.ensure_future(flights.do("k", render))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flights.do("k", render))
+        await asyncio.sleep(0.01)
+        leader.cancel()  # e.g. the first client disconnected
+        result = await follower
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return result, flights
+
+    (result, leader), flights = asyncio.run(scenario())
+    assert (result, leader) == (b"frame", False)
+    assert calls == 1
+    assert flights.coalesced == 1
+    assert flights.inflight == 0
+
+
+def test_single_flight_shares_errors_and_forgets_them():
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def scenario():
+        flights = SingleFlight()
+        results = await asyncio.gather(flights.do("k", fail), flights.do("k", fail), return_exceptions=True)
+        return results, flights
+
+    results, flights = asyncio.run(scenario())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flights.inflight == 0
@@ -0,0 +1,95 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+# An invalid pose makes the server answer with an error message. Messages are
+# handled in order, so the reply proves every earlier message was processed.
+SYNC = {"type": "pose", "px": "not a number"}
+
+
+def pose_msg(px: float) -> dict:
+    return {"type": "pose", "px": px, "py": 0, "pz": 3, "tx": 0, "ty": 0, "tz": 0, "w": 32, "h": 24}
+
+
+@pytest.fixture
+def renderer(monkeypatch):
+    """Replace the frame renderer; frames are the rendered pose's px as text."""
+    state = {"rendered": [], "sizes": [], "started": threading.Event(), "release": threading.Event()}
+    state["release"].set()
+
+    def render(pose, width, height, mode="nearest", *args):
+        state["rendered"].append(pose.px)
+        state["sizes"].append((width, height))
+        state["started"].set()
+        assert state["release"].wait(5)
+        return str(pose.px).encode(), 0.0
+
+    monkeypatch.setattr(main, "_render_uncached", render)
+    monkeypatch.setattr(main.PREFETCHER, "steps", 0)  # only count frames rendered for received poses
+    main.RENDER_CACHE.clear()
+    return state
+
+
+def test_latest_pose_wins(renderer):
+    renderer["release"].clear()
+    with TestClient(main.app).websocket_connect("/stream") as ws:
+        ws.send_json(pose_msg(1))
+        assert renderer["started"].wait(5)
+        # Poses arriving while pose 1 renders overwrite each other
+        for px in (2, 3, 4):
+            ws.send_json(pose_msg(px))
+        ws.send_json(SYNC)
+        assert ws.receive_json()["type"] == "error"
+        renderer["release"].set()
+        assert ws.receive_bytes() == b"1.0"
+        ws.send_json({"type": "ack"})
+        assert ws.receive_bytes() == b"4.0"
+    assert renderer["rendered"] == [1, 4]
+
+
+def test_unacked_frames_gate_rendering(renderer):
+    with TestClient(main.app).websocket_connect("/stream") as ws:
+        for px in range(1, main.STREAM_MAX_INFLIGHT + 1):
+            ws.send_json(pose_msg(px))
+            assert ws.receive_bytes() == f"{px}.0".encode()
+        # The client has fallen behind: new poses coalesce until it acks
+        ws.send_json(pose_msg(10))
+        ws.send_json(pose_msg(11))
+        ws.send_json(SYNC)
+        assert ws.receive_json()["type"] == "error"
+        assert renderer["rendered"] == list(range(1, main.STREAM_MAX_INFLIGHT + 1))
+        ws.send_json({"type": "ack"})
+        assert ws.receive_bytes() == b"11.0"
+    assert renderer["rendered"][-1] == 11 and 10 not in renderer["rendered"]
+
+
+def test_preview_is_refined_at_full_size(renderer):
+    with TestClient(main.app).websocket_connect("/stream") as ws:
+        ws.send_json({**pose_msg(1), "preview_scale": 0.25, "refine_ms": 0})
+        assert ws.receive_bytes() == b"1.0"
+        assert ws.receive_bytes() == b"1.0"
+    assert renderer["sizes"] == [(8, 6), (32, 24)]
+
+
+def test_newer_pose_supersedes_pending_refinement(renderer):
+    with TestClient(main.app).websocket_connect("/stream") as ws:
+        ws.send_json({**pose_msg(1), "preview_scale": 0.25, "refine_ms": 5000})
+        assert ws.receive_bytes() == b"1.0"
+        ws.send_json({**pose_msg(2), "preview_scale": 0.25, "refine_ms": 0})
+        assert ws.receive_bytes() == b"2.0"
+        # Two frames are unacked, so the refinement waits for an ack
+        ws.send_json({"type": "ack"})
+        assert ws.receive_bytes() == b"2.0"
+    assert list(zip(renderer["rendered"], renderer["sizes"])) == [(1, (8, 6)), (2, (8, 6)), (2, (32, 24))]
+
+
+@pytest.mark.parametrize("message", ["[]", "3", '"pose"', "null", "{not json"])
+def test_malformed_messages_get_an_error_and_keep_the_socket(renderer, message):
+    with TestClient(main.app).websocket_connect("/stream") as ws:
+        ws.send_text(message)
+        assert ws.receive_json() == {"type": "error", "detail": "Messages must be JSON objects"}
+        ws.send_json(pose_msg(1))
+        assert ws.receive_bytes() == b"1.0"
@@ -0,0 +1,119 @@
+import importlib.util
+import math
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from tile_compositor import TileCompositor
+
+BACKGROUND = 0.043
+
+
+def make_splats(n=300, width=80, height=60, seed=0):
+    rng = np.random.default_rng(seed)
+    sx = rng.integers(0, width, n)
+    sy = rng.integers(0, height, n)
+    depth = rng.uniform(0.5, 6.0, n)
+    size = np.maximum(2, (5 / depth).astype(np.int64))
+    colors = rng.uniform(0, 1, (n, 3))
+    return sx, sy, size, depth, colors
+
+
+def reference(sx, sy, size, depth, colors, width, height):
+    """Per-pixel fragment lists composited farthest first with repeated "over"."""
+    fragments = {}
+    for i in range(len(sx)):
+        s = int(size[i])
+        for dy in range(-s, s + 1):
+            for dx in range(-s, s + 1):
+                alpha = max(0.0, 1.0 - math.sqrt(dx * dx + dy * dy) / s) * 0.8
+                x, y = sx[i] + dx, sy[i] + dy
+                if alpha > 0 and 0 <= x < width and 0 <= y < height:
+                    fragments.setdefault((y, x), []).append((depth[i], alpha, colors[i]))
+    img = np.full((height, width, 3), BACKGROUND)
+    for (y, x), frags in fragments.items():
+        c = np.full(3, BACKGROUND)
+        for _, alpha, color in sorted(frags, key=lambda f: -f[0]):
+            c = c * (1 - alpha) + alpha * color
+        img[y, x] = c
+    return np.clip(img * 255, 0, 255).astype(np.uint8)
+
+
+def load_bench():
+    path = Path(__file__).resolve().parents[3] / "scripts" / "bench_nerf_proxy.py"
+    spec = importlib.util.spec_from_file_location("bench_nerf_proxy", path)
+    bench = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(bench)
+    return bench
+
+
+def test_matches_per_pixel_reference():
+    splats = make_splats()
+    rgb, depth, alpha = TileCompositor(tile_size=16).composite(*splats, 80, 60, BACKGROUND)
+    assert depth is None and alpha is None
+    ref = reference(*splats, 80, 60)
+    assert np.abs(rgb.astype(int) - ref.astype(int)).max() <= 1
+
+
+@pytest.mark.parametrize("tile_size, workers", [(16, 1), (32, 3), (1024, 1)])
+def test_output_does_not_depend_on_tiling(tile_size, workers):
+    splats = make_splats(seed=1)
+    expected = TileCompositor(tile_size=64).composite(*splats, 80, 60, BACKGROUND, with_aux=True)
+    out = TileCompositor(tile_size=tile_size, workers=workers).composite(*splats, 80, 60, BACKGROUND, with_aux=True)
+    for a, b in zip(out, expected):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_aux_buffers():
+    splats = make_splats(n=20, seed=2)
+    rgb, depth, alpha = TileCompositor(tile_size=16).composite(*splats, 80, 60, BACKGROUND, with_aux=True)
+    covered = alpha > 0
+    assert covered.any() and not covered.all()
+    assert (alpha <= 1).all()
+    assert (depth[~covered] == 0).all()
+    assert (depth[covered] >= splats[3].min() - 1e-3).all() and (depth[covered] <= splats[3].max() + 1e-3).all()
+    assert (rgb[~covered] == np.uint8(BACKGROUND * 255)).all()
+
+
+def test_unchanged_tiles_are_reused():
+    sx, sy, size, depth, colors = make_splats(n=40, width=128, height=128, seed=3)
+    compositor = TileCompositor(tile_size=32)
+    first, _, _ = compositor.composite(sx, sy, size, depth, colors, 128, 128, BACKGROUND)
+    composited = compositor.cache.stats()["misses"]
+    assert composited > 0 and compositor.cache.stats()["hits"] == 0
+
+    again, _, _ = compositor.composite(sx, sy, size, depth, colors, 128, 128, BACKGROUND)
+    assert np.array_equal(again, first)
+    assert compositor.cache.stats()["hits"] == composited
+
+    # Move one small splat inside the middle of a tile: only that tile is composited again
+    i = int(np.flatnonzero((size == 2) & (sx % 32 >= 4) & (sx % 32 < 26) & (sy % 32 >= 4) & (sy % 32 < 26))[0])
+    sx = sx.copy()
+    sx[i] += 1
+    moved, _, _ = compositor.composite(sx, sy, size, depth, colors, 128, 128, BACKGROUND)
+    stats = compositor.cache.stats()
+    assert stats["misses"] == composited + 1
+    assert stats["hits"] == 2 * composited - 1
+    assert np.array_equal(moved, TileCompositor(tile_size=32).composite(sx, sy, size, depth, colors, 128, 128, BACKGROUND)[0])
+
+
+@pytest.mark.parametrize("tile_size, workers", [(16, 1), (128, 2)])
+def test_matches_the_bench_frame_wide_compositor(tile_size, workers):
+    import main
+
+    bench = load_bench()
+    pose = main.Pose(px=0.5, py=0.8, pz=2.4, tx=0, ty=0, tz=0, ux=0, uy=1, uz=0, fov=55)
+    splats = main._project_dummy(160, 120, pose, 800)
+    reference = bench._reference_composite(*splats, 160, 120, main.DUMMY_BACKGROUND)
+    tiled = TileCompositor(tile_size=tile_size, workers=workers).composite(*splats, 160, 120, main.DUMMY_BACKGROUND, with_aux=True)
+    for ref, out in zip(reference, tiled):
+        np.testing.assert_array_equal(out, ref)
+
+
+def test_counts_tiles_without_splats():
+    compositor = TileCompositor(tile_size=16, workers=2)
+    one = [np.array([8]), np.array([8]), np.array([2]), np.array([1.0]), np.ones((1, 3))]
+    compositor.composite(*one, 64, 32, BACKGROUND)
+    compositor.composite(*one, 64, 32, BACKGROUND)
+    assert compositor.stats()["empty"] == 2 * (4 * 2 - 1)
@@ -0,0 +1,187 @@
+"""Tiled, parallel splat compositing with reuse of unchanged tiles.
+
+The frame is split into square screen tiles. Each splat is assigned only to
+the tiles its footprint overlaps, and each tile composites just those splats,
+so tiles are independent and run concurrently on a thread pool (NumPy
+releases the GIL for the sorts and reductions that dominate).
+
+A tile's pixels are a pure function of its rectangle and of the splats that
+overlap it (position, footprint, color, depth order). That signature keys a
+byte-bounded LRU of finished tiles. When the camera moves slightly, tiles
+whose splats did not move a pixel (background, distant detail, sub-pixel
+jitter) are copied from the previous frame instead of re-composited. The
+same holds for any other client looking at the same region.
+"""
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from render_cache import RenderCache
+
+
+def splat_fragments(sx: np.ndarray, sy: np.ndarray, size: int, width: int, height: int):
+    """Expand splat centers of one footprint size into (sample, pixel, alpha) fragments."""
+    d = np.arange(-size, size + 1)
+    dx, dy = np.meshgrid(d, d, indexing="xy")
+    falloff = np.maximum(0.0, 1.0 - np.sqrt(dx * dx + dy * dy) / size) * 0.8
+    keep = falloff > 0  # zero-alpha corners do not change the composite
+    dx, dy, falloff = dx[keep], dy[keep], falloff[keep]
+    px = sx[:, None] + dx[None, :]
+    py = sy[:, None] + dy[None, :]
+    inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+    sample = np.broadcast_to(np.arange(len(sx))[:, None], px.shape)[inside]
+    alpha = np.broadcast_to(falloff[None, :], px.shape)[inside]
+    return sample, py[inside] * width + px[inside], alpha
+
+
+def _to_u8(rgb: np.ndarray) -> np.ndarray:
+    return np.clip(rgb * 255, 0, 255).astype(np.uint8)
+
+
+class TileCompositor:
+    def __init__(self, tile_size: int = 128, workers: int = 1, cache_bytes: int = 64 * 1024 * 1024):
+        self.tile_size = max(16, tile_size)
+        self.workers = max(1, workers)
+        self.cache = RenderCache(max_bytes=cache_bytes)
+        self._pool: ThreadPoolExecutor | None = None
+        self._pid = 0
+        self._lock = threading.Lock()
+        self.empty = 0
+
+    def _executor(self) -> ThreadPoolExecutor | None:
+        # Created lazily, and again after a fork, so render pool processes get their own threads
+        if self.workers == 1:
+            return None
+        if self._pool is None or self._pid != os.getpid():
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="tile")
+            self._pid = os.getpid()
+        return self._pool
+
+    def composite(
+        self,
+        sx: np.ndarray,
+        sy: np.ndarray,
+        size: np.ndarray,
+        depth: np.ndarray,
+        colors: np.ndarray,
+        width: int,
+        height: int,
+        background: float,
+        with_aux: bool = False,
+    ) -> tuple[np.ndarray, np.ndarray | None, np.ndarray | None]:
+        """Composite on-screen splats over a flat background, nearest first.
+
+        Returns (uint8 RGB (H, W, 3), depth, alpha); depth (opacity-weighted mean
+        splat depth, 0 = empty) and alpha (accumulated opacity) are float32
+        (H, W) arrays when `with_aux`, else None.
+        """
+        t = self.tile_size
+        cols, rows = -(-width // t), -(-height // t)
+        rgb = np.full((height, width, 3), _to_u8(np.float32(background)), dtype=np.uint8)
+        out_depth = np.zeros((height, width), np.float32) if with_aux else None
+        out_alpha = np.zeros((height, width), np.float32) if with_aux else None
+
+        # Depth order once for the frame; every tile's splat list inherits it
+        order = np.argsort(depth, kind="stable")
+        sx, sy, size, depth, colors = sx[order], sy[order], size[order], depth[order], colors[order]
+
+        # Tiles overlapped by each footprint (|offset| < size), then (tile, splat) pairs grouped by tile
+        tx0 = np.clip((sx - size + 1) // t, 0, cols - 1)
+        tx1 = np.clip((sx + size - 1) // t, 0, cols - 1)
+        ty0 = np.clip((sy - size + 1) // t, 0, rows - 1)
+        ty1 = np.clip((sy + size - 1) // t, 0, rows - 1)
+        nx = tx1 - tx0 + 1
+        count = nx * (ty1 - ty0 + 1)
+        splat = np.repeat(np.arange(len(sx)), count)
+        k = np.arange(len(splat)) - np.repeat(np.cumsum(count) - count, count)
+        tile = (ty0[splat] + k // nx[splat]) * cols + tx0[splat] + k % nx[splat]
+        by_tile = np.argsort(tile, kind="stable")
+        tile, splat = tile[by_tile], splat[by_tile]
+        bounds = np.searchsorted(tile, np.arange(cols * rows + 1))
+
+        jobs = []
+        for ti in range(cols * rows):
+            lo, hi = bounds[ti], bounds[ti + 1]
+            if lo < hi:
+                y0, x0 = (ti // cols) * t, (ti % cols) * t
+                jobs.append((x0, y0, min(t, width - x0), min(t, height - y0), splat[lo:hi]))
+        with self._lock:  # frames composite concurrently on the render pool's threads
+            self.empty += cols * rows - len(jobs)
+
+        def run(job):
+            x0, y0, tw, th, s = job
+            tile_rgb, tile_depth, tile_alpha = self._tile(
+                x0, y0, tw, th, sx[s], sy[s], size[s], depth[s], colors[s], background, with_aux
+            )
+            rgb[y0:y0 + th, x0:x0 + tw] = tile_rgb
+            if with_aux:
+                out_depth[y0:y0 + th, x0:x0 + tw] = tile_depth
+                out_alpha[y0:y0 + th, x0:x0 + tw] = tile_alpha
+
+        pool = self._executor()
+        if pool is None or len(jobs) < 2:
+            for job in jobs:
+                run(job)
+        else:
+            list(pool.map(run, jobs))
+        return rgb, out_depth, out_alpha
+
+    def _tile(self, x0, y0, tw, th, sx, sy, size, depth, colors, background, with_aux):
+        """Composite one tile from its splats (in depth order), or reuse an identical earlier one."""
+        sig = hashlib.blake2b(digest_size=16)
+        sig.update(np.array([x0, y0, tw, th, with_aux], dtype=np.int64).tobytes())
+        for arr in (sx, sy, size, colors, background, *((depth,) if with_aux else ())):
+            sig.update(np.ascontiguousarray(arr).tobytes())
+        key = sig.digest()
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        frag_rank, frag_pix, frag_alpha = [], [], []
+        for s in np.unique(size):
+            idx = np.flatnonzero(size == s)
+            f, pix, a = splat_fragments(sx[idx] - x0, sy[idx] - y0, int(s), tw, th)
+            frag_rank.append(idx[f])
+            frag_pix.append(pix)
+            frag_alpha.append(a)
+        rank = np.concatenate(frag_rank)
+        pix = np.concatenate(frag_pix)
+        alpha = np.concatenate(frag_alpha)
+
+        # "Over" compositing evaluated front-to-back: each fragment is attenuated
+        # by the transmittance of nearer fragments on the same pixel (an
+        # exclusive cumulative product, done in log space). Splats are in depth
+        # order, so their rank orders fragments within a pixel.
+        order = np.argsort(pix * len(sx) + rank)
+        rank, pix, alpha = rank[order], pix[order], alpha[order]
+        log_t = np.log1p(-alpha)
+        cum = np.cumsum(log_t)
+        new_pixel = np.r_[True, pix[1:] != pix[:-1]]
+        starts = np.flatnonzero(new_pixel)
+        group = np.cumsum(new_pixel) - 1
+        before = (cum[starts] - log_t[starts])[group]
+        weight = alpha * np.exp(cum - log_t - before)
+
+        n_pix = tw * th
+        transmittance = np.exp(np.bincount(pix, weights=log_t, minlength=n_pix))
+        flat = np.empty((n_pix, 3), dtype=np.float32)
+        flat[:] = (background * transmittance)[:, None]
+        for c in range(3):
+            flat[:, c] += np.bincount(pix, weights=weight * colors[rank, c], minlength=n_pix).astype(np.float32)
+        result = [_to_u8(flat).reshape(th, tw, 3), None, None]
+        if with_aux:
+            wsum = np.bincount(pix, weights=weight, minlength=n_pix)
+            dsum = np.bincount(pix, weights=weight * depth[rank], minlength=n_pix)
+            hit = wsum > 0
+            result[1] = np.where(hit, dsum / np.where(hit, wsum, 1.0), 0.0).reshape(th, tw).astype(np.float32)
+            result[2] = (1.0 - transmittance).reshape(th, tw).astype(np.float32)
+        result = tuple(result)
+        self.cache.put(key, result, nbytes=sum(a.nbytes for a in result if a is not None))
+        return result
+
+    def stats(self) -> dict:
+        """Cache hits are reused tiles, misses composited ones; `empty` tiles had no splats."""
+        return {"tile_size": self.tile_size, "workers": self.workers, "empty": self.empty, **self.cache.stats()}
@@ -6,9 +6,22 @@ import { cameraBus } from '../sync/CameraBus'
 export class NerfPane extends Viewport {
   private img!: HTMLImageElement
   private serverUrl: string | null = null
+  private sceneId?: string
   private lastPose?: CameraPose
   private inflight = false
   private infoEl!: HTMLDivElement
+  private socket: WebSocket | null = null
+  private frameUrl: string | null = null
+  // Server-side encoding: PNG is lossless, WebP/JPEG trade fidelity for encode time and size
+  private format: 'png' | 'webp' | 'jpeg' = 'png'
+  private quality?: number
+  // Progressive frames: while the camera moves the server renders at previewScale,
+  // then refines to full size (in the setQuality format) once the pose rests for refineMs
+  private previewScale = 0.25
+  private refineMs = 150
+  private refineTimer?: ReturnType<typeof setTimeout>
+  // Identifies this pane's pose history to the server's trajectory prefetcher
+  private readonly clientId = Math.random().toString(36).slice(2, 10)
 
   mount(): void {
     this.img = document.createElement('img')
@@ -32,15 +45,64 @@ export class NerfPane extends Viewport {
     })
   }
 
-  unmount(): void { /* no-op */ }
+  unmount(): void {
+    clearTimeout(this.refineTimer)
+    this.closeStream()
+  }
 
   protected onAttachScene(scene: SceneConfig): void {
     this.serverUrl = scene.nerf?.serverUrl ?? null
+    this.sceneId = scene.nerf?.scene
     this.infoEl.textContent = this.serverUrl ? 'Waiting for camera pose…' : 'NeRF server not configured.'
+    this.closeStream()
+    if (this.serverUrl && scene.nerf?.stream) this.openStream(this.serverUrl)
   }
 
-  private async requestFrame() {
-    if (!this.serverUrl || !this.lastPose || this.inflight) return
+  // Frames are pushed over /stream; the server renders only the latest pose it has seen.
+  private openStream(serverUrl: string) {
+    const socket = new WebSocket(serverUrl.replace(/^http/, 'ws') + '/stream')
+    socket.binaryType = 'blob'
+    socket.addEventListener('open', () => this.requestFrame())
+    socket.addEventListener('message', (ev) => {
+      if (typeof ev.data === 'string') {
+        this.infoEl.textContent = 'NeRF stream error.'
+        return
+      }
+      if (this.frameUrl) URL.revokeObjectURL(this.frameUrl)
+      this.frameUrl = URL.createObjectURL(ev.data as Blob)
+      this.img.src = this.frameUrl
+      this.infoEl.textContent = ''
+      socket.send(JSON.stringify({ type: 'ack' }))
+    })
+    socket.addEventListener('close', () => { if (this.socket === socket) this.socket = null })
+    this.socket = socket
+  }
+
+  private closeStream() {
+    this.socket?.close()
+    this.socket = null
+    if (this.frameUrl) URL.revokeObjectURL(this.frameUrl)
+    this.frameUrl = null
+  }
+
+  // `full` skips the preview pass (refinement and quality changes)
+  private async requestFrame(full = false) {
+    if (!this.serverUrl || !this.lastPose) return
+    if (this.socket) {
+      if (this.socket.readyState === WebSocket.OPEN) {
+        const [px, py, pz] = this.lastPose.position
+        const [tx, ty, tz] = this.lastPose.target
+        const [ux, uy, uz] = this.lastPose.up
+        this.socket.send(JSON.stringify({
+          type: 'pose', px, py, pz, tx, ty, tz, ux, uy, uz, fov: this.lastPose.fov,
+          format: this.format, quality: this.quality,
+          preview_scale: full ? 1 : this.previewScale, refine_ms: this.refineMs,
+          ...(this.sceneId ? { scene: this.sceneId } : {})
+        }))
+      }
+      return
+    }
+    if (this.inflight) return
     this.inflight = true
     try {
       const q = new URLSearchParams({
@@ -53,11 +115,23 @@ export class NerfPane extends Viewport {
         ux: String(this.lastPose.up[0]),
         uy: String(this.lastPose.up[1]),
         uz: String(this.lastPose.up[2]),
-        fov: String(this.lastPose.fov)
+        fov: String(this.lastPose.fov),
+        format: this.format
       })
+      if (this.quality !== undefined) q.set('quality', String(this.quality))
+      if (this.sceneId) q.set('scene', this.sceneId)
+      // Over HTTP the client drives refinement: a preview now, the full frame once the pose rests
+      clearTimeout(this.refineTimer)
+      if (!full && this.previewScale < 1) {
+        q.set('scale', String(this.previewScale))
+        // Only motion frames form the trajectory the server prefetches along
+        q.set('client', this.clientId)
+        this.refineTimer = setTimeout(() => this.requestFrame(true), this.refineMs)
+      }
       const url = `${this.serverUrl}/render?${q.toString()}`
-      // To avoid CORS issues, backend should set appropriate headers
-      this.img.src = url + `&t=${Date.now()}`
+      // To avoid CORS issues, backend should set appropriate headers.
+      // No cache-busting: frames carry ETags, so revisited poses revalidate with a 304
+      this.img.src = url
       this.infoEl.textContent = ''
     } finally {
       this.inflight = false
@@ -66,7 +140,18 @@ export class NerfPane extends Viewport {
 
   setBackground(_color: string): void { /* background via CSS */ }
   setWireframe(_enabled: boolean): void { /* N/A */ }
-  setQuality(_level: number): void { /* TODO: send to server as param */ }
+  // level in [0, 1]: 1 requests lossless PNG frames, lower levels lossy WebP at decreasing quality
+  setQuality(level: number): void {
+    const l = Math.min(1, Math.max(0, level))
+    if (l >= 1) {
+      this.format = 'png'
+      this.quality = undefined
+    } else {
+      this.format = 'webp'
+      this.quality = Math.round(30 + l * 65)
+    }
+    this.requestFrame(true)
+  }
   updateMetrics(): void { /* backend FPS reported separately if desired */ }
   getPose() { return null }
   applyPose(_pose: CameraPose) { /* pull-based, handled by requestFrame */ }
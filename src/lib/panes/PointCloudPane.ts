@@ -2,12 +2,22 @@ import * as THREE from 'three'
 import { PLYLoader } from 'three-stdlib'
 import type { SceneConfig } from '../../types'
 import { ThreeViewport } from '../viewports/ThreeViewport'
+import { OctreeStreamer } from '../utils/octree'
 
 export class PointCloudPane extends ThreeViewport {
   private pointSize = 1.5
   private material?: THREE.PointsMaterial
+  private octree?: OctreeStreamer
 
   protected async onAttachScene(scene: SceneConfig) {
+    if (scene.pointCloud?.octree) {
+      try {
+        await this.loadOctree(scene.pointCloud.octree)
+        return
+      } catch (err) {
+        console.error('Failed to load point cloud octree:', err)
+      }
+    }
     if (scene.pointCloud?.ply) {
       const loader = new PLYLoader()
       loader.load(
@@ -29,6 +39,28 @@ export class PointCloudPane extends ThreeViewport {
     }
   }
 
+  private async loadOctree(indexUrl: string) {
+    const octree = new OctreeStreamer()
+    const index = await octree.load(indexUrl)
+    if (!index.nodes.length) throw new Error('Octree index has no nodes')
+    const vertexColors = index.properties.includes('red')
+    const material = new THREE.PointsMaterial({ size: this.pointSize, vertexColors, color: vertexColors ? 0xffffff : 0x66ccff, sizeAttenuation: true })
+    this.material = material
+    octree.makeObject = geometry => new THREE.Points(geometry, material)
+    // Tiles keep source coordinates; center the whole tree like single PLYs are
+    const root = new THREE.Box3(new THREE.Vector3(...index.min), new THREE.Vector3(...index.max))
+    octree.group.position.copy(root.getCenter(new THREE.Vector3()).negate())
+    octree.group.updateMatrixWorld()
+    this.scene3.add(octree.group)
+    this.octree = octree
+    this.frameToBox(root.translate(octree.group.position))
+  }
+
+  protected render() {
+    this.octree?.update(this.camera, this.container.clientHeight)
+    super.render()
+  }
+
   private async loadDemoCloud() {
     // Try to load generated demo point cloud first
     try {
@@ -75,12 +107,16 @@ export class PointCloudPane extends ThreeViewport {
   setQuality(level: number): void {
     this.pointSize = 0.5 + level * 2
     if (this.material) this.material.size = this.pointSize
+    if (this.octree) this.octree.pointBudget = Math.round(500_000 + level * 4_500_000)
   }
 
   setWireframe(_enabled: boolean): void { /* N/A for points */ }
 
   private frameToObject(obj: THREE.Object3D) {
-    const box = new THREE.Box3().setFromObject(obj)
+    this.frameToBox(new THREE.Box3().setFromObject(obj))
+  }
+
+  private frameToBox(box: THREE.Box3) {
     const size = box.getSize(new THREE.Vector3()).length()
     const center = box.getCenter(new THREE.Vector3())
     this.controls.target.copy(center)
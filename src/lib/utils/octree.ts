@@ -0,0 +1,116 @@
+import * as THREE from 'three'
+import { PLYLoader } from 'three-stdlib'
+
+// index.json written by scripts/build_octree.py
+export type OctreeNode = {
+  name: string
+  level: number
+  points: number
+  min: [number, number, number]
+  max: [number, number, number]
+  spacing: number
+  file: string
+  children: string[]
+}
+
+export type OctreeIndex = {
+  version: number
+  kind: 'pointcloud' | 'splats'
+  points: number
+  properties: string[]
+  min: [number, number, number]
+  max: [number, number, number]
+  grid: number
+  depth: number
+  nodes: OctreeNode[]
+}
+
+// Streams octree tiles coarse-to-fine: a node is fetched once its parent is
+// loaded, it is in the view frustum and its point spacing would cover more
+// than `minPixelSpacing` pixels on screen. Nearer/larger nodes load first.
+// Refinement is additive, so loaded nodes stay in `group` alongside children.
+export class OctreeStreamer {
+  readonly group = new THREE.Group()
+  index?: OctreeIndex
+  pointBudget = 3_000_000
+  minPixelSpacing = 1.5
+  maxConcurrent = 4
+  private baseUrl = ''
+  private nodes = new Map<string, OctreeNode>()
+  private parents = new Map<string, string>()
+  private loaded = new Set<string>()
+  private inFlight = new Set<string>()
+  private loadedPoints = 0
+  private loader = new PLYLoader()
+  private frustum = new THREE.Frustum()
+  private box = new THREE.Box3()
+  private matrix = new THREE.Matrix4()
+
+  // Builds the scene object for a loaded tile; set before the first update()
+  makeObject: (geometry: THREE.BufferGeometry) => THREE.Object3D = geometry => new THREE.Points(geometry)
+
+  async load(indexUrl: string): Promise<OctreeIndex> {
+    const res = await fetch(indexUrl)
+    if (!res.ok) throw new Error(`Octree index ${indexUrl}: HTTP ${res.status}`)
+    const index = await res.json() as OctreeIndex
+    this.index = index
+    this.baseUrl = indexUrl.slice(0, indexUrl.lastIndexOf('/') + 1)
+    for (const node of index.nodes) {
+      this.nodes.set(node.name, node)
+      for (const child of node.children) this.parents.set(child, node.name)
+    }
+    return index
+  }
+
+  // Call once per frame; starts fetches for the most useful pending nodes.
+  update(camera: THREE.PerspectiveCamera, viewportHeight: number) {
+    if (!this.index || this.inFlight.size >= this.maxConcurrent) return
+    camera.updateMatrixWorld()
+    this.matrix.multiplyMatrices(camera.projectionMatrix, camera.matrixWorldInverse)
+    this.frustum.setFromProjectionMatrix(this.matrix)
+    const pxPerUnit = viewportHeight / (2 * Math.tan(THREE.MathUtils.degToRad(camera.fov) / 2))
+    const inverse = this.group.matrixWorld.clone().invert()
+    const eye = camera.position.clone().applyMatrix4(inverse)
+
+    const candidates: { node: OctreeNode, priority: number }[] = []
+    for (const node of this.nodes.values()) {
+      if (this.loaded.has(node.name) || this.inFlight.has(node.name)) continue
+      const parent = this.parents.get(node.name)
+      if (parent && !this.loaded.has(parent)) continue
+      if (this.loadedPoints + node.points > this.pointBudget) continue
+      this.box.min.fromArray(node.min)
+      this.box.max.fromArray(node.max)
+      const distance = Math.max(this.box.distanceToPoint(eye), 1e-6)
+      if (node.level > 0) {
+        if (node.spacing * pxPerUnit / distance < this.minPixelSpacing) continue
+        this.box.applyMatrix4(this.group.matrixWorld)
+        if (!this.frustum.intersectsBox(this.box)) continue
+      }
+      candidates.push({ node, priority: (node.max[0] - node.min[0]) / distance })
+    }
+    candidates.sort((a, b) => b.priority - a.priority)
+    for (const { node } of candidates.slice(0, this.maxConcurrent - this.inFlight.size)) this.fetchNode(node)
+  }
+
+  get pointsLoaded() { return this.loadedPoints }
+
+  private fetchNode(node: OctreeNode) {
+    this.inFlight.add(node.name)
+    this.loadedPoints += node.points
+    this.loader.load(
+      this.baseUrl + node.file,
+      geometry => {
+        this.inFlight.delete(node.name)
+        this.loaded.add(node.name)
+        if (node.points > 0) this.group.add(this.makeObject(geometry))
+      },
+      undefined,
+      err => {
+        // Leave the node marked loaded so its subtree is not retried every frame
+        console.error(`Failed to load octree node ${node.name}:`, err)
+        this.inFlight.delete(node.name)
+        this.loaded.add(node.name)
+      },
+    )
+  }
+}
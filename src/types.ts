@@ -13,9 +13,11 @@ export type SceneConfig = {
     // When using server-side rendering
     serverUrl?: string // e.g., http://localhost:7007
     stream?: boolean
+    scene?: string // scene id on the server (default: its demo scene)
   }
   pointCloud?: {
     ply?: string // path to PLY
+    octree?: string // path to an index.json from scripts/build_octree.py (preferred over ply)
     potree?: {
       url: string // Potree tiles
     }